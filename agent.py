@@ -7,14 +7,20 @@ from livekit.plugins import (
 )
 from livekit.plugins import google
 from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION
+from tool_runtime import runtime
+from tools import process_sampler, telemetry, file_index, email_outbox
 from tools import (
-    get_weather, search_web, send_email, capture_screen, get_screen_info,
-    find_on_screen, click_on_screen, type_text, press_key_combination,
+    get_weather, get_weather_for_cities, search_web, send_email, send_bulk_email,
+    get_email_status, capture_screen, get_screen_info,
+    find_on_screen, find_many_on_screen, wait_for_screen_change, wait_for_element, find_text_on_screen,
+    click_on_screen, type_text, press_key_combination,
     open_application, close_application, get_running_processes, create_file,
-    read_file_content, delete_file, list_directory, get_system_info,
+    read_file_content, find_files, search_file_contents,
+    analyze_disk_usage, find_duplicate_files, delete_file, list_directory, get_system_info,
     control_volume, window_management, scroll_page, run_command,
-    remember_information, recall_information, add_task_to_memory,
+    remember_information, recall_information, search_memory, add_task_to_memory,
     advanced_window_control, mouse_automation, keyboard_automation,
+    record_macro, define_macro, run_macro, manage_macros,
     manage_startup_programs, network_control, power_management
 )
 
@@ -31,11 +37,18 @@ class Assistant(Agent):
         ),
             tools=[
                 get_weather,
+                get_weather_for_cities,
                 search_web,
                 send_email,
+                send_bulk_email,
+                get_email_status,
                 capture_screen,
                 get_screen_info,
                 find_on_screen,
+                find_many_on_screen,
+                wait_for_screen_change,
+                wait_for_element,
+                find_text_on_screen,
                 click_on_screen,
                 type_text,
                 press_key_combination,
@@ -44,6 +57,10 @@ class Assistant(Agent):
                 get_running_processes,
                 create_file,
                 read_file_content,
+                find_files,
+                search_file_contents,
+                analyze_disk_usage,
+                find_duplicate_files,
                 delete_file,
                 list_directory,
                 get_system_info,
@@ -53,10 +70,15 @@ class Assistant(Agent):
                 run_command,
                 remember_information,
                 recall_information,
+                search_memory,
                 add_task_to_memory,
                 advanced_window_control,
                 mouse_automation,
                 keyboard_automation,
+                record_macro,
+                define_macro,
+                run_macro,
+                manage_macros,
                 manage_startup_programs,
                 network_control,
                 power_management
@@ -65,6 +87,16 @@ class Assistant(Agent):
 
 
 async def entrypoint(ctx: agents.JobContext):
+    # Log whenever a tool call manages to stall the realtime audio loop
+    runtime.start_lag_monitor()
+    # Sample processes and system counters from the start so figures are ready when first asked for
+    process_sampler.start()
+    telemetry.start()
+    # Load (or build) the file name index and keep it current
+    file_index.start()
+    # Deliver emails left queued or waiting for a retry when the agent last stopped
+    email_outbox.start()
+
     session = AgentSession(
 
     )
@@ -0,0 +1,224 @@
+import asyncio
+import locale
+import os
+import shlex
+import signal
+import subprocess
+import time
+
+import psutil
+
+# Output kept per stream: the first HEAD_BYTES and the last TAIL_BYTES
+HEAD_BYTES = 8 * 1024
+TAIL_BYTES = 24 * 1024
+READ_CHUNK = 64 * 1024
+# Time a killed command gets to exit after SIGTERM before SIGKILL
+KILL_GRACE = 2.0
+
+
+class OutputBuffer:
+    """Keeps the head and tail of a stream in fixed memory, however much is written."""
+
+    def __init__(self, head_bytes=HEAD_BYTES, tail_bytes=TAIL_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self._head = bytearray()
+        self._tail = bytearray()
+        self.total = 0
+
+    def write(self, data):
+        self.total += len(data)
+        room = self.head_bytes - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if data:
+            self._tail += data
+            if len(self._tail) > self.tail_bytes:
+                del self._tail[:len(self._tail) - self.tail_bytes]
+
+    @property
+    def omitted(self):
+        return self.total - len(self._head) - len(self._tail)
+
+    def text(self, encoding=None):
+        encoding = encoding or locale.getpreferredencoding(False)
+        head = self._head.decode(encoding, errors="replace")
+        if not self.omitted:
+            return head + self._tail.decode(encoding, errors="replace")
+        return (f"{head}\n... [{self.omitted} bytes omitted] ...\n"
+                f"{self._tail.decode(encoding, errors='replace')}")
+
+
+class CommandResult:
+    __slots__ = ("returncode", "stdout", "stderr", "timed_out", "elapsed")
+
+    def __init__(self, returncode, stdout, stderr, timed_out, elapsed):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.elapsed = elapsed
+
+
+def _split_windows(command):
+    """Split a command line with the Windows parser (CommandLineToArgvW).
+
+    asyncio always joins exec arguments back with subprocess.list2cmdline, which
+    inverts this split, so the program receives the command line it was given.
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    parse = ctypes.windll.shell32.CommandLineToArgvW
+    parse.argtypes = [wintypes.LPCWSTR, ctypes.POINTER(ctypes.c_int)]
+    parse.restype = ctypes.POINTER(wintypes.LPWSTR)
+    count = ctypes.c_int()
+    argv = parse(command, ctypes.byref(count))
+    if not argv:
+        raise ctypes.WinError()
+    try:
+        return [argv[i] for i in range(count.value)]
+    finally:
+        ctypes.windll.kernel32.LocalFree(argv)
+
+
+def _kill_group(proc, sig):
+    """Signal the command and everything it started."""
+    if os.name == "nt":
+        # No process groups to signal: walk the tree instead
+        try:
+            parent = psutil.Process(proc.pid)
+            for child in parent.children(recursive=True):
+                child.kill()
+            parent.kill()
+        except psutil.Error:
+            pass
+        return
+    try:
+        os.killpg(proc.pid, sig)   # The command leads its own session, so its pgid is its pid
+    except ProcessLookupError:
+        pass
+
+
+class CommandRunner:
+    """Runs commands as asyncio subprocesses, never blocking the event loop.
+
+    stdout and stderr are drained concurrently into OutputBuffers, so memory
+    stays flat for commands that print gigabytes. On timeout or cancellation
+    the whole process group is killed and the output so far is returned.
+    """
+
+    def __init__(self, max_concurrent=4):
+        self.max_concurrent = max_concurrent
+        self._semaphores = {}
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return semaphore
+
+    async def _spawn(self, command, shell, cwd):
+        if os.name == "nt":
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}
+        streams = {"stdin": asyncio.subprocess.DEVNULL, "stdout": asyncio.subprocess.PIPE,
+                   "stderr": asyncio.subprocess.PIPE}
+        if shell:
+            return await asyncio.create_subprocess_shell(command, cwd=cwd, **streams, **group)
+        if not command.strip():
+            raise ValueError("No command given")
+        args = _split_windows(command) if os.name == "nt" else shlex.split(command)
+        return await asyncio.create_subprocess_exec(*args, cwd=cwd, **streams, **group)
+
+    @staticmethod
+    async def _drain(stream, buffer):
+        while True:
+            data = await stream.read(READ_CHUNK)
+            if not data:
+                return
+            buffer.write(data)
+
+    async def _stop(self, proc):
+        _kill_group(proc, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(proc.wait(), KILL_GRACE)
+        except asyncio.TimeoutError:
+            _kill_group(proc, getattr(signal, "SIGKILL", signal.SIGTERM))
+            await proc.wait()
+
+    async def run(self, command, shell=True, timeout=30.0, cwd=None):
+        """Run a command, returning a CommandResult with whatever it printed, even on timeout."""
+        async with self._semaphore():
+            start = time.monotonic()
+            stdout, stderr = OutputBuffer(), OutputBuffer()
+            proc = await self._spawn(command, shell, cwd)
+            readers = asyncio.gather(self._drain(proc.stdout, stdout), self._drain(proc.stderr, stderr))
+            timed_out = False
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.gather(proc.wait(), readers)), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                await self._stop(proc)
+            except asyncio.CancelledError:
+                await asyncio.shield(self._stop(proc))
+                readers.cancel()
+                raise
+            if timed_out:
+                try:
+                    # A background grandchild outside the group may still hold the pipes open
+                    await asyncio.wait_for(readers, 1.0)
+                except asyncio.TimeoutError:
+                    pass
+            return CommandResult(proc.returncode, stdout, stderr, timed_out, time.monotonic() - start)
+
+
+def _benchmark():
+    import sys
+    import tracemalloc
+
+    runner = CommandRunner()
+    python = shlex.quote(sys.executable)
+
+    async def main():
+        tracemalloc.start()
+        start = time.monotonic()
+        result = await runner.run(f"{python} -c \"import sys; [sys.stdout.write('x' * 1023 + chr(10)) "
+                                  f"for _ in range(1024 * 1024)]\"", timeout=60)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"1 GB of output: {time.monotonic() - start:.2f}s, {result.stdout.total / 2 ** 30:.1f} GB read, "
+              f"peak Python memory {peak / 2 ** 20:.1f} MB, {len(result.stdout.text())} chars kept")
+
+        result = await runner.run(f"{python} -c \"import time, subprocess, sys; "
+                                  f"subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']); "
+                                  f"print('building...', flush=True); time.sleep(60)\"", timeout=1)
+        print(f"Timeout: returned after {result.elapsed:.2f}s, timed_out={result.timed_out}, "
+              f"partial output {result.stdout.text().strip()!r}")
+
+        start = time.monotonic()
+        await asyncio.gather(*[runner.run("sleep 1") for _ in range(4)])
+        print(f"4 concurrent 1 s commands: {time.monotonic() - start:.2f}s")
+
+        lags, done = [], asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                before = time.monotonic()
+                await asyncio.sleep(0.01)
+                lags.append(time.monotonic() - before - 0.01)
+
+        task = asyncio.create_task(probe())
+        await runner.run(f"{python} -c \"print('y' * 10 ** 8)\"")
+        done.set()
+        await task
+        print(f"Event loop lag while streaming 100 MB: max {max(lags) * 1000:.1f} ms")
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,222 @@
+import fnmatch
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from file_index import DEFAULT_EXCLUDES
+from file_reader import MappedFile
+
+# Skipped by extension without opening them
+BINARY_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".tif", ".tiff", ".psd",
+    ".mp3", ".wav", ".flac", ".ogg", ".m4a", ".mp4", ".mkv", ".avi", ".mov", ".webm",
+    ".zip", ".gz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".iso", ".dmg",
+    ".exe", ".dll", ".so", ".dylib", ".bin", ".obj", ".o", ".a", ".lib", ".class", ".pyc", ".pyd",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".db", ".sqlite", ".npz", ".npy",
+})
+# Files up to this size are grouped into one worker task; bigger files get a task each
+BATCH_BYTES = 1024 * 1024
+BATCH_FILES = 256
+MAX_LINE_CHARS = 200
+
+
+def search_files(pattern, ignore_case, paths, max_matches):
+    """Process pool entry point: grep a batch of files.
+
+    Returns (matches, files_scanned, bytes_scanned, binary_skipped) where
+    matches are (path, line_number, line) tuples, at most max_matches of them.
+    """
+    matches, scanned, size, binary = [], 0, 0, 0
+    for path in paths:
+        try:
+            with MappedFile(path) as mf:
+                if mf.is_binary:
+                    binary += 1
+                    continue
+                scanned += 1
+                size += mf.size
+                for _, block in mf.grep(pattern, context=0, max_matches=max_matches - len(matches),
+                                        ignore_case=ignore_case):
+                    for number, line, _ in block:
+                        matches.append((path, number, line.strip()[:MAX_LINE_CHARS]))
+        except (OSError, ValueError):
+            continue
+        if len(matches) >= max_matches:
+            break
+    return matches, scanned, size, binary
+
+
+class _IgnoreRules:
+    """The simple subset of .gitignore rules: name globs, optionally directory-only ('build/')."""
+
+    def __init__(self, parent=None, lines=()):
+        self.rules = list(parent.rules) if parent else []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith(("#", "!")):
+                continue
+            directory_only = line.endswith("/")
+            glob = line.strip("/")
+            if "/" in glob:
+                glob = glob.rsplit("/", 1)[1]   # Anchored paths are matched by their last component
+            self.rules.append((re.compile(fnmatch.translate(glob)).match, directory_only))
+
+    def ignored(self, name, is_dir):
+        return any(match(name) for match, directory_only in self.rules if is_dir or not directory_only)
+
+    @classmethod
+    def for_directory(cls, directory, parent):
+        try:
+            with open(os.path.join(directory, ".gitignore"), encoding="utf-8", errors="replace") as f:
+                return cls(parent, f.read().splitlines())
+        except OSError:
+            return parent
+
+
+class ContentSearch:
+    """Greps a directory tree across a worker pool, streaming batches of files to the workers
+    while the tree is still being walked and cancelling the rest once enough matches are in."""
+
+    def __init__(self, excludes=DEFAULT_EXCLUDES, max_file_size=512 * 1024 ** 2):
+        self.excludes = frozenset(excludes)
+        self.max_file_size = max_file_size
+
+    def _files(self, root, name_filter, stats):
+        stack = [(root, _IgnoreRules.for_directory(root, _IgnoreRules()))]
+        while stack:
+            directory, rules = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                name = entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if name in self.excludes or (name.startswith(".") and is_dir) or rules.ignored(name, is_dir):
+                    stats["ignored"] += 1
+                    continue
+                if is_dir:
+                    stack.append((entry.path, _IgnoreRules.for_directory(entry.path, rules)))
+                    continue
+                if name_filter is not None and not name_filter(name):
+                    continue
+                if os.path.splitext(name)[1].lower() in BINARY_EXTENSIONS:
+                    stats["binary"] += 1
+                    continue
+                try:
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                if size == 0 or size > self.max_file_size:
+                    continue
+                yield entry.path, size
+
+    def _batches(self, root, name_filter, stats):
+        batch, batch_bytes = [], 0
+        for path, size in self._files(root, name_filter, stats):
+            if size >= BATCH_BYTES:
+                yield [path]
+                continue
+            batch.append(path)
+            batch_bytes += size
+            if batch_bytes >= BATCH_BYTES or len(batch) >= BATCH_FILES:
+                yield batch
+                batch, batch_bytes = [], 0
+        if batch:
+            yield batch
+
+    def search(self, root, pattern, executor, ignore_case=True, max_results=100, file_pattern=None,
+               max_inflight=None):
+        """Up to max_results (path, line_number, line) matches of the regex under root, and stats.
+
+        Matches are sorted by path and line; with more than max_results in the tree,
+        which ones are returned depends on which workers finish first.
+        """
+        re.compile(pattern)   # Raise re.error here rather than in every worker
+        name_filter = re.compile(fnmatch.translate(file_pattern), re.IGNORECASE).match if file_pattern else None
+        max_inflight = max_inflight or 2 * (getattr(executor, "_max_workers", None) or os.cpu_count() or 2)
+        stats = {"files": 0, "bytes": 0, "binary": 0, "ignored": 0, "cancelled": 0}
+        matches, pending = [], set()
+        start = time.perf_counter()
+
+        def harvest(done):
+            for future in done:
+                if future.cancelled():
+                    continue
+                found, scanned, size, binary = future.result()
+                matches.extend(found)
+                stats["files"] += scanned
+                stats["bytes"] += size
+                stats["binary"] += binary
+
+        for batch in self._batches(root, name_filter, stats):
+            pending.add(executor.submit(search_files, pattern, ignore_case, batch, max_results))
+            if len(pending) >= max_inflight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                harvest(done)
+            if len(matches) >= max_results:
+                break
+
+        while pending and len(matches) < max_results:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            harvest(done)
+        for future in pending:
+            # Early cancellation: batches not started yet are dropped
+            if future.cancel():
+                stats["cancelled"] += 1
+        harvest([f for f in pending if f.done() and not f.cancelled()])
+
+        matches.sort(key=lambda m: (m[0], m[1]))
+        stats["seconds"] = time.perf_counter() - start
+        stats["truncated"] = len(matches) >= max_results
+        return matches[:max_results], stats
+
+
+def _benchmark():
+    import random
+    import shutil
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    random.seed(9)
+    root = tempfile.mkdtemp()
+    words = ["alpha", "beta", "gamma", "delta", "config", "server", "timeout", "request", "handler"]
+    try:
+        for d in range(50):
+            directory = os.path.join(root, f"pkg{d}")
+            os.makedirs(directory)
+            for f in range(200):
+                with open(os.path.join(directory, f"mod{f}.py"), "w") as fh:
+                    for _ in range(60):
+                        fh.write(" ".join(random.choices(words, k=8)) + "\n")
+        line = "2026-01-01 INFO request handled by worker in 12 ms\n"
+        for i in range(3):
+            with open(os.path.join(root, f"big{i}.log"), "w") as fh:
+                fh.write(line * (64 * 1024 ** 2 // len(line)))
+                fh.write("2026-01-01 ERROR needle_in_haystack\n")
+        os.makedirs(os.path.join(root, "node_modules"))
+        with open(os.path.join(root, "node_modules", "skip.js"), "w") as fh:
+            fh.write("needle_in_haystack\n")
+
+        searcher = ContentSearch()
+        workers = os.cpu_count() or 1
+        for label, count in (("1 worker", 1), (f"{workers} workers", workers)):
+            with ProcessPoolExecutor(max_workers=count) as pool:
+                pool.submit(int).result()   # Start the pool before timing
+                results, stats = searcher.search(root, r"needle_\w+", pool, max_results=100)
+                print(f"Rare match, {label}: {stats['seconds']:.2f}s, {stats['files']} files, "
+                      f"{stats['bytes'] / 2 ** 20:.0f} MB scanned, {len(results)} matches")
+                results, stats = searcher.search(root, r"timeout\s+handler", pool, max_results=20)
+                print(f"First 20 of a common match, {label}: {stats['seconds'] * 1000:.0f} ms, "
+                      f"{stats['cancelled']} batches cancelled")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    _benchmark()
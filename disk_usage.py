@@ -0,0 +1,202 @@
+import collections
+import heapq
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Largest files remembered per directory; the global top-K is merged from these
+TOP_FILES_PER_DIR = 32
+
+
+class DirectoryUsage:
+    """Cached listing of one directory: its direct files only, subtrees are separate entries."""
+    __slots__ = ("mtime", "file_bytes", "file_count", "largest", "subdirs")
+
+    def __init__(self, mtime, file_bytes, file_count, largest, subdirs):
+        self.mtime = mtime
+        self.file_bytes = file_bytes
+        self.file_count = file_count
+        self.largest = largest       # [(size, name)], largest first
+        self.subdirs = subdirs       # subdirectory names (symlinks are not followed)
+
+
+class DiskUsageAnalyzer:
+    """Subtree sizes from a parallel scandir walk, cached per directory by mtime.
+
+    A directory's mtime changes when entries are added, removed or renamed in
+    it, so a repeat scan stats each directory once and lists only the changed
+    ones. Files growing in place do not touch their directory's mtime; pass
+    rescan=True to measure those. Only the max_roots most recently analyzed
+    roots keep their directories cached.
+    """
+
+    def __init__(self, workers=8, max_roots=8):
+        self.workers = workers
+        self.max_roots = max_roots
+        self._cache = {}     # directory -> DirectoryUsage
+        self._roots = collections.OrderedDict()   # analyzed roots, least recently used first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _under(path, root):
+        return path == root or path.startswith(os.path.join(root, ""))
+
+    def _evict_roots(self):
+        while len(self._roots) > self.max_roots:
+            old, _ = self._roots.popitem(last=False)
+            # Directories that also belong to a root still cached stay
+            self._cache = {p: n for p, n in self._cache.items()
+                           if not self._under(p, old) or any(self._under(p, r) for r in self._roots)}
+
+    def _list(self, path, mtime):
+        sizes, subdirs, total = [], [], 0
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                            continue
+                        size = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+                    total += size
+                    sizes.append((size, entry.name))
+        except OSError:
+            return None
+        return DirectoryUsage(mtime, total, len(sizes), heapq.nlargest(TOP_FILES_PER_DIR, sizes), subdirs)
+
+    def _visit(self, directory):
+        """Validate a subtree against the cache.
+
+        Unchanged directories are followed inline in this worker; changed ones
+        are listed, and their subdirectories handed back for other workers.
+        Returns ([(path, DirectoryUsage)], [subdirectories to visit], listed count).
+        """
+        visited, fan_out, listed = [], [], 0
+        stack = [directory]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            node = self._cache.get(path)
+            if node is not None and node.mtime == mtime:
+                visited.append((path, node))
+                stack.extend(os.path.join(path, name) for name in node.subdirs)
+                continue
+            node = self._list(path, mtime)
+            if node is None:
+                continue
+            listed += 1
+            visited.append((path, node))
+            fan_out.extend(os.path.join(path, name) for name in node.subdirs)
+        return visited, fan_out, listed
+
+    def _walk(self, root):
+        nodes, listed = {}, 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="friday-disk-usage") as pool:
+            pending = {pool.submit(self._visit, root)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    visited, fan_out, count = future.result()
+                    nodes.update(visited)
+                    listed += count
+                    pending.update(pool.submit(self._visit, d) for d in fan_out)
+        return nodes, listed
+
+    def analyze(self, root, limit=10, rescan=False):
+        """Total size of root, its `limit` largest subdirectories and largest files.
+
+        Returns a dict with total_bytes, file_count, dir_count, largest_dirs and
+        largest_files ([(size, path)], largest first), listed (directories read
+        from disk rather than the cache) and seconds.
+        """
+        start = time.perf_counter()
+        root = os.path.abspath(root)
+        prefix = os.path.join(root, "")
+        with self._lock:
+            if rescan:
+                self._cache = {p: n for p, n in self._cache.items() if p != root and not p.startswith(prefix)}
+            nodes, listed = self._walk(root)
+            # Directories under root that were not reached any more are gone
+            stale = [p for p in self._cache if (p == root or p.startswith(prefix)) and p not in nodes]
+            for path in stale:
+                del self._cache[path]
+            self._cache.update(nodes)
+            self._roots[root] = None
+            self._roots.move_to_end(root)
+            self._evict_roots()
+
+        if root not in nodes:
+            raise FileNotFoundError(f"Cannot read directory '{root}'")
+
+        # Subtree totals bottom-up: longer paths first, so children are totaled before their parent
+        totals, counts = {}, {}
+        for path in sorted(nodes, key=len, reverse=True):
+            node = nodes[path]
+            total, count = node.file_bytes, node.file_count
+            for name in node.subdirs:
+                child = os.path.join(path, name)
+                total += totals.get(child, 0)
+                count += counts.get(child, 0)
+            totals[path], counts[path] = total, count
+
+        root_node = nodes[root]
+        children = ((totals.get(os.path.join(root, name), 0), os.path.join(root, name))
+                    for name in root_node.subdirs)
+        files = ((size, os.path.join(path, name)) for path, node in nodes.items() for size, name in node.largest)
+        return {
+            "total_bytes": totals[root],
+            "file_count": counts[root],
+            "dir_count": len(nodes) - 1,
+            "largest_dirs": heapq.nlargest(limit, children),
+            "largest_files": heapq.nlargest(limit, files),
+            "listed": listed,
+            "seconds": time.perf_counter() - start,
+        }
+
+
+def _benchmark():
+    import shutil
+    import tempfile
+
+    root = tempfile.mkdtemp()
+    try:
+        for a in range(20):
+            for b in range(50):
+                directory = os.path.join(root, f"project{a}", f"dir{b}")
+                os.makedirs(directory)
+                for i in range(100):
+                    with open(os.path.join(directory, f"f{i}.dat"), "wb") as f:
+                        f.write(b"x" * ((a * 7 + b * 3 + i) % 2000))
+        files = 20 * 50 * 100
+
+        start = time.perf_counter()
+        total = 0
+        for path, _, names in os.walk(root):
+            total += sum(os.path.getsize(os.path.join(path, n)) for n in names)
+        print(f"os.walk + getsize over {files} files: {time.perf_counter() - start:.2f}s")
+
+        analyzer = DiskUsageAnalyzer()
+        first = analyzer.analyze(root)
+        assert first["total_bytes"] == total
+        print(f"First scan: {first['seconds']:.2f}s ({first['listed']} directories listed)")
+        repeat = analyzer.analyze(root)
+        print(f"Repeat scan, nothing changed: {repeat['seconds'] * 1000:.0f} ms "
+              f"({repeat['listed']} directories listed)")
+        with open(os.path.join(root, "project3", "dir7", "new.bin"), "wb") as f:
+            f.write(b"\0" * 10 ** 6)
+        changed = analyzer.analyze(root)
+        assert changed["total_bytes"] == total + 10 ** 6
+        print(f"Repeat scan after adding one file: {changed['seconds'] * 1000:.0f} ms "
+              f"({changed['listed']} directory listed), largest file {changed['largest_files'][0][1]}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    _benchmark()
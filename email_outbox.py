@@ -0,0 +1,334 @@
+import logging
+import os
+import secrets
+import smtplib
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+OUTBOX_DB = "friday_outbox.db"
+# A message claimed for sending by an outbox that stopped renewing its claim this long ago is sent again
+LEASE_SECONDS = 300.0
+
+# Errors that will not go away by retrying
+PERMANENT_ERRORS = (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused,
+                    smtplib.SMTPSenderRefused)
+
+
+class EmailOutbox:
+    """Durable outbox. Messages are queued in SQLite and sent by a background worker
+    over one reused, authenticated SMTP connection.
+
+    Several processes may share the database (each agent job runs in its own).
+    A worker claims messages under its owner id with a timestamp it keeps
+    renewing while it sends; messages of a worker that died are only taken
+    over once that lease has expired.
+    """
+
+    def __init__(self, db_path=OUTBOX_DB, smtp_host="smtp.gmail.com", smtp_port=587, use_tls=True,
+                 user=None, password=None, max_attempts=5, backoff_base=5.0, backoff_max=600.0,
+                 idle_timeout=60.0, batch_size=20):
+        self.db_path = db_path
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.use_tls = use_tls
+        self._user = user
+        self._password = password
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.idle_timeout = idle_timeout
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._server = None
+        self._last_used = 0.0
+        self._schema_ready = False
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+
+    @property
+    def user(self):
+        return self._user or os.getenv("GMAIL_USER")
+
+    @property
+    def password(self):
+        # Use App Password, not regular password
+        return self._password or os.getenv("GMAIL_APP_PASSWORD")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            if not self._schema_ready:
+                self._init_schema(conn)
+                self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _init_schema(conn):
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                to_email TEXT NOT NULL,
+                cc_email TEXT,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created TEXT NOT NULL,
+                sent_at TEXT,
+                owner TEXT,
+                claimed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt);
+        """)
+        # Databases created before claims had owners
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(outbox)")}
+        for column, kind in (("owner", "TEXT"), ("claimed_at", "REAL")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE outbox ADD COLUMN {column} {kind}")
+
+    def enqueue(self, to_email, subject, body, cc_email=None):
+        """Queue one message and return its id."""
+        return self.enqueue_many([(to_email, subject, body, cc_email)])[0]
+
+    def enqueue_many(self, messages):
+        """Queue (to_email, subject, body, cc_email) tuples in one transaction and return their ids."""
+        conn = self._connect()
+        now = datetime.now().isoformat()
+        ids = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for to_email, subject, body, cc_email in messages:
+                cursor = conn.execute(
+                    "INSERT INTO outbox (to_email, cc_email, subject, body, created) VALUES (?, ?, ?, ?, ?)",
+                    (to_email, cc_email, subject, body, now))
+                ids.append(cursor.lastrowid)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.start()
+        self._wakeup.set()
+        return ids
+
+    def status(self, message_id):
+        row = self._connect().execute(
+            "SELECT id, to_email, subject, status, attempts, last_error, created, sent_at "
+            "FROM outbox WHERE id = ?", (message_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def recent(self, limit=10):
+        rows = self._connect().execute(
+            "SELECT id, to_email, subject, status, attempts, last_error, created, sent_at "
+            "FROM outbox ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    @staticmethod
+    def _row_to_dict(row):
+        keys = ("id", "to_email", "subject", "status", "attempts", "last_error", "created", "sent_at")
+        return dict(zip(keys, row))
+
+    def start(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._run, name="friday-outbox", daemon=True)
+                self._worker.start()
+
+    def stop(self, timeout=10.0):
+        self._stop.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self._disconnect()
+
+    def flush(self, timeout=30.0):
+        """Block until nothing is queued or being sent, or the timeout expires."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            row = self._connect().execute(
+                "SELECT COUNT(*) FROM outbox WHERE status IN ('queued', 'sending')").fetchone()
+            if row[0] == 0:
+                return True
+            self._wakeup.set()
+            time.sleep(0.05)
+        return False
+
+    def _claim_due(self):
+        """Claim due messages, and messages whose sender's lease expired (it died mid-send)."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, to_email, cc_email, subject, body, attempts FROM outbox "
+                "WHERE (status = 'queued' AND next_attempt <= ?) "
+                "OR (status = 'sending' AND (claimed_at IS NULL OR claimed_at < ?)) ORDER BY id LIMIT ?",
+                (now, now - LEASE_SECONDS, self.batch_size)).fetchall()
+            conn.executemany("UPDATE outbox SET status = 'sending', owner = ?, claimed_at = ? WHERE id = ?",
+                             [(self.owner, now, r[0]) for r in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _renew_claims(self):
+        try:
+            self._connect().execute("UPDATE outbox SET claimed_at = ? WHERE status = 'sending' AND owner = ?",
+                                    (time.time(), self.owner))
+        except sqlite3.Error as e:
+            logging.warning(f"Could not renew email outbox claims: {e}")
+
+    def _next_wakeup(self):
+        row = self._connect().execute(
+            "SELECT MIN(due) FROM (SELECT next_attempt AS due FROM outbox WHERE status = 'queued' "
+            "UNION ALL SELECT claimed_at + ? FROM outbox WHERE status = 'sending' AND owner != ?)",
+            (LEASE_SECONDS, self.owner)).fetchone()
+        return row[0]
+
+    def _server_connection(self):
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_timeout / 2:
+            # Probe a connection that sat idle, the server may have dropped it
+            try:
+                self._server.noop()
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+        if self._server is None:
+            server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=30)
+            if self.use_tls:
+                server.starttls()  # Enable TLS encryption
+            if self.user and self.password:
+                server.login(self.user, self.password)
+            self._server = server
+        return self._server
+
+    def _disconnect(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+    def _send(self, to_email, cc_email, subject, body):
+        msg = MIMEMultipart()
+        msg['From'] = self.user or ""
+        msg['To'] = to_email
+        msg['Subject'] = subject
+
+        # Add CC if provided
+        recipients = [to_email]
+        if cc_email:
+            msg['Cc'] = cc_email
+            recipients.append(cc_email)
+
+        # Attach message body
+        msg.attach(MIMEText(body, 'plain'))
+
+        self._server_connection().sendmail(self.user or "", recipients, msg.as_string())
+        self._last_used = time.monotonic()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                rows = self._claim_due()
+            except Exception as e:
+                logging.error(f"Error reading email outbox: {e}")
+                rows = []
+
+            for message_id, to_email, cc_email, subject, body, attempts in rows:
+                # Keep the rest of the batch claimed while sending can take up to the SMTP timeout each
+                self._renew_claims()
+                self._deliver(message_id, to_email, cc_email, subject, body, attempts)
+
+            if rows:
+                continue
+
+            # Nothing due: drop an idle connection, then sleep until the next retry or new mail
+            if self._server is not None and time.monotonic() - self._last_used > self.idle_timeout:
+                self._disconnect()
+            next_attempt = self._next_wakeup()
+            wait = self.idle_timeout if next_attempt is None else max(0.0, next_attempt - time.time())
+            self._wakeup.wait(min(wait, self.idle_timeout))
+            self._wakeup.clear()
+        self._disconnect()
+
+    def _deliver(self, message_id, to_email, cc_email, subject, body, attempts):
+        conn = self._connect()
+        try:
+            self._send(to_email, cc_email, subject, body)
+            conn.execute("UPDATE outbox SET status = 'sent', attempts = ?, last_error = NULL, sent_at = ? "
+                         "WHERE id = ?", (attempts + 1, datetime.now().isoformat(), message_id))
+            logging.info(f"Email {message_id} sent successfully to {to_email}")
+        except Exception as e:
+            self._disconnect()
+            attempts += 1
+            if isinstance(e, PERMANENT_ERRORS) or attempts >= self.max_attempts:
+                conn.execute("UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                             (attempts, str(e), message_id))
+                logging.error(f"Email {message_id} to {to_email} failed permanently: {e}")
+            else:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+                conn.execute("UPDATE outbox SET status = 'queued', attempts = ?, last_error = ?, "
+                             "next_attempt = ? WHERE id = ?",
+                             (attempts, str(e), time.time() + delay, message_id))
+                logging.warning(f"Email {message_id} to {to_email} failed ({e}), retrying in {delay:.0f}s")
+
+
+def _benchmark():
+    """Send a batch through a local aiosmtpd server and compare against one connection per message."""
+    import tempfile
+    from aiosmtpd.controller import Controller
+
+    class CountingHandler:
+        def __init__(self):
+            self.messages = 0
+            self.sessions = set()
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages += 1
+            self.sessions.add(id(session))
+            return "250 OK"
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=8025)
+    controller.start()
+    try:
+        db_path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+        outbox = EmailOutbox(db_path=db_path, smtp_host="127.0.0.1", smtp_port=8025, use_tls=False,
+                             user="friday@example.com")
+        count = 200
+        start = time.perf_counter()
+        ids = outbox.enqueue_many([(f"user{i}@example.com", f"Test {i}", "Hello", None) for i in range(count)])
+        queued = time.perf_counter() - start
+        outbox.flush()
+        pooled = time.perf_counter() - start
+        print(f"Queued {count} messages in {queued * 1000:.1f} ms, all sent after {pooled:.2f}s "
+              f"over {len(handler.sessions)} SMTP session(s); last status: {outbox.status(ids[-1])['status']}")
+        outbox.stop()
+
+        start = time.perf_counter()
+        for i in range(count):
+            server = smtplib.SMTP("127.0.0.1", 8025)
+            server.sendmail("friday@example.com", [f"user{i}@example.com"], "Subject: Test\n\nHello")
+            server.quit()
+        print(f"One connection per message: {time.perf_counter() - start:.2f}s")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,260 @@
+import codecs
+import collections
+import mmap
+import os
+import re
+import time
+
+# Encoding and binary detection only ever look at this much of the file
+DETECT_PREFIX = 64 * 1024
+
+_BOMS = ((codecs.BOM_UTF32_LE, "utf-32-le"), (codecs.BOM_UTF32_BE, "utf-32-be"),
+         (codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16-le"),
+         (codecs.BOM_UTF16_BE, "utf-16-be"))
+
+
+def detect_encoding(prefix):
+    """Guess (encoding, bom_length) from a file prefix, or (None, 0) for binary data."""
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding, len(bom)
+    if not prefix:
+        return "utf-8", 0
+    if b"\x00" in prefix:
+        # BOM-less UTF-16 text has a NUL in every other byte; anything else with NULs is binary
+        even, odd = prefix[0::2].count(0), prefix[1::2].count(0)
+        if odd > len(prefix) * 0.4 and even == 0:
+            return "utf-16-le", 0
+        if even > len(prefix) * 0.4 and odd == 0:
+            return "utf-16-be", 0
+        return None, 0
+    try:
+        # A multi-byte character may be cut at the end of the prefix
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        pass
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(prefix).best() if len(prefix) >= 64 else None
+        # UTF-16/32 were already ruled out above; guesses of them on NUL-free text are wrong
+        if best is not None and not best.encoding.startswith(("utf_16", "utf_32")):
+            return best.encoding, 0
+    except ImportError:
+        pass
+    return "cp1252" if os.name == "nt" else "latin-1", 0
+
+
+class MappedFile:
+    """Read-only memory map of a file with range, tail and grep helpers.
+
+    Reads touch only the pages they need, so tail, byte ranges and early grep
+    matches cost the same on a 2 GB log as on a small file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.encoding, self._bom = detect_encoding(self._map[:DETECT_PREFIX])
+        codec = "utf-8" if self.encoding in (None, "utf-8-sig") else self.encoding
+        self._codec = codec
+        self._newline = "\n".encode(codec)
+        # Byte regexes and newline scans only work when '\n' is the single byte 0x0A
+        self.ascii_compatible = self._newline == b"\n"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    @property
+    def is_binary(self):
+        return self.encoding is None
+
+    def decode(self, data):
+        return data.decode(self.encoding or "latin-1", errors="replace")
+
+    def read_bytes(self, offset, length):
+        offset = max(self._bom, offset if offset >= 0 else self.size + offset)
+        return self._map[offset:offset + length]
+
+    def head(self, max_chars):
+        """The first max_chars characters, and whether the file holds more."""
+        # Up to 4 bytes per character; trailing partial characters are dropped by the decoder
+        data = self._map[self._bom:self._bom + max_chars * 4]
+        text = codecs.getincrementaldecoder(self.encoding or "latin-1")(errors="replace").decode(data)
+        return text[:max_chars], len(text) > max_chars or self._bom + len(data) < self.size
+
+    def _line_start(self, pos):
+        """Offset where the line holding byte `pos` starts."""
+        found = self._map.rfind(self._newline, self._bom, pos)
+        return self._bom if found < 0 else found + len(self._newline)
+
+    def _line_end(self, pos):
+        """Offset just past the newline ending the line that holds byte `pos`."""
+        found = self._map.find(self._newline, pos)
+        return self.size if found < 0 else found + len(self._newline)
+
+    def lines(self, start_line, count):
+        """Lines [start_line, start_line + count) as (line_number, text), 1-based.
+
+        A negative start_line counts from the end (-1 is the last line).
+        """
+        if start_line < 0:
+            return self.tail(min(count, -start_line), skip=-start_line - min(count, -start_line))
+        pos, number = self._bom, 1
+        while number < start_line and pos < self.size:
+            pos = self._line_end(pos)
+            number += 1
+        result = []
+        while len(result) < count and pos < self.size:
+            end = self._line_end(pos)
+            result.append((number, self.decode(self._map[pos:end]).rstrip("\r\n")))
+            pos, number = end, number + 1
+        return result
+
+    def tail(self, count, skip=0):
+        """The last `count` lines (after skipping `skip` lines from the end), scanning backwards.
+
+        Line numbers are negative, -1 being the last line.
+        """
+        if self.size <= self._bom:
+            return []
+        end = self.size
+        if self._map[end - len(self._newline):end] == self._newline:
+            end -= len(self._newline)   # A trailing newline does not start another line
+        collected = []
+        while len(collected) < count + skip:
+            start = self._line_start(end)
+            collected.append((-len(collected) - 1, self.decode(self._map[start:end]).rstrip("\r\n")))
+            if start <= self._bom:
+                break
+            end = start - len(self._newline)
+        return list(reversed(collected[skip:]))
+
+    def grep(self, pattern, context=2, max_matches=50, ignore_case=False):
+        """Lines matching a regex, with `context` lines around each, streamed through the map.
+
+        Returns a list of (line_number, [(number, text, is_match), ...]) blocks
+        and stops after max_matches matching lines.
+        """
+        flags = re.IGNORECASE if ignore_case else 0
+        if not self.ascii_compatible:
+            return self._grep_decoded(re.compile(pattern, flags), context, max_matches)
+
+        regex = re.compile(pattern.encode(self._codec), flags | re.MULTILINE)
+        spans, matched = [], set()   # spans: [start, end, first_line_number] of context blocks
+        counted_pos, counted_lines, last_line_end = self._bom, 1, -1
+        for match in regex.finditer(self._map, self._bom):
+            if match.start() < last_line_end:
+                continue   # Another match on a line already reported
+            start = self._line_start(match.start())
+            last_line_end = self._line_end(match.start())
+            # Line numbers are counted incrementally from the previous match
+            counted_lines += self._map[counted_pos:start].count(self._newline)
+            counted_pos = start
+            matched.add(counted_lines)
+
+            block_start, before = start, 0
+            while before < context and block_start > self._bom:
+                block_start = self._line_start(block_start - len(self._newline))
+                before += 1
+            block_end = last_line_end
+            for _ in range(context):
+                if block_end >= self.size:
+                    break
+                block_end = self._line_end(block_end)
+
+            if spans and block_start <= spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], block_end)   # Overlapping context: merge
+            else:
+                spans.append([block_start, block_end, counted_lines - before])
+            if len(matched) >= max_matches:
+                break
+
+        blocks = []
+        for start, end, first in spans:
+            lines = self.decode(self._map[start:end]).split("\n")
+            if lines and lines[-1] == "":
+                lines.pop()
+            block = [(first + i, line.rstrip("\r"), first + i in matched) for i, line in enumerate(lines)]
+            blocks.append((next(n for n, _, m in block if m), block))
+        return blocks
+
+    def _grep_decoded(self, regex, context, max_matches):
+        # UTF-16/32 text cannot be scanned bytewise; decode it line by line instead
+        blocks, window, current, after, matches = [], collections.deque(maxlen=context), None, 0, 0
+        with open(self.path, "r", encoding=self.encoding, errors="replace", newline="") as f:
+            for number, line in enumerate(f, 1):
+                line = line.rstrip("\r\n").lstrip("\ufeff")
+                if matches < max_matches and regex.search(line):
+                    matches += 1
+                    if current is None:
+                        previous = blocks[-1][1] if blocks else None
+                        if previous and window and window[0][0] == previous[-1][0] + 1:
+                            current = blocks[-1]   # Contexts touch: continue the previous block
+                        else:
+                            current = (number, [])
+                            blocks.append(current)
+                        current[1].extend(window)
+                        window.clear()
+                    current[1].append((number, line, True))
+                    after = context
+                elif current is not None and after > 0:
+                    current[1].append((number, line, False))
+                    after -= 1
+                elif matches >= max_matches:
+                    break
+                else:
+                    window.append((number, line, False))
+                if current is not None and after == 0:
+                    current = None
+        return blocks
+
+
+def _benchmark():
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    for size_mb in (1, 64, 512):
+        path = os.path.join(directory, f"log_{size_mb}.txt")
+        line = b"2026-01-01 12:00:00 INFO request handled in 12 ms by worker 7 for /api/items\n"
+        with open(path, "wb") as f:
+            block = line * (1024 * 1024 // len(line))
+            for _ in range(size_mb):
+                f.write(block)
+            f.write(b"2026-01-01 12:00:01 ERROR database connection lost\n")
+
+        with MappedFile(path) as mf:
+            timings = {}
+            start = time.perf_counter()
+            mf.tail(20)
+            timings["tail 20"] = time.perf_counter() - start
+            start = time.perf_counter()
+            mf.read_bytes(mf.size // 2, 4096)
+            timings["4 KB mid-file"] = time.perf_counter() - start
+            start = time.perf_counter()
+            mf.head(1000)
+            timings["head"] = time.perf_counter() - start
+            start = time.perf_counter()
+            mf.grep(r"INFO", max_matches=20)
+            timings["grep first 20"] = time.perf_counter() - start
+            start = time.perf_counter()
+            found = mf.grep(r"ERROR")
+            timings["grep whole file"] = time.perf_counter() - start
+        print(f"{size_mb:>4} MB: " + ", ".join(f"{k} {v * 1000:.2f} ms" for k, v in timings.items())
+              + f" ({len(found)} error block)")
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,276 @@
+import asyncio
+import collections
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future
+
+# Motion is redrawn at this rate, with frame deadlines taken from the monotonic clock
+MOTION_HZ = 120
+# Windows reports wheel movement in 1/120ths of a notch
+WHEEL_DELTA = 120 if os.name == "nt" else 1
+
+
+def _ease(t):
+    """Ease-in-out quadratic: starts and ends gently, like a hand moving a mouse."""
+    return 2 * t * t if t < 0.5 else 1 - (-2 * t + 2) ** 2 / 2
+
+
+class _Command:
+    __slots__ = ("kind", "future", "args")
+
+    def __init__(self, kind, args):
+        self.kind = kind
+        self.future = Future()
+        self.args = args
+
+
+class InputDispatcher(Executor):
+    """The one thread that synthesizes mouse and keyboard input, fed by a command queue.
+
+    Besides plain calls (it is the executor behind INPUT tools), it runs
+    scrolls, coalescing queued steps on one axis into a single multi-notch
+    event, and mouse motion, stepped on frame deadlines from
+    time.monotonic() and cancellable between frames. Every command returns
+    a Future, so async tools await completion instead of sleeping.
+    """
+
+    def __init__(self, backend=None, motion_hz=MOTION_HZ):
+        self._backend = backend
+        self.frame = 1.0 / motion_hz
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._cancel = threading.Event()
+        self._thread = None
+        self._current = None
+        self._shutdown = False
+        self.stats = {"commands": 0, "coalesced": 0, "cancelled": 0, "late_frames": 0, "frames": 0}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            import pyautogui
+            self._backend = pyautogui
+        return self._backend
+
+    def _enqueue(self, kind, args, coalesce=False):
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("The input dispatcher has been shut down")
+            if coalesce and self._queue:
+                last = self._queue[-1]
+                if last.kind == "scroll" and last.args[1] == args[1]:
+                    last.args = (last.args[0] + args[0], args[1])
+                    self.stats["coalesced"] += 1
+                    return last.future
+            command = _Command(kind, args)
+            self._queue.append(command)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="friday-input", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return command.future
+
+    def submit(self, fn, /, *args, **kwargs):
+        return self._enqueue("call", (fn, args, kwargs))
+
+    def scroll(self, notches, horizontal=False):
+        """Scroll by whole notches (positive is up/right); merged with a scroll still waiting in the queue."""
+        return self._enqueue("scroll", (notches, horizontal), coalesce=True)
+
+    def move(self, x, y, duration=0.0, button=None):
+        """Move the pointer to (x, y) over `duration` seconds, holding `button` down for a drag.
+
+        The future's result is {'cancelled': bool, 'position': (x, y)}.
+        """
+        return self._enqueue("motion", (x, y, duration, button))
+
+    def cancel_motion(self):
+        """Stop the gesture in progress (a drag releases its button) and drop queued ones."""
+        with self._cond:
+            dropped = [c for c in self._queue if c.kind == "motion"]
+            for command in dropped:
+                self._queue.remove(command)
+                command.future.cancel()
+            self._cancel.set()
+            self.stats["cancelled"] += len(dropped)
+        return len(dropped)
+
+    def _cancel_motion_of(self, future):
+        """Drop or stop the motion command behind future; other commands are left alone."""
+        with self._cond:
+            for command in self._queue:
+                if command.future is future:
+                    if command.kind == "motion":
+                        self._queue.remove(command)
+                        command.future.cancel()
+                        self.stats["cancelled"] += 1
+                    return
+            current = self._current
+            if current is not None and current.future is future and current.kind == "motion":
+                self._cancel.set()
+                self.stats["cancelled"] += 1
+
+    async def run(self, future):
+        """Await a command future; cancelling the awaiting task stops the command if it is a motion."""
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            self._cancel_motion_of(future)
+            raise
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                while self._queue:
+                    self._queue.popleft().future.cancel()
+            self._cond.notify()
+            thread = self._thread
+        if wait and thread is not None:
+            thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._shutdown:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                command = self._queue.popleft()
+                self._current = command
+                # A cancel aimed at an earlier gesture must not stop this one
+                self._cancel.clear()
+            if not command.future.set_running_or_notify_cancel():
+                continue
+            self.stats["commands"] += 1
+            try:
+                if command.kind == "call":
+                    fn, args, kwargs = command.args
+                    result = fn(*args, **kwargs)
+                elif command.kind == "scroll":
+                    result = self._scroll(*command.args)
+                else:
+                    result = self._motion(*command.args)
+            except BaseException as e:
+                logging.error(f"Input command failed: {e}")
+                command.future.set_exception(e)
+            else:
+                command.future.set_result(result)
+            self._current = None
+
+    def _scroll(self, notches, horizontal):
+        if notches:
+            scroll = self.backend.hscroll if horizontal else self.backend.scroll
+            scroll(notches * WHEEL_DELTA, _pause=False)
+        return notches
+
+    def _motion(self, x, y, duration, button):
+        backend = self.backend
+        start_x, start_y = backend.position()
+        if button:
+            backend.mouseDown(button=button, _pause=False)
+        cancelled, position = False, (start_x, start_y)
+        try:
+            start = time.monotonic()
+            frame = 0
+            while True:
+                now = time.monotonic()
+                t = 1.0 if duration <= 0 else min(1.0, (now - start) / duration)
+                e = _ease(t)
+                position = (round(start_x + (x - start_x) * e), round(start_y + (y - start_y) * e))
+                backend.moveTo(*position, _pause=False)
+                self.stats["frames"] += 1
+                if t >= 1.0:
+                    break
+                frame += 1
+                deadline = start + frame * self.frame
+                delay = deadline - time.monotonic()
+                if delay < 0:
+                    # Fell behind (slow moveTo): skip to the next deadline instead of bunching frames
+                    self.stats["late_frames"] += 1
+                    frame = int((time.monotonic() - start) / self.frame) + 1
+                    delay = start + frame * self.frame - time.monotonic()
+                if self._cancel.wait(max(0.0, delay)):
+                    cancelled = True
+                    break
+        finally:
+            if button:
+                backend.mouseUp(button=button, _pause=False)
+        return {"cancelled": cancelled, "position": position}
+
+
+def _benchmark():
+    try:
+        import pyautogui
+        pyautogui.position()
+        backend, label = None, "pyautogui"
+    except Exception:
+        # No display here: time the dispatcher against a backend that only records calls
+        class RecordingBackend:
+            def __init__(self):
+                self.calls, self.pos = [], (0, 0)
+
+            def position(self):
+                return self.pos
+
+            def moveTo(self, x, y, _pause=True):
+                self.pos = (x, y)
+                self.calls.append(("move", time.monotonic()))
+
+            def mouseDown(self, button="left", _pause=True):
+                self.calls.append(("down", time.monotonic()))
+
+            def mouseUp(self, button="left", _pause=True):
+                self.calls.append(("up", time.monotonic()))
+
+            def scroll(self, clicks, _pause=True):
+                self.calls.append(("scroll", clicks))
+
+            hscroll = scroll
+
+        backend, label = RecordingBackend(), "recording backend (no display)"
+
+    dispatcher = InputDispatcher(backend=backend)
+
+    async def main():
+        lags, done = [], asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                before = time.monotonic()
+                await asyncio.sleep(0.005)
+                lags.append(time.monotonic() - before - 0.005)
+
+        task = asyncio.create_task(probe())
+        dispatcher.move(100, 100).result()
+        start = time.monotonic()
+        result = await dispatcher.run(dispatcher.move(900, 600, duration=2.0, button="left"))
+        elapsed = time.monotonic() - start
+        done.set()
+        await task
+        print(f"2 s drag via {label}: took {elapsed:.3f}s, {dispatcher.stats['frames']} frames "
+              f"({dispatcher.stats['late_frames']} late), ended at {result['position']}, "
+              f"event loop lag max {max(lags) * 1000:.2f} ms")
+
+        gesture = dispatcher.move(100, 100, duration=2.0, button="left")
+        await asyncio.sleep(0.3)
+        start = time.monotonic()
+        dispatcher.cancel_motion()
+        result = await dispatcher.run(gesture)
+        print(f"Cancel mid-drag: stopped {((time.monotonic() - start) * 1000):.1f} ms after the request "
+              f"at {result['position']}, cancelled={result['cancelled']}")
+
+        blocker = dispatcher.submit(time.sleep, 0.1)
+        futures = [dispatcher.scroll(-1) for _ in range(10)]
+        await asyncio.wrap_future(blocker)
+        notches = await asyncio.wrap_future(futures[-1])
+        print(f"10 queued scroll steps became {len(set(map(id, futures)))} event of {notches} notches")
+
+    asyncio.run(main())
+    dispatcher.shutdown()
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,541 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from PIL import Image
+
+from screen_ocr import word_center
+
+MACRO_DIR = "friday_macros"
+ACTIONS = ("click", "type", "keys", "scroll", "move", "drag", "wait", "wait_for")
+# Recorded clicks and drags keep a patch of the screen around the pointer as their anchor
+ANCHOR_SIZE = 64
+ANCHOR_MIN_STD = 8.0          # flatter patches (empty background) cannot be matched reliably
+ANCHOR_SEARCH = 150           # pixels around the recorded position searched first
+ANCHOR_CONFIDENCE = 0.9
+DRAG_THRESHOLD = 6
+DOUBLE_CLICK_SECONDS = 0.5
+
+
+class MacroError(Exception):
+    pass
+
+
+def _anchor(step, number, matcher, at=None):
+    """Compiled anchor of a step: ('image', path, dx, dy, region, threshold), ('text', query, region) or None.
+
+    `at` is where the anchor's click point was recorded, if known.
+    """
+    if step.get("image"):
+        path = os.path.abspath(step["image"])
+        if not os.path.exists(path):
+            raise MacroError(f"Step {number}: image not found: {step['image']}")
+        height, width = matcher.template(path).gray.shape
+        dx, dy = step.get("offset") or (width // 2, height // 2)
+        region = None
+        if at is not None:
+            # Search around where the anchor was, then the whole screen
+            region = (at[0] - dx - ANCHOR_SEARCH, at[1] - dy - ANCHOR_SEARCH,
+                      width + 2 * ANCHOR_SEARCH, height + 2 * ANCHOR_SEARCH)
+        return ("image", path, int(dx), int(dy), region, float(step.get("confidence", 0.8)))
+    if step.get("text"):
+        return ("text", str(step["text"]), None)
+    return None
+
+
+def _point(step, x="x", y="y"):
+    if step.get(x) is None or step.get(y) is None:
+        return None
+    return int(step[x]), int(step[y])
+
+
+def _describe(anchor):
+    return "image" if anchor[0] == "image" else f"text '{anchor[1]}'"
+
+
+def compile_macro(steps, matcher):
+    """Validate declared or recorded steps and turn them into a compact plan.
+
+    Coordinates, key lists and anchor offsets are worked out here once;
+    consecutive type, scroll and wait steps are merged. Each plan entry is
+    a tuple starting with the operation and the step number it came from.
+    A drag may start from an anchor (recorded drags do); its end point then
+    moves with the anchor.
+    """
+    if not isinstance(steps, list) or not steps:
+        raise MacroError("A macro needs a non-empty list of steps")
+    plan = []
+    for number, step in enumerate(steps, 1):
+        if not isinstance(step, dict) or step.get("action") not in ACTIONS:
+            raise MacroError(f"Step {number}: 'action' must be one of {', '.join(ACTIONS)}")
+        action = step["action"]
+        last = plan[-1] if plan else None
+        try:
+            if action == "click":
+                anchor = _anchor(step, number, matcher, at=_point(step))
+                x, y = step.get("x"), step.get("y")
+                if anchor is None and (x is None or y is None):
+                    raise MacroError(f"Step {number}: a click needs x and y, an image or a text")
+                plan.append(("click", number, None if x is None else int(x), None if y is None else int(y),
+                             step.get("button", "left"), int(step.get("clicks", 1)), anchor))
+            elif action == "type":
+                text = str(step["text"])
+                if last and last[0] == "type":
+                    plan[-1] = ("type", last[1], last[2] + text)
+                else:
+                    plan.append(("type", number, text))
+            elif action == "keys":
+                keys = tuple(k.strip().lower() for k in str(step["keys"]).split("+") if k.strip())
+                if not keys:
+                    raise MacroError(f"Step {number}: no keys given")
+                plan.append(("keys", number, keys))
+            elif action == "scroll":
+                amount, horizontal = int(step["amount"]), bool(step.get("horizontal", False))
+                if last and last[0] == "scroll" and last[3] == horizontal:
+                    plan[-1] = ("scroll", last[1], last[2] + amount, horizontal)
+                else:
+                    plan.append(("scroll", number, amount, horizontal))
+            elif action == "move":
+                plan.append(("move", number, int(step["x"]), int(step["y"]), float(step.get("duration", 0.0)),
+                             None, None, None))
+            elif action == "drag":
+                start = _point(step, "from_x", "from_y")
+                anchor = _anchor(step, number, matcher, at=start)
+                plan.append(("drag", number, int(step["x"]), int(step["y"]), float(step.get("duration", 0.3)),
+                             step.get("button", "left"), start, anchor))
+            elif action == "wait":
+                seconds = float(step["seconds"])
+                if last and last[0] == "wait":
+                    plan[-1] = ("wait", last[1], last[2] + seconds)
+                else:
+                    plan.append(("wait", number, seconds))
+            else:
+                anchor = _anchor(step, number, matcher, at=_point(step))
+                if anchor is None:
+                    raise MacroError(f"Step {number}: wait_for needs an image or a text")
+                plan.append(("wait_for", number, anchor, float(step.get("timeout", 10.0))))
+        except (KeyError, TypeError, ValueError) as e:
+            raise MacroError(f"Step {number} ({action}): invalid or missing field {e}")
+    return plan
+
+
+class MacroStore:
+    """Named macros in friday_macros/macros.json, with anchor images next to it.
+
+    Plans are compiled when a macro is saved or first run, then kept in memory.
+    """
+
+    def __init__(self, matcher, directory=MACRO_DIR):
+        self.matcher = matcher
+        self.directory = directory
+        self._path = os.path.join(directory, "macros.json")
+        self._macros = None
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(name):
+        return name.strip().lower()
+
+    def _load(self):
+        if self._macros is None:
+            try:
+                with open(self._path, encoding="utf-8") as f:
+                    self._macros = json.load(f)
+            except FileNotFoundError:
+                self._macros = {}
+        return self._macros
+
+    def _write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._macros, f, indent=2)
+        os.replace(tmp, self._path)
+
+    def anchor_path(self, name, number):
+        safe = re.sub(r"[^\w-]+", "_", self.normalize(name))
+        return os.path.join(self.directory, f"{safe}_{number}.png")
+
+    def write_anchor(self, name, number, pixels):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.anchor_path(name, number)
+        Image.fromarray(pixels).save(path)
+        return path
+
+    def save(self, name, steps):
+        """Compile (which validates) and store a macro; returns its plan."""
+        plan = compile_macro(steps, self.matcher)
+        key = self.normalize(name)
+        with self._lock:
+            self._load()[key] = {"steps": steps, "created": datetime.now().isoformat(timespec="seconds")}
+            self._write()
+            self._plans[key] = plan
+        return plan
+
+    def plan(self, name):
+        key = self.normalize(name)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                macro = self._load().get(key)
+                if macro is None:
+                    raise KeyError(name)
+                plan = self._plans[key] = compile_macro(macro["steps"], self.matcher)
+        return plan
+
+    def steps(self, name):
+        with self._lock:
+            return self._load()[self.normalize(name)]["steps"]
+
+    def delete(self, name):
+        key = self.normalize(name)
+        with self._lock:
+            macro = self._load().pop(key)
+            self._plans.pop(key, None)
+            self._write()
+        directory = os.path.abspath(self.directory)
+        for step in macro["steps"]:
+            image = step.get("image")
+            if image and os.path.dirname(os.path.abspath(image)) == directory and os.path.exists(image):
+                os.remove(image)   # Only anchors recorded into the macro folder, never user images
+
+    def names(self):
+        with self._lock:
+            return {name: len(m["steps"]) for name, m in sorted(self._load().items())}
+
+
+class MacroRecorder:
+    """Records mouse and keyboard input with pynput into macro steps.
+
+    Each click or drag saves the patch of screen around the pointer where
+    the button went down as its anchor. Typed characters
+    merge into type steps, and shortcuts or special keys become keys steps.
+    """
+
+    _KEY_NAMES = {"page_up": "pageup", "page_down": "pagedown", "cmd": "win", "cmd_l": "win", "cmd_r": "win",
+                  "ctrl_l": "ctrl", "ctrl_r": "ctrl", "alt_l": "alt", "alt_r": "alt", "alt_gr": "altright",
+                  "shift_l": "shift", "shift_r": "shift", "caps_lock": "capslock", "print_screen": "printscreen",
+                  "num_lock": "numlock", "scroll_lock": "scrolllock"}
+    _MODIFIERS = ("ctrl", "alt", "shift", "win")
+
+    def __init__(self, capture):
+        self.capture = capture
+        self._lock = threading.Lock()
+        self._listeners = None
+        self._steps = []
+        self._held = set()
+        self._press = None
+
+    @property
+    def recording(self):
+        return self._listeners is not None
+
+    def start(self):
+        from pynput import keyboard, mouse
+
+        with self._lock:
+            if self._listeners is not None:
+                raise MacroError("Already recording")
+            self._steps, self._held, self._press = [], set(), None
+            self._listeners = (mouse.Listener(on_click=self._on_click, on_scroll=self._on_scroll),
+                               keyboard.Listener(on_press=self._on_press, on_release=self._on_release))
+        for listener in self._listeners:
+            listener.start()
+
+    def stop(self, save_anchor=None):
+        """Stop recording and return the steps; save_anchor(number, pixels) -> path stores anchors."""
+        with self._lock:
+            listeners, self._listeners = self._listeners, None
+            steps, self._steps = self._steps, []
+        if listeners is None:
+            raise MacroError("Not recording")
+        for listener in listeners:
+            listener.stop()
+        for number, step in enumerate(steps, 1):
+            step.pop("_at", None)
+            patch = step.pop("_patch", None)
+            if patch is not None and save_anchor is not None:
+                step["image"] = save_anchor(number, patch)
+                step["confidence"] = ANCHOR_CONFIDENCE
+            elif "offset" in step and "image" not in step:
+                del step["offset"]
+        return steps
+
+    def _grab_anchor(self, x, y):
+        try:
+            frame = self.capture.get_frame(max_age=0)
+        except Exception:
+            return None, None
+        x0 = min(max(0, x - ANCHOR_SIZE // 2), max(0, frame.width - ANCHOR_SIZE))
+        y0 = min(max(0, y - ANCHOR_SIZE // 2), max(0, frame.height - ANCHOR_SIZE))
+        patch = frame.pixels[y0:y0 + ANCHOR_SIZE, x0:x0 + ANCHOR_SIZE].copy()
+        if not frame.is_valid() or patch.size == 0 or float(patch.std()) < ANCHOR_MIN_STD:
+            return None, None
+        return patch, [x - x0, y - y0]
+
+    def _on_click(self, x, y, button, pressed):
+        x, y, now = int(x), int(y), time.monotonic()
+        if pressed:
+            patch, offset = self._grab_anchor(x, y)
+            with self._lock:
+                self._press = (x, y, button.name, now, patch, offset)
+            return
+        with self._lock:
+            if self._press is None:
+                return
+            px, py, name, started, patch, offset = self._press
+            self._press = None
+            anchor = {"_patch": patch, "offset": offset} if patch is not None else {}
+            if math.hypot(x - px, y - py) > DRAG_THRESHOLD:
+                self._steps.append({"action": "drag", "from_x": px, "from_y": py, "x": x, "y": y, "button": name,
+                                    "duration": round(min(max(now - started, 0.1), 1.0), 2), **anchor})
+                return
+            last = self._steps[-1] if self._steps else None
+            if (last and last["action"] == "click" and last["button"] == name
+                    and abs(last["x"] - x) <= 4 and abs(last["y"] - y) <= 4
+                    and now - last.get("_at", 0) < DOUBLE_CLICK_SECONDS):
+                last["clicks"] += 1
+                last["_at"] = now
+                return
+            self._steps.append({"action": "click", "x": x, "y": y, "button": name, "clicks": 1, "_at": now, **anchor})
+
+    def _on_scroll(self, x, y, dx, dy):
+        with self._lock:
+            for amount, horizontal in ((dy, False), (dx, True)):
+                if not amount:
+                    continue
+                last = self._steps[-1] if self._steps else None
+                if last and last["action"] == "scroll" and last.get("horizontal", False) == horizontal:
+                    last["amount"] += int(amount)
+                else:
+                    self._steps.append({"action": "scroll", "amount": int(amount), "horizontal": horizontal})
+
+    def _key_name(self, key):
+        char = getattr(key, "char", None)
+        if char is not None:
+            if len(char) == 1 and ord(char) < 32:
+                return chr(ord(char) + 96), None   # ctrl+letter arrives as a control character
+            return char.lower(), char
+        name = getattr(key, "name", None) or str(key)
+        return self._KEY_NAMES.get(name, name), None
+
+    def _on_press(self, key):
+        name, char = self._key_name(key)
+        with self._lock:
+            if name in self._MODIFIERS:
+                self._held.add(name)
+                return
+            combo = [m for m in self._MODIFIERS if m in self._held and m != "shift"]
+            last = self._steps[-1] if self._steps else None
+            if combo:
+                if "shift" in self._held:
+                    combo.insert(1, "shift")
+                self._steps.append({"action": "keys", "keys": "+".join(combo + [name])})
+            elif char is not None or name == "space":
+                text = char if char is not None else " "
+                if last and last["action"] == "type":
+                    last["text"] += text
+                else:
+                    self._steps.append({"action": "type", "text": text})
+            else:
+                self._steps.append({"action": "keys", "keys": name})
+
+    def _on_release(self, key):
+        name, _ = self._key_name(key)
+        with self._lock:
+            self._held.discard(name)
+
+
+class MacroPlayer:
+    """Replays a compiled plan in one tight loop on the calling (worker) thread.
+
+    Input goes through the input dispatcher; before each anchored click the
+    anchor is found on screen again (waiting for it up to anchor_timeout),
+    and the click lands where it is now. A missing anchor stops the replay
+    at that step instead of clicking blind.
+    """
+
+    def __init__(self, dispatcher, capture, matcher, watcher, ocr, injector, anchor_timeout=5.0, step_delay=0.05):
+        self.dispatcher = dispatcher
+        self.capture = capture
+        self.matcher = matcher
+        self.watcher = watcher
+        self.ocr = ocr
+        self.injector = injector
+        self.anchor_timeout = anchor_timeout
+        self.step_delay = step_delay
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _locate(self, anchor, timeout, ocr_executor):
+        if anchor[0] == "image":
+            _, path, dx, dy, region, threshold = anchor
+            match = self.watcher.wait_for_template(path, timeout=timeout, threshold=threshold, region=region)["match"]
+            if match is None and region is not None:
+                # The window moved further than the search area: one look at the whole screen
+                frame = self.capture.get_frame(max_age=0, copy=True)
+                found = self.matcher.find(frame, path, threshold=threshold, max_results=1)
+                match = found[0] if found else None
+            return None if match is None else (match.x + dx, match.y + dy)
+
+        _, text, region = anchor
+        deadline = time.monotonic() + timeout
+        while not self._stop.is_set():
+            frame = self.capture.get_frame(max_age=0.05, region=region, copy=True)
+            found = self.ocr.find(frame, text, ocr_executor)
+            if found:
+                return word_center(found[0])
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.2)
+        return None
+
+    def run(self, plan, verify=True, ocr_executor=None):
+        """Run a plan; returns a dict with steps run, elapsed seconds and, on failure, the step and error."""
+        self._stop.clear()
+        backend = self.dispatcher.backend
+        start, done = time.monotonic(), 0
+        try:
+            for op in plan:
+                if self._stop.is_set():
+                    raise MacroError(f"Step {op[1]}: stopped")
+                kind, number = op[0], op[1]
+                if kind == "click":
+                    _, _, x, y, button, clicks, anchor = op
+                    if anchor is not None and (verify or x is None):
+                        point = self._locate(anchor, self.anchor_timeout, ocr_executor)
+                        if point is None:
+                            raise MacroError(f"Step {number}: {_describe(anchor)} to click was not found on screen")
+                        x, y = point
+                    self.dispatcher.submit(backend.click, x, y, clicks=clicks, button=button, _pause=False).result()
+                elif kind == "type":
+                    _, missing, _ = self.dispatcher.submit(self.injector.type, op[2]).result()
+                    if missing:
+                        raise MacroError(f"Step {number}: {missing} characters could not be typed")
+                elif kind == "keys":
+                    self.dispatcher.submit(backend.hotkey, *op[2], _pause=False).result()
+                elif kind == "scroll":
+                    self.dispatcher.scroll(op[2], horizontal=op[3]).result()
+                elif kind in ("move", "drag"):
+                    _, _, x, y, duration, button, origin, anchor = op
+                    if anchor is not None and (verify or origin is None):
+                        point = self._locate(anchor, self.anchor_timeout, ocr_executor)
+                        if point is None:
+                            raise MacroError(f"Step {number}: {_describe(anchor)} to drag was not found on screen")
+                        if origin is not None:
+                            # The end point moves with the anchor, as if the whole window moved
+                            x, y = x + point[0] - origin[0], y + point[1] - origin[1]
+                        origin = point
+                    if origin is not None:
+                        self.dispatcher.move(*origin).result()
+                    if self.dispatcher.move(x, y, duration=duration, button=button).result()["cancelled"]:
+                        raise MacroError(f"Step {number}: mouse movement was stopped")
+                elif kind == "wait":
+                    if self._stop.wait(op[2]):
+                        raise MacroError(f"Step {number}: stopped")
+                else:
+                    _, _, anchor, timeout = op
+                    if self._locate(anchor, timeout, ocr_executor) is None:
+                        raise MacroError(f"Step {number}: {_describe(anchor)} did not appear within {timeout:.0f}s")
+                done += 1
+                if self.step_delay and kind in ("click", "keys", "type"):
+                    time.sleep(self.step_delay)   # Let the target process the input before the next anchor check
+        except MacroError as e:
+            return {"steps": done, "elapsed": time.monotonic() - start, "failed_step": op[1], "error": str(e)}
+        return {"steps": done, "elapsed": time.monotonic() - start, "failed_step": None, "error": None}
+
+
+def _benchmark():
+    import tempfile
+
+    import cv2
+    import numpy as np
+
+    from input_dispatcher import InputDispatcher
+    from screen_capture import ScreenCaptureService
+    from screen_watch import ScreenWatcher
+    from template_matching import TemplateMatcher
+
+    rng = np.random.default_rng(11)
+    desktop = cv2.resize(rng.integers(0, 255, (135, 240, 3), dtype=np.uint8), (1920, 1080),
+                         interpolation=cv2.INTER_CUBIC)
+    buttons = [cv2.GaussianBlur(rng.integers(0, 255, (32, 90, 3), dtype=np.uint8), (3, 3), 0) for _ in range(8)]
+    spots = [(200 + 200 * i, 150 + 90 * i) for i in range(8)]
+    for (x, y), button in zip(spots, buttons):
+        desktop[y:y + 32, x:x + 90] = button
+    screen = {"pixels": desktop}
+
+    class StaticGrabber:
+        def grab(self):
+            return screen["pixels"]
+
+    class RecordingBackend:
+        def __init__(self):
+            self.calls = []
+
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: self.calls.append((name, args))
+
+        def position(self):
+            return (0, 0)
+
+    class RecordingInjector:
+        def type(self, text, strategy="auto", interval=0.0):
+            return "keys", 0, 0.0
+
+    capture = ScreenCaptureService(grabber=StaticGrabber())
+    matcher = TemplateMatcher()
+    backend = RecordingBackend()
+    dispatcher = InputDispatcher(backend=backend)
+    store = MacroStore(matcher, directory=tempfile.mkdtemp())
+    player = MacroPlayer(dispatcher, capture, matcher, ScreenWatcher(capture, matcher), None,
+                         RecordingInjector(), anchor_timeout=0.5, step_delay=0)
+
+    steps = []
+    for number, (x, y) in enumerate(spots, 1):
+        path = store.write_anchor("report", number, desktop[y:y + 32, x:x + 90].copy())
+        steps += [{"action": "click", "x": x + 45, "y": y + 16, "image": path, "offset": [45, 16]},
+                  {"action": "type", "text": "quarterly "}, {"action": "type", "text": "report"},
+                  {"action": "keys", "keys": "ctrl+s"}, {"action": "scroll", "amount": -2},
+                  {"action": "scroll", "amount": -3}]
+    x, y = spots[0]
+    steps.append({"action": "drag", "from_x": x + 45, "from_y": y + 16, "x": x + 345, "y": y + 16,
+                  "image": store.anchor_path("report", 1), "offset": [45, 16], "duration": 0})
+
+    start = time.perf_counter()
+    store.save("report", steps)
+    plan = store.plan("report")
+    print(f"Compiled {len(steps)} steps into {len(plan)} operations in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    result = player.run(plan)
+    clicks = [args for name, args in backend.calls if name == "click"]
+    print(f"Replay with anchor checks: {result['steps']} operations in {result['elapsed'] * 1000:.0f} ms "
+          f"({result['elapsed'] * 1000 / len(plan):.1f} ms each), first click at {clicks[0][:2]}")
+
+    # Move every widget 40 px right and 25 px down, like a window that was dragged
+    shifted = np.roll(np.roll(desktop, 25, axis=0), 40, axis=1)
+    screen["pixels"] = shifted
+    capture.get_frame(max_age=0)
+    backend.calls.clear()
+    result = player.run(plan)
+    clicks = [args for name, args in backend.calls if name == "click"]
+    moves = [args for name, args in backend.calls if name == "moveTo"]
+    print(f"After the window moved: {result['steps']} operations, first click now at {clicks[0][:2]}, "
+          f"drag from {moves[0]} to {moves[-1]}")
+
+    screen["pixels"] = np.full_like(desktop, 128)
+    capture.get_frame(max_age=0)
+    result = player.run(plan)
+    print(f"Anchor gone: stopped at step {result['failed_step']} after {result['elapsed']:.2f}s: {result['error']}")
+    dispatcher.shutdown()
+
+
+if __name__ == "__main__":
+    _benchmark()
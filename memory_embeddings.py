@@ -0,0 +1,232 @@
+import time
+import zlib
+
+import numpy as np
+
+from memory_search import tokenize
+
+# Switch from brute force to the IVF index beyond this many vectors
+IVF_THRESHOLD = 50_000
+
+
+class HashedNgramEmbedder:
+    """Offline text embedding: signed feature hashing of words and character n-grams."""
+
+    def __init__(self, dim=256, ngram_sizes=(3, 4)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+        self._feature_cache = {}
+
+    def _features(self, token):
+        cached = self._feature_cache.get(token)
+        if cached is not None:
+            return cached
+
+        padded = f"<{token}>"
+        grams = [token]
+        for n in self.ngram_sizes:
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        hashes = np.array([zlib.crc32(gram.encode()) for gram in grams], dtype=np.uint32)
+        features = ((hashes % self.dim).astype(np.intp),
+                    np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32))
+        if len(self._feature_cache) < 200_000:
+            self._feature_cache[token] = features
+        return features
+
+    def embed_many(self, texts):
+        """Embed a batch of texts into an (n, dim) float32 matrix of unit vectors."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = [self._features(token) for token in tokenize(text)]
+            if features:
+                buckets = np.concatenate([f[0] for f in features])
+                signs = np.concatenate([f[1] for f in features])
+                out[row] = np.bincount(buckets, weights=signs, minlength=self.dim)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def embed(self, text):
+        return self.embed_many([text])[0]
+
+
+class SemanticIndex:
+    """Contiguous matrix of unit vectors with cosine top-k, plus an IVF index for large sizes."""
+
+    def __init__(self, embedder=None, initial_capacity=1024, ivf_threshold=IVF_THRESHOLD, nprobe=8):
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.vectors = np.zeros((initial_capacity, self.embedder.dim), dtype=np.float32)
+        self.size = 0
+        self.doc_ids = []
+        self.rows = {}            # doc_id -> row
+        self.doc_sections = []    # row -> section
+        self.texts = []           # row -> text
+        self.sections = {}        # section -> {doc_id: None}, in insertion order
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.centroids = None
+        self.assignments = np.zeros(initial_capacity, dtype=np.int32)
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= len(self.vectors):
+            return
+        capacity = max(needed, len(self.vectors) * 2)
+        vectors = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[:self.size] = self.assignments[:self.size]
+        self.vectors, self.assignments = vectors, assignments
+
+    def add_many(self, documents):
+        """Embed and add (doc_id, section, text) tuples in one batch."""
+        documents = list(documents)
+        for doc_id, _, _ in documents:
+            if doc_id in self.rows:
+                self.remove(doc_id)
+        if not documents:
+            return
+
+        embedded = self.embedder.embed_many([text for _, _, text in documents])
+        self._reserve(len(documents))
+        start = self.size
+        self.vectors[start:start + len(documents)] = embedded
+        for offset, (doc_id, section, text) in enumerate(documents):
+            self.rows[doc_id] = start + offset
+            self.doc_ids.append(doc_id)
+            self.doc_sections.append(section)
+            self.texts.append(text)
+            self.sections.setdefault(section, {})[doc_id] = None
+        self.size += len(documents)
+
+        if self.centroids is not None:
+            self.assignments[start:self.size] = np.argmax(embedded @ self.centroids.T, axis=1)
+        elif self.size >= self.ivf_threshold:
+            self.train_ivf()
+
+    def add(self, doc_id, section, text):
+        self.add_many([(doc_id, section, text)])
+
+    def remove(self, doc_id):
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return
+        self.sections[self.doc_sections[row]].pop(doc_id, None)
+        last = self.size - 1
+        if row != last:
+            # Keep the matrix contiguous by moving the last row into the hole
+            self.vectors[row] = self.vectors[last]
+            self.assignments[row] = self.assignments[last]
+            self.doc_ids[row] = self.doc_ids[last]
+            self.doc_sections[row] = self.doc_sections[last]
+            self.texts[row] = self.texts[last]
+            self.rows[self.doc_ids[row]] = row
+        self.doc_ids.pop()
+        self.doc_sections.pop()
+        self.texts.pop()
+        self.size = last
+
+    def trim(self, section, keep_last):
+        docs = self.sections.get(section, {})
+        while len(docs) > keep_last:
+            self.remove(next(iter(docs)))
+
+    def train_ivf(self, iterations=8, sample_size=20_000):
+        """Cluster the vectors with spherical k-means and assign every row to a list."""
+        n_lists = max(16, int(np.sqrt(self.size)))
+        rng = np.random.default_rng(0)
+        sample = self.vectors[rng.choice(self.size, min(sample_size, self.size), replace=False)]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for i in range(n_lists):
+                members = sample[labels == i]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[i] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+        self.centroids = centroids
+        for start in range(0, self.size, 65_536):
+            stop = min(start + 65_536, self.size)
+            self.assignments[start:stop] = np.argmax(self.vectors[start:stop] @ centroids.T, axis=1)
+
+    def search(self, query, limit=5, sections=None):
+        """Return up to `limit` (score, doc_id, section, text) tuples by cosine similarity."""
+        if self.size == 0:
+            return []
+
+        query_vector = self.embedder.embed(query)
+        vectors = self.vectors[:self.size]
+        if self.centroids is not None:
+            probe = np.argpartition(-(self.centroids @ query_vector),
+                                    min(self.nprobe, len(self.centroids) - 1))[:self.nprobe]
+            candidates = np.flatnonzero(np.isin(self.assignments[:self.size], probe))
+            scores = vectors[candidates] @ query_vector
+        else:
+            candidates = None
+            scores = vectors @ query_vector
+
+        if sections:
+            sections = set(sections)
+            rows = candidates if candidates is not None else range(self.size)
+            mask = np.fromiter((self.doc_sections[row] in sections for row in rows),
+                               dtype=bool, count=len(scores))
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(limit, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            if not np.isfinite(scores[i]) or scores[i] <= 0:
+                continue
+            row = int(candidates[i]) if candidates is not None else int(i)
+            results.append((float(scores[i]), self.doc_ids[row], self.doc_sections[row], self.texts[row]))
+        return results
+
+    def memory_bytes(self):
+        return self.vectors[:self.size].nbytes + self.assignments[:self.size].nbytes
+
+
+def benchmark_recall(total=100_000, queries=100):
+    """Print embedding throughput, top-k latency (brute force and IVF) and RAM for `total` memories."""
+    import random
+
+    random.seed(3)
+    words = [f"topic{i}" for i in range(5_000)] + ["website", "espresso", "deadline", "invoice"]
+    index = SemanticIndex(ivf_threshold=total + 1)
+    start = time.perf_counter()
+    batch = []
+    for i in range(total):
+        batch.append((f"conversations:{i}", "conversations", " ".join(random.choices(words, k=10))))
+        if len(batch) == 5_000:
+            index.add_many(batch)
+            batch = []
+    index.add_many(batch)
+    print(f"Embedded {total} memories in {time.perf_counter() - start:.1f}s, "
+          f"{index.memory_bytes() / 2**20:.1f} MiB of vectors")
+
+    def measure(label):
+        timings = []
+        for _ in range(queries):
+            query = " ".join(random.choices(words, k=3))
+            start = time.perf_counter()
+            index.search(query, limit=5)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"{label}: median {timings[len(timings) // 2] * 1e3:.2f} ms, "
+              f"p99 {timings[int(len(timings) * 0.99)] * 1e3:.2f} ms")
+
+    measure("Brute force top-5")
+    index.train_ivf()
+    measure("IVF top-5")
+
+
+if __name__ == "__main__":
+    benchmark_recall()
@@ -0,0 +1,219 @@
+import bisect
+import heapq
+import math
+import re
+import time
+from datetime import datetime
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Weights applied to terms matched by expansion rather than exactly
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+MAX_EXPANSIONS = 32
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def parse_timestamp(value):
+    """Convert an ISO timestamp (or epoch seconds) to epoch seconds, or None."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _within_distance(a, b, max_distance):
+    """Levenshtein distance check that gives up as soon as max_distance is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return False
+        previous = current
+    return previous[-1] <= max_distance
+
+
+class MemoryIndex:
+    """Incrementally maintained inverted index with BM25 ranking."""
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}       # term -> {doc_id: term frequency}
+        self.docs = {}           # doc_id -> (section, text, timestamp, length, terms)
+        self.sections = {}       # section -> {doc_id: None}, in insertion order
+        self.sorted_terms = []   # vocabulary kept sorted for prefix lookups
+        self.trigram_terms = {}  # trigram -> set of terms, for fuzzy candidates
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id, section, text, timestamp=None):
+        if doc_id in self.docs:
+            self.remove(doc_id)
+
+        tokens = tokenize(text)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+        for term, tf in counts.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                bisect.insort(self.sorted_terms, term)
+                for gram in _trigrams(term):
+                    self.trigram_terms.setdefault(gram, set()).add(term)
+            posting[doc_id] = tf
+
+        self.docs[doc_id] = (section, text, parse_timestamp(timestamp), len(tokens), tuple(counts))
+        self.sections.setdefault(section, {})[doc_id] = None
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        section, _, _, length, terms = doc
+        self.sections[section].pop(doc_id, None)
+        self.total_length -= length
+        for term in terms:
+            posting = self.postings[term]
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+                del self.sorted_terms[bisect.bisect_left(self.sorted_terms, term)]
+                for gram in _trigrams(term):
+                    grams = self.trigram_terms[gram]
+                    grams.discard(term)
+                    if not grams:
+                        del self.trigram_terms[gram]
+
+    def trim(self, section, keep_last):
+        """Drop the oldest documents of a section so that at most keep_last remain."""
+        docs = self.sections.get(section, {})
+        while len(docs) > keep_last:
+            self.remove(next(iter(docs)))
+
+    def _prefix_terms(self, prefix):
+        start = bisect.bisect_left(self.sorted_terms, prefix)
+        matches = []
+        for term in self.sorted_terms[start:start + MAX_EXPANSIONS + 1]:
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                matches.append(term)
+        return matches
+
+    def _fuzzy_terms(self, term):
+        max_distance = 1 if len(term) <= 5 else 2
+        grams = _trigrams(term)
+        overlap = {}
+        for gram in grams:
+            for candidate in self.trigram_terms.get(gram, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+        # Only verify the candidates sharing the most trigrams
+        candidates = heapq.nlargest(MAX_EXPANSIONS, overlap, key=overlap.get)
+        return [c for c in candidates if c != term and _within_distance(term, c, max_distance)]
+
+    def _expand(self, term, prefix, fuzzy):
+        expanded = {}
+        if term in self.postings:
+            expanded[term] = 1.0
+        if prefix and len(term) >= 2:
+            for match in self._prefix_terms(term):
+                expanded.setdefault(match, PREFIX_WEIGHT)
+        if fuzzy and len(term) >= 4 and not expanded:
+            for match in self._fuzzy_terms(term):
+                expanded.setdefault(match, FUZZY_WEIGHT)
+        return expanded
+
+    def search(self, query, limit=5, sections=None, since=None, until=None, prefix=True, fuzzy=True):
+        """Return up to `limit` (score, doc_id, section, text, timestamp) tuples, best first."""
+        if not self.docs:
+            return []
+
+        since = parse_timestamp(since)
+        until = parse_timestamp(until)
+        sections = set(sections) if sections else None
+        doc_count = len(self.docs)
+        avg_length = self.total_length / doc_count or 1.0
+
+        allowed = {}
+
+        def accept(doc_id):
+            section, _, timestamp, _, _ = self.docs[doc_id]
+            if sections is not None and section not in sections:
+                return False
+            if since is not None and (timestamp is None or timestamp < since):
+                return False
+            if until is not None and (timestamp is None or timestamp > until):
+                return False
+            return True
+
+        scores = {}
+        for term in set(tokenize(query)):
+            for match, weight in self._expand(term, prefix, fuzzy).items():
+                posting = self.postings[match]
+                idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    ok = allowed.get(doc_id)
+                    if ok is None:
+                        ok = allowed[doc_id] = accept(doc_id)
+                    if not ok:
+                        continue
+                    length = self.docs[doc_id][3]
+                    norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * idf * norm
+
+        results = []
+        for doc_id, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+            section, text, timestamp, _, _ = self.docs[doc_id]
+            results.append((score, doc_id, section, text, timestamp))
+        return results
+
+
+def benchmark_query_latency(total=200_000, queries=200):
+    """Print index build time and median/p99 query latency over `total` synthetic memories."""
+    import random
+
+    random.seed(7)
+    vocabulary = [f"word{i}" for i in range(20_000)] + ["website", "github", "espresso", "deadline"]
+    index = MemoryIndex()
+    start = time.perf_counter()
+    for i in range(total):
+        text = " ".join(random.choices(vocabulary, k=12))
+        index.add(f"conversations:{i}", "conversations", text, time.time() - i * 60)
+    print(f"Indexed {total} memories in {time.perf_counter() - start:.1f}s")
+
+    timings = []
+    for _ in range(queries):
+        query = " ".join(random.choices(vocabulary, k=2)) + " websit"
+        start = time.perf_counter()
+        index.search(query, limit=5)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"Query latency: median {timings[len(timings) // 2] * 1e3:.2f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_query_latency()
@@ -0,0 +1,214 @@
+import abc
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Entry sections stored as rows; preferences are a separate key/value table
+ENTRY_SECTIONS = ("conversations", "tasks", "reminders")
+
+
+class MemoryStore(abc.ABC):
+    """Interface for MemoryManager storage backends."""
+
+    @abc.abstractmethod
+    def get_preference(self, key):
+        ...
+
+    @abc.abstractmethod
+    def set_preference(self, key, value):
+        ...
+
+    @abc.abstractmethod
+    def get_preferences(self):
+        ...
+
+    @abc.abstractmethod
+    def get_preference_records(self):
+        """Return (key, value, updated) tuples for every preference."""
+
+    @abc.abstractmethod
+    def append_entry(self, section, entry, keep_last=None):
+        """Store one entry and return its id. Older entries beyond keep_last are dropped."""
+
+    @abc.abstractmethod
+    def get_entries(self, section):
+        """Return (id, entry) pairs of a section, oldest first."""
+
+    def close(self):
+        pass
+
+
+class SQLiteMemoryStore(MemoryStore):
+    """SQLite backend in WAL mode; every change is a single-row transaction."""
+
+    def __init__(self, db_path, busy_timeout=5.0):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _write(self, statements):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = None
+            for sql, params in statements:
+                cursor = conn.execute(sql, params)
+                if result is None:
+                    result = cursor.lastrowid
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS preferences (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                section TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_section ON entries(section, id);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+
+    def get_preference(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM preferences WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_preference(self, key, value):
+        self._write([(
+            "INSERT INTO preferences (key, value, updated) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+            (key, json.dumps(value), datetime.now().isoformat()),
+        )])
+
+    def get_preferences(self):
+        rows = self._connect().execute("SELECT key, value FROM preferences").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def get_preference_records(self):
+        rows = self._connect().execute("SELECT key, value, updated FROM preferences").fetchall()
+        return [(key, json.loads(value), updated) for key, value, updated in rows]
+
+    def append_entry(self, section, entry, keep_last=None):
+        statements = [("INSERT INTO entries (section, data) VALUES (?, ?)",
+                       (section, json.dumps(entry)))]
+        if keep_last is not None:
+            # Drop everything older than the newest keep_last rows of this section
+            statements.append((
+                "DELETE FROM entries WHERE section = ? AND id <= ("
+                "SELECT id FROM entries WHERE section = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (section, section, keep_last),
+            ))
+        return self._write(statements)
+
+    def get_entries(self, section):
+        rows = self._connect().execute(
+            "SELECT id, data FROM entries WHERE section = ? ORDER BY id", (section,)).fetchall()
+        return [(entry_id, json.loads(data)) for entry_id, data in rows]
+
+    def migrate_from_json(self, json_path):
+        """One-time import of a legacy friday_memory.json file. Returns True if data was imported."""
+        if not os.path.exists(json_path):
+            return False
+
+        with open(json_path, 'r') as f:
+            legacy = json.load(f)
+
+        conn = self._connect()
+        # The meta check and the import share one write transaction, so concurrent
+        # processes starting at the same time import the file exactly once
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone()
+            if done:
+                conn.execute("ROLLBACK")
+                return False
+
+            now = datetime.now().isoformat()
+            for key, value in legacy.get("user_preferences", {}).items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO preferences (key, value, updated) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), now))
+            for section in ENTRY_SECTIONS:
+                conn.executemany(
+                    "INSERT INTO entries (section, data) VALUES (?, ?)",
+                    [(section, json.dumps(entry)) for entry in legacy.get(section, [])])
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (json_path,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        os.replace(json_path, json_path + ".migrated")
+        logging.info(f"Migrated legacy memory file {json_path} into {self.db_path}")
+        return True
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def benchmark_write_latency(db_path="friday_memory_bench.db", total=100_000, bucket=10_000):
+    """Print median and p99 append latency per bucket while the store grows to `total` entries."""
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    store = SQLiteMemoryStore(db_path)
+    timings = []
+    try:
+        for i in range(total):
+            start = time.perf_counter()
+            if i % 4 == 0:
+                store.set_preference(f"key_{i}", f"value {i}")
+            else:
+                store.append_entry("tasks", {"task": f"task {i}", "timestamp": datetime.now().isoformat(),
+                                             "completed": False})
+            timings.append(time.perf_counter() - start)
+            if len(timings) == bucket:
+                timings.sort()
+                print(f"{i + 1:>7} entries: median {timings[len(timings) // 2] * 1e6:7.1f} us, "
+                      f"p99 {timings[int(len(timings) * 0.99)] * 1e6:7.1f} us")
+                timings = []
+    finally:
+        store.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+if __name__ == "__main__":
+    benchmark_write_latency()
@@ -0,0 +1,306 @@
+import collections
+import heapq
+import logging
+import threading
+import time
+
+import psutil
+
+SORT_KEYS = ("cpu", "memory", "io", "threads")
+
+
+class ProcessRecord:
+    """Latest sample of one process. Records are replaced, never mutated, once published."""
+
+    __slots__ = ("pid", "name", "username", "create_time", "cpu", "cpu_history", "memory_rss",
+                 "memory_percent", "io_rate", "threads", "_cpu_total", "_io_total")
+
+    def __init__(self, pid, name, username, create_time):
+        self.pid = pid
+        self.name = name or ""
+        self.username = username or ""
+        self.create_time = create_time
+        self.cpu = 0.0
+        self.cpu_history = ()
+        self.memory_rss = 0
+        self.memory_percent = 0.0
+        self.io_rate = 0.0
+        self.threads = 0
+        self._cpu_total = None
+        self._io_total = None
+
+    def sort_value(self, key):
+        if key == "cpu":
+            return self.cpu
+        if key == "memory":
+            return self.memory_rss
+        if key == "io":
+            return self.io_rate
+        return self.threads
+
+
+class ProcessSampler:
+    """Keeps a process table up to date from a background thread.
+
+    CPU usage is the delta of each process's CPU time between two samples,
+    as a percentage of all logical CPUs (like Task Manager), so queries never
+    see the 0.0 that a first psutil.cpu_percent() call returns.
+    """
+
+    def __init__(self, interval=2.0, history=30):
+        self.interval = interval
+        self.history = history
+        self._records = {}          # pid -> ProcessRecord, owned by the sampler thread
+        self._histories = {}        # pid -> deque of recent cpu values
+        self._snapshot = []         # published list of records, swapped atomically
+        self._by_name = {}          # published lowercase name -> tuple of pids
+        self._snapshot_time = 0.0
+        self._last_sample = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._sample_lock = threading.Lock()
+        self._cpu_count = psutil.cpu_count() or 1
+        self.stats = {"samples": 0, "last_sample_ms": 0.0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="friday-process-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"Error sampling processes: {e}")
+            # The first two samples are taken close together so CPU figures exist quickly
+            self._stop.wait(0.5 if self.stats["samples"] < 2 else self.interval)
+
+    def sample(self):
+        """Update every process once and publish a new snapshot."""
+        with self._sample_lock:
+            self._sample()
+
+    def _sample(self):
+        started = time.perf_counter()
+        now = time.monotonic()
+        elapsed = now - self._last_sample if self._last_sample is not None else None
+        total_memory = psutil.virtual_memory().total
+        records, seen, started_count = {}, set(), 0
+
+        for proc in psutil.process_iter():
+            pid = proc.pid
+            try:
+                with proc.oneshot():
+                    create_time = proc.create_time()
+                    previous = self._records.get(pid)
+                    if previous is None or previous.create_time != create_time:
+                        # New process (or a reused PID): static fields are read once
+                        try:
+                            username = proc.username()
+                        except (psutil.AccessDenied, KeyError):
+                            username = ""
+                        previous = ProcessRecord(pid, proc.name(), username, create_time)
+                        self._histories[pid] = collections.deque(maxlen=self.history)
+                        started_count += 1
+                    record = ProcessRecord(pid, previous.name, previous.username, create_time)
+
+                    cpu_times = proc.cpu_times()
+                    record._cpu_total = cpu_times.user + cpu_times.system
+                    memory = proc.memory_info()
+                    record.memory_rss = memory.rss
+                    record.memory_percent = memory.rss / total_memory * 100
+                    record.threads = proc.num_threads()
+                    try:
+                        io = proc.io_counters()
+                        record._io_total = io.read_bytes + io.write_bytes
+                    except (psutil.AccessDenied, AttributeError, NotImplementedError):
+                        record._io_total = None
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+
+            history = self._histories[pid]
+            if elapsed and previous._cpu_total is not None:
+                record.cpu = max(0.0, (record._cpu_total - previous._cpu_total) / elapsed * 100
+                                 / self._cpu_count)
+                history.append(record.cpu)
+                if record._io_total is not None and previous._io_total is not None:
+                    record.io_rate = max(0.0, (record._io_total - previous._io_total) / elapsed)
+            record.cpu_history = tuple(history)
+            records[pid] = record
+            seen.add(pid)
+
+        gone = set(self._histories) - seen
+        for pid in gone:
+            del self._histories[pid]
+        by_name = self._by_name
+        if gone or started_count:
+            # Only rebuilt when a process started or exited since the last sample
+            index = collections.defaultdict(list)
+            for record in records.values():
+                index[record.name.lower()].append(record.pid)
+            by_name = {name: tuple(pids) for name, pids in index.items()}
+        self._records = records
+        self._last_sample = now
+        self.stats["samples"] += 1
+        self.stats["last_sample_ms"] = (time.perf_counter() - started) * 1000
+        # Publishing is a single reference swap; readers never see a half-built table
+        self._snapshot = list(records.values())
+        self._by_name = by_name
+        self._snapshot_time = time.time()
+        if elapsed is not None:
+            self._ready.set()
+
+    def snapshot(self, timeout=5.0):
+        """The latest process table, starting the sampler and waiting for CPU deltas if needed."""
+        if not self._ready.is_set():
+            self.start()
+            self._ready.wait(timeout)
+        return self._snapshot
+
+    def top(self, limit=10, sort_by="cpu", name=None, user=None):
+        """The `limit` heaviest processes by sort_by, optionally filtered by name or user
+        substring (case-insensitive). Uses a bounded heap: O(N log limit)."""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+        records = self.snapshot()
+        if name:
+            name = name.lower()
+            records = (r for r in records if name in r.name.lower())
+        if user:
+            user = user.lower()
+            records = (r for r in records if user in r.username.lower())
+        return heapq.nlargest(limit, records, key=lambda r: r.sort_value(sort_by))
+
+    def find_by_name(self, name, refresh_if_missing=True):
+        """Records of processes named `name` (case-insensitive, '.exe' optional).
+
+        A name missing from the index triggers one fresh sample, in case the
+        process started after the last one.
+        """
+        self.snapshot()
+        name = name.lower()
+        names = {name, name[:-4] if name.endswith(".exe") else name + ".exe"}
+        pids = [pid for n in names for pid in self._by_name.get(n, ())]
+        if not pids and refresh_if_missing:
+            self.sample()
+            pids = [pid for n in names for pid in self._by_name.get(n, ())]
+        records = {r.pid: r for r in self._snapshot}
+        return [records[pid] for pid in pids if pid in records]
+
+    @property
+    def age(self):
+        return time.time() - self._snapshot_time if self._snapshot_time else None
+
+
+def terminate_tree(records, timeout=5.0, kill_timeout=2.0, force=False):
+    """Close processes and all their descendants, waiting for all of them at once.
+
+    Everything gets terminate() (or kill() with force), then a single
+    psutil.wait_procs with one deadline; survivors are killed and waited on once more.
+
+    Returns a dict of pid -> (name, outcome), outcome being one of 'terminated',
+    'killed', 'already exited', 'access denied' or 'still running'.
+    """
+    outcomes, procs = {}, {}
+    for record in records:
+        try:
+            proc = psutil.Process(record.pid)
+            if proc.create_time() != record.create_time:
+                # The PID was reused by another process since the sample
+                outcomes[record.pid] = (record.name, "already exited")
+                continue
+            procs[proc.pid] = proc
+            for child in proc.children(recursive=True):
+                procs.setdefault(child.pid, child)
+        except psutil.NoSuchProcess:
+            outcomes[record.pid] = (record.name, "already exited")
+        except psutil.AccessDenied:
+            outcomes[record.pid] = (record.name, "access denied")
+
+    names = {}
+    for pid, proc in list(procs.items()):
+        try:
+            names[pid] = proc.name()
+            if force:
+                proc.kill()
+            else:
+                proc.terminate()
+        except psutil.NoSuchProcess:
+            outcomes[pid] = (names.get(pid, ""), "already exited")
+            del procs[pid]
+        except psutil.AccessDenied:
+            outcomes[pid] = (names.get(pid, ""), "access denied")
+            del procs[pid]
+
+    gone, alive = psutil.wait_procs(list(procs.values()), timeout=timeout)
+    for proc in gone:
+        outcomes[proc.pid] = (names[proc.pid], "killed" if force else "terminated")
+    if alive:
+        for proc in alive:
+            try:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.AccessDenied:
+                outcomes[proc.pid] = (names[proc.pid], "access denied")
+        gone, alive = psutil.wait_procs([p for p in alive if p.pid not in outcomes], timeout=kill_timeout)
+        for proc in gone:
+            outcomes[proc.pid] = (names[proc.pid], "killed")
+        for proc in alive:
+            outcomes[proc.pid] = (names[proc.pid], "still running")
+    return outcomes
+
+
+def _benchmark():
+    sampler = ProcessSampler()
+    start = time.perf_counter()
+    sampler.start()
+    first = sampler.top(10)
+    print(f"First query (sampler cold): {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{len(sampler.snapshot())} processes, one sample costs {sampler.stats['last_sample_ms']:.1f} ms")
+
+    start = time.perf_counter()
+    for sort_by in SORT_KEYS * 25:
+        sampler.top(10, sort_by=sort_by)
+    print(f"100 warm top-10 queries: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
+        pass
+    print(f"One psutil.process_iter pass as the old tool did it: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"(and every CPU value is 0.0 on that first call)")
+    print("Top by CPU:", [(r.name, round(r.cpu, 1)) for r in first[:3]])
+
+    # A "browser": one parent with 40 children, a few of which ignore SIGTERM
+    import subprocess
+    import sys
+    script = ("import signal, subprocess, sys, time\n"
+              "kids = [subprocess.Popen([sys.executable, '-c', "
+              "'import signal, sys, time; signal.signal(signal.SIGTERM, signal.SIG_IGN) if int(sys.argv[1]) % 10 == 0 "
+              "else None; time.sleep(60)', str(i)]) for i in range(40)]\n"
+              "time.sleep(60)\n")
+    parent = subprocess.Popen([sys.executable, "-c", script])
+    while len(psutil.Process(parent.pid).children()) < 40:
+        time.sleep(0.1)
+    time.sleep(1.0)
+    sampler.sample()
+    start = time.perf_counter()
+    outcomes = terminate_tree([r for r in sampler.snapshot() if r.pid == parent.pid], timeout=2.0)
+    counts = collections.Counter(outcome for _, outcome in outcomes.values())
+    print(f"Closed a 41-process tree in {time.perf_counter() - start:.2f}s: {dict(counts)}")
+    parent.wait()
+    sampler.stop()
+
+
+if __name__ == "__main__":
+    _benchmark()
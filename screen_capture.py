@@ -0,0 +1,183 @@
+import base64
+import io
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+
+class Frame:
+    """A captured screen frame living in a ring buffer slot.
+
+    `pixels` is an RGB uint8 view of the slot. The slot is reused once the ring
+    wraps around: consumers that read a frame for long (OCR, saving, waits)
+    either ask get_frame() for a copy or check is_valid() after reading.
+    """
+
+    def __init__(self, service, slot, pixels, timestamp, sequence, origin=(0, 0)):
+        self.service = service
+        self.slot = slot
+        self.pixels = pixels
+        self.timestamp = timestamp
+        self.sequence = sequence
+        self.origin = origin
+        self._png = None
+
+    @property
+    def width(self):
+        return self.pixels.shape[1]
+
+    @property
+    def height(self):
+        return self.pixels.shape[0]
+
+    @property
+    def age(self):
+        return time.monotonic() - self.timestamp
+
+    def is_valid(self):
+        """False once the ring buffer slot has been overwritten by a newer grab (copies stay valid)."""
+        return self.slot is None or self.service.slot_sequence(self.slot) == self.sequence
+
+    def crop(self, x, y, width, height):
+        """Region of this frame as a view, without copying pixels."""
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.width, x + width), min(self.height, y + height)
+        if x0 >= x1 or y0 >= y1:
+            raise ValueError(f"Region {x},{y},{width},{height} is outside the {self.width}x{self.height} frame")
+        return Frame(self.service, self.slot, self.pixels[y0:y1, x0:x1], self.timestamp, self.sequence,
+                     (self.origin[0] + x0, self.origin[1] + y0))
+
+    def copy(self):
+        return Frame(self.service, None, self.pixels.copy(), self.timestamp, None, self.origin)
+
+    def to_image(self):
+        return Image.fromarray(self.pixels)
+
+    def to_png(self):
+        # Encoded only when a consumer asks for bytes, then memoized on the frame
+        if self._png is None:
+            buffer = io.BytesIO()
+            self.to_image().save(buffer, format='PNG')
+            self._png = buffer.getvalue()
+        return self._png
+
+    def to_base64(self):
+        return base64.b64encode(self.to_png()).decode()
+
+    def save(self, path):
+        self.to_image().save(path)
+
+
+class _Grabber:
+    """Grabs the primary screen. Uses mss when it is installed, otherwise pyautogui."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def grab(self):
+        """Return the screen as an (height, width, 3) RGB array view, possibly of a temporary buffer."""
+        try:
+            import mss
+        except ImportError:
+            import pyautogui
+            return np.asarray(pyautogui.screenshot())
+
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+        shot = sct.grab(sct.monitors[1])
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        return bgra[:, :, 2::-1]
+
+
+class ScreenCaptureService:
+    """Keeps the most recent screen frames in a fixed-size ring of preallocated arrays,
+    so back-to-back vision calls can share one grab."""
+
+    def __init__(self, capacity=4, grabber=None):
+        self.capacity = capacity
+        self.grabber = grabber or _Grabber()
+        self._slots = None
+        self._sequences = [None] * capacity
+        self._timestamps = [0.0] * capacity
+        self._next_slot = 0
+        self._latest = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self.stats = {"grabs": 0, "reused": 0}
+
+    def slot_sequence(self, slot):
+        return self._sequences[slot] if slot is not None else None
+
+    def _grab_locked(self):
+        pixels = self.grabber.grab()
+        if self._slots is None or self._slots.shape[1:] != pixels.shape:
+            # First grab, or the resolution changed: (re)allocate the ring once
+            self._slots = np.empty((self.capacity,) + pixels.shape, dtype=np.uint8)
+            self._sequences = [None] * self.capacity
+        slot = self._next_slot
+        np.copyto(self._slots[slot], pixels)
+        self._next_slot = (slot + 1) % self.capacity
+        self._sequence += 1
+        self._sequences[slot] = self._sequence
+        self._timestamps[slot] = time.monotonic()
+        self._latest = slot
+        self.stats["grabs"] += 1
+        return slot
+
+    def get_frame(self, max_age=0.1, region=None, copy=False):
+        """Return a frame no older than max_age seconds, grabbing only if needed.
+
+        Args:
+            max_age: Staleness budget in seconds; 0 always grabs a new frame
+            region: Optional (x, y, width, height) to return as a zero-copy crop
+            copy: Return a frame owning its pixels (only the region is copied), for
+                  consumers that read it for longer than a few grabs may take
+        """
+        with self._lock:
+            slot = self._latest
+            if slot is None or time.monotonic() - self._timestamps[slot] > max_age:
+                slot = self._grab_locked()
+            else:
+                self.stats["reused"] += 1
+            frame = Frame(self, slot, self._slots[slot], self._timestamps[slot], self._sequences[slot])
+            if region is not None:
+                frame = frame.crop(*region)
+            if copy:
+                # Copied under the lock, so no grab can overwrite the slot halfway; the sequence
+                # is kept since the pixels are that grab's, which lets matchers reuse cached work
+                frame = Frame(self, None, frame.pixels.copy(), frame.timestamp, frame.sequence, frame.origin)
+        return frame
+
+    def size(self):
+        frame = self.get_frame(max_age=float("inf"))
+        return frame.width, frame.height
+
+
+def _benchmark():
+    class FakeGrabber:
+        def __init__(self):
+            self.buffer = np.random.randint(0, 255, (2160, 3840, 3), dtype=np.uint8)
+
+        def grab(self):
+            time.sleep(0.03)  # Typical 4K grab cost
+            return self.buffer
+
+    service = ScreenCaptureService(grabber=FakeGrabber())
+    start = time.perf_counter()
+    for _ in range(50):
+        frame = service.get_frame(max_age=0.1)
+        frame.crop(100, 100, 800, 600)
+    elapsed = time.perf_counter() - start
+    print(f"50 vision calls: {elapsed * 1000:.0f} ms, {service.stats['grabs']} grabs, "
+          f"{service.stats['reused']} served from cache")
+
+    start = time.perf_counter()
+    png = service.get_frame(max_age=1.0).to_png()
+    print(f"PNG encode on demand of a 4K frame: {(time.perf_counter() - start) * 1000:.0f} ms ({len(png)} bytes)")
+
+
+if __name__ == "__main__":
+    _benchmark()
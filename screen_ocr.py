@@ -0,0 +1,256 @@
+import collections
+import hashlib
+import re
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Tiles sit on a fixed screen-aligned grid so an unchanged tile hashes the same on every call.
+# Neighbouring tiles overlap, and each word belongs to the tile whose core holds its center,
+# so words up to TILE_OVERLAP pixels wide are recognized whole even across a tile boundary.
+TILE_SIZE = 640
+TILE_OVERLAP = 128
+# Tiles this flat (grayscale standard deviation) hold no text and skip OCR entirely
+BLANK_TILE_STD = 4.0
+TILE_CACHE_SIZE = 1024
+MIN_CONFIDENCE = 50
+
+OcrWord = collections.namedtuple("OcrWord", "text x y width height confidence")
+
+
+def word_center(word):
+    return word.x + word.width // 2, word.y + word.height // 2
+
+
+def tesseract_words(gray, lang="eng"):
+    """Recognize the words in a grayscale tile with Tesseract.
+
+    Returns (text, x, y, width, height, confidence) tuples in tile coordinates.
+    """
+    import pytesseract
+
+    data = pytesseract.image_to_data(gray, lang=lang, config="--psm 11",
+                                     output_type=pytesseract.Output.DICT)
+    words = []
+    for text, x, y, w, h, conf in zip(data["text"], data["left"], data["top"], data["width"],
+                                      data["height"], data["conf"]):
+        text = text.strip()
+        if text and float(conf) >= 0:
+            words.append((text, int(x), int(y), int(w), int(h), float(conf)))
+    return words
+
+
+def recognize_tile(recognizer, gray, lang):
+    """Process pool entry point, kept at module level so it pickles."""
+    return recognizer(gray, lang)
+
+
+def _tokens(text):
+    return [t for t in re.split(r"[^\w]+", text.lower()) if t]
+
+
+def group_lines(words):
+    """Group words into reading-order lines by vertical overlap, across tile boundaries."""
+    lines = []
+    for word in sorted(words, key=lambda w: w.y + w.height / 2):
+        center = word.y + word.height / 2
+        if lines:
+            last = lines[-1]
+            top, bottom = last[0].y, last[0].y + last[0].height
+            if top <= center <= bottom:
+                last.append(word)
+                continue
+        lines.append([word])
+    return [sorted(line, key=lambda w: w.x) for line in lines]
+
+
+def find_phrase(words, query):
+    """Boxes of every run of consecutive words on a line matching the query, best first.
+
+    A one-word query matches inside a word ("save" finds "Autosave"). In longer
+    queries the first token may match a word's suffix and the last a prefix, and
+    inner tokens must match exactly. Exact matches rank first.
+    """
+    wanted = _tokens(query)
+    if not wanted:
+        return []
+    found = []
+    for line in group_lines(words):
+        tokens = [" ".join(_tokens(w.text)) for w in line]
+        for start in range(len(line) - len(wanted) + 1):
+            run = tokens[start:start + len(wanted)]
+            if len(wanted) == 1:
+                ok = wanted[0] in run[0]
+            else:
+                ok = (run[0].endswith(wanted[0]) and run[-1].startswith(wanted[-1])
+                      and run[1:-1] == wanted[1:-1])
+            if not ok:
+                continue
+            boxes = line[start:start + len(wanted)]
+            x0, y0 = min(w.x for w in boxes), min(w.y for w in boxes)
+            x1 = max(w.x + w.width for w in boxes)
+            y1 = max(w.y + w.height for w in boxes)
+            exact = all(t == q for t, q in zip(run, wanted))
+            found.append((exact, min(w.confidence for w in boxes),
+                          OcrWord(" ".join(w.text for w in boxes), x0, y0, x1 - x0, y1 - y0,
+                                  min(w.confidence for w in boxes))))
+    found.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    return [word for _, _, word in found]
+
+
+class ScreenOCR:
+    """Tiled OCR over screen frames. Results are cached per tile content hash, so only
+    tiles that changed since an earlier call are recognized again, in parallel."""
+
+    def __init__(self, recognizer=tesseract_words, lang="eng", cache_size=TILE_CACHE_SIZE,
+                 min_confidence=MIN_CONFIDENCE):
+        self.recognizer = recognizer
+        self.lang = lang
+        self.cache_size = cache_size
+        self.min_confidence = min_confidence
+        self._cache = collections.OrderedDict()   # (digest, shape, lang) -> words in tile coordinates
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "blank": 0}
+
+    def _tiles(self, frame):
+        """Yield (x, y, core) for the grid tiles overlapping the frame, in frame coordinates.
+
+        core is the (x0, y0, x1, y1) screen-space area whose words this tile owns.
+        """
+        step = TILE_SIZE - TILE_OVERLAP
+        half = TILE_OVERLAP // 2
+        ox, oy = frame.origin
+        first_col, first_row = max(0, (ox - TILE_OVERLAP) // step), max(0, (oy - TILE_OVERLAP) // step)
+        for row in range(first_row, (oy + frame.height) // step + 1):
+            for col in range(first_col, (ox + frame.width) // step + 1):
+                sx, sy = col * step, row * step
+                if sx + TILE_SIZE <= ox or sy + TILE_SIZE <= oy:
+                    continue
+                if sx >= ox + frame.width or sy >= oy + frame.height:
+                    continue
+                core = (sx + half if col else -1, sy + half if row else -1,
+                        sx + step + half, sy + step + half)
+                yield sx - ox, sy - oy, core
+
+    def recognize(self, frame, executor=None):
+        """All words in the frame, in screen coordinates.
+
+        Args:
+            frame: Frame (or crop) to read
+            executor: Optional process pool; uncached tiles are recognized in parallel on it
+        """
+        if frame.pixels.ndim == 3:
+            gray = cv2.cvtColor(frame.pixels, cv2.COLOR_RGB2GRAY)
+        else:
+            gray = frame.pixels
+        ox, oy = frame.origin
+
+        tiles, pending = [], {}
+        for x, y, core in self._tiles(frame):
+            x0, y0 = max(0, x), max(0, y)
+            tile = np.ascontiguousarray(gray[y0:y + TILE_SIZE, x0:x + TILE_SIZE])
+            key = (hashlib.blake2b(tile.data, digest_size=16).digest(), tile.shape, self.lang)
+            tiles.append((x0 + ox, y0 + oy, core, key))
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.stats["hits"] += 1
+                    continue
+            if key in pending:
+                continue
+            if tile.std() < BLANK_TILE_STD:
+                self.stats["blank"] += 1
+                self._store(key, [])
+                continue
+            self.stats["misses"] += 1
+            if executor is not None:
+                pending[key] = executor.submit(recognize_tile, self.recognizer, tile, self.lang)
+            else:
+                pending[key] = self.recognizer(tile, self.lang)
+
+        local = {}
+        for key, result in pending.items():
+            local[key] = result.result() if executor is not None else result
+            self._store(key, local[key])
+
+        words = []
+        for tx, ty, (cx0, cy0, cx1, cy1), key in tiles:
+            tile_words = local.get(key)
+            if tile_words is None:
+                with self._lock:
+                    tile_words = self._cache.get(key, [])
+            for text, x, y, w, h, conf in tile_words:
+                if conf < self.min_confidence:
+                    continue
+                sx, sy = tx + x, ty + y
+                center_x, center_y = sx + w // 2, sy + h // 2
+                if cx0 <= center_x < cx1 and cy0 <= center_y < cy1:
+                    words.append(OcrWord(text, sx, sy, w, h, conf))
+        return words
+
+    def _store(self, key, words):
+        with self._lock:
+            self._cache[key] = words
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def find(self, frame, text, executor=None):
+        """Boxes of the text in the frame, best match first."""
+        return find_phrase(self.recognize(frame, executor), text)
+
+
+def _simulated_words(gray, lang="eng"):
+    """Stand-in recognizer for the benchmark when Tesseract is not installed: costs about
+    as much as Tesseract on a text-bearing tile and reports no words."""
+    time.sleep(0.15)
+    return []
+
+
+def _benchmark():
+    from concurrent.futures import ProcessPoolExecutor
+
+    from screen_capture import ScreenCaptureService
+
+    try:
+        recognizer = tesseract_words
+        tesseract_words(np.full((32, 32), 255, dtype=np.uint8))
+    except Exception:
+        print("Tesseract not available, using a simulated 150 ms/tile recognizer")
+        recognizer = _simulated_words
+
+    screen = np.full((2160, 3840, 3), 235, dtype=np.uint8)
+    for i in range(60):
+        cv2.putText(screen, f"Menu item {i} Save Open Close", (40 + (i % 3) * 1250, 60 + (i // 3) * 100),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (20, 20, 20), 2)
+
+    class StaticGrabber:
+        def grab(self):
+            return screen
+
+    service = ScreenCaptureService(grabber=StaticGrabber())
+    ocr = ScreenOCR(recognizer=recognizer)
+    with ProcessPoolExecutor() as pool:
+        start = time.perf_counter()
+        words = ocr.recognize(service.get_frame(max_age=0), pool)
+        cold = time.perf_counter() - start
+        print(f"Cold 4K OCR: {cold * 1000:.0f} ms, {ocr.stats['misses']} tiles recognized, "
+              f"{ocr.stats['blank']} blank, {len(words)} words")
+
+        start = time.perf_counter()
+        ocr.recognize(service.get_frame(max_age=0), pool)
+        print(f"Warm 4K OCR (nothing changed): {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        cv2.putText(screen, "Dialog: Save changes?", (1500, 1000), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+        misses = ocr.stats["misses"]
+        start = time.perf_counter()
+        ocr.recognize(service.get_frame(max_age=0), pool)
+        print(f"Warm 4K OCR after a dialog appeared: {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"{ocr.stats['misses'] - misses} tile(s) recognized again")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,171 @@
+import time
+
+import cv2
+import numpy as np
+
+# Random odd multipliers for the per-tile polynomial hash
+_HASH_WEIGHTS = np.random.default_rng(1234).integers(1, 2**63, size=4096, dtype=np.uint64) | np.uint64(1)
+
+
+class TileSignature:
+    """Per-tile hashes of a downsampled grayscale frame."""
+
+    def __init__(self, hashes, tile_size, scale, origin):
+        self.hashes = hashes
+        self.tile_size = tile_size
+        self.scale = scale
+        self.origin = origin
+
+
+class ScreenDiffEngine:
+    """Detects which parts of the screen changed by hashing tiles of downsampled frames."""
+
+    def __init__(self, downsample=2, tile_size=32, quantize_bits=3):
+        self.downsample = downsample        # sampling stride; area resizing a 4K frame costs ~10x more
+        self.tile_size = tile_size          # in downsampled pixels, 64 screen pixels by default
+        self.quantize_bits = quantize_bits  # low bits dropped so compression noise does not count
+
+    def signature(self, frame):
+        step = self.downsample
+        # The green channel alone carries most of the luminance
+        small = frame.pixels[::step, ::step, 1] if frame.pixels.ndim == 3 else frame.pixels[::step, ::step]
+
+        t = self.tile_size
+        rows, cols = -(-small.shape[0] // t), -(-small.shape[1] // t)
+        padded = np.zeros((rows * t, cols * t), dtype=np.uint8)
+        np.right_shift(small, self.quantize_bits, out=padded[:small.shape[0], :small.shape[1]])
+        # Hash eight pixels per 64-bit word: tile_size must be a multiple of 8
+        words = padded.view(np.uint64).reshape(rows, t, cols, t // 8)
+        weights = _HASH_WEIGHTS[:t * t // 8].reshape(t, 1, t // 8)
+        # Unsigned overflow wraps around, which is what the hash wants
+        with np.errstate(over="ignore"):
+            hashes = (words * weights).sum(axis=(1, 3), dtype=np.uint64)
+        return TileSignature(hashes, t, self.downsample, frame.origin)
+
+    def dirty_regions(self, before, after):
+        """Bounding boxes (x, y, width, height) in screen coordinates of the tiles that changed."""
+        if before.hashes.shape != after.hashes.shape:
+            return [(after.origin[0], after.origin[1],
+                     after.hashes.shape[1] * after.tile_size * after.scale,
+                     after.hashes.shape[0] * after.tile_size * after.scale)]
+
+        dirty = (before.hashes != after.hashes).astype(np.uint8)
+        if not dirty.any():
+            return []
+        count, _, stats, _ = cv2.connectedComponentsWithStats(dirty, connectivity=8)
+        step = after.tile_size * after.scale
+        regions = []
+        for x, y, w, h, _ in stats[1:count]:
+            regions.append((after.origin[0] + int(x) * step, after.origin[1] + int(y) * step,
+                            int(w) * step, int(h) * step))
+        regions.sort(key=lambda r: r[2] * r[3], reverse=True)
+        return regions
+
+
+class ScreenWatcher:
+    """Blocking waits for screen changes or template appearances, meant to run off the event loop."""
+
+    def __init__(self, capture, matcher, engine=None, interval=0.1):
+        self.capture = capture
+        self.matcher = matcher
+        self.engine = engine or ScreenDiffEngine()
+        self.interval = interval
+
+    def _frame(self, region):
+        return self.capture.get_frame(max_age=self.interval / 2, region=region)
+
+    def _read(self, region, read):
+        """(frame, read(frame)), on a new frame if the ring slot was overwritten while it was being read."""
+        while True:
+            frame = self._frame(region)
+            result = read(frame)
+            if frame.is_valid():
+                return frame, result
+
+    def wait_for_change(self, timeout=10.0, region=None, min_area=0):
+        """Wait until part of the screen (or of region) changes.
+
+        Returns a dict with the changed regions (empty on timeout), elapsed seconds
+        and the CPU seconds spent per second of watching.
+        """
+        start, cpu_start = time.monotonic(), time.thread_time()
+        _, baseline = self._read(region, self.engine.signature)
+        regions = []
+        while time.monotonic() - start < timeout:
+            time.sleep(self.interval)
+            _, current = self._read(region, self.engine.signature)
+            regions = [r for r in self.engine.dirty_regions(baseline, current) if r[2] * r[3] >= min_area]
+            if regions:
+                break
+        elapsed = time.monotonic() - start
+        return {"regions": regions, "elapsed": elapsed,
+                "cpu_per_second": (time.thread_time() - cpu_start) / elapsed if elapsed else 0.0}
+
+    def wait_for_template(self, template_path, timeout=10.0, threshold=0.8, region=None):
+        """Wait until a template is visible. Matching only reruns in tiles that changed.
+
+        Returns a dict with the match (None on timeout), elapsed seconds and CPU per second.
+        """
+        start, cpu_start = time.monotonic(), time.thread_time()
+        template = self.matcher.template(template_path).gray
+        pad_x, pad_y = template.shape[1], template.shape[0]
+
+        def first_look(frame):
+            return (self.engine.signature(frame),
+                    self.matcher.find(frame, template_path, threshold=threshold, max_results=1))
+
+        def changed_areas(frame):
+            current = self.engine.signature(frame)
+            found = []
+            for x, y, w, h in self.engine.dirty_regions(signature, current):
+                # Grow each dirty area by the template size so a template straddling its edge is found
+                area = (x - pad_x - frame.origin[0], y - pad_y - frame.origin[1], w + 2 * pad_x, h + 2 * pad_y)
+                try:
+                    target = frame.crop(*area)
+                except ValueError:
+                    continue
+                found = self.matcher.find(target, template_path, threshold=threshold, max_results=1,
+                                          use_last_location=False)
+                if found:
+                    break
+            return current, found
+
+        _, (signature, matches) = self._read(region, first_look)
+        while not matches and time.monotonic() - start < timeout:
+            time.sleep(self.interval)
+            _, (signature, matches) = self._read(region, changed_areas)
+        elapsed = time.monotonic() - start
+        return {"match": matches[0] if matches else None, "elapsed": elapsed,
+                "cpu_per_second": (time.thread_time() - cpu_start) / elapsed if elapsed else 0.0}
+
+
+def _benchmark():
+    """Watch a static 4K screen for a few seconds, then report detection of a small change."""
+    import threading
+
+    from screen_capture import ScreenCaptureService
+    from template_matching import TemplateMatcher
+
+    rng = np.random.default_rng(2)
+    screen = cv2.resize(rng.integers(0, 255, (270, 480, 3), dtype=np.uint8), (3840, 2160))
+
+    class StaticGrabber:
+        def grab(self):
+            return screen
+
+    watcher = ScreenWatcher(ScreenCaptureService(grabber=StaticGrabber()), TemplateMatcher())
+    result = watcher.wait_for_change(timeout=3.0)
+    print(f"Idle watch of a 4K screen for {result['elapsed']:.1f}s: "
+          f"{result['cpu_per_second'] * 100:.1f}% of one core")
+
+    def change_later():
+        time.sleep(1.0)
+        screen[1000:1040, 2000:2200] = 255
+
+    threading.Thread(target=change_later).start()
+    result = watcher.wait_for_change(timeout=5.0)
+    print(f"Change detected after {result['elapsed']:.2f}s in {result['regions']}")
+
+
+if __name__ == "__main__":
+    _benchmark()
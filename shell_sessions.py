@@ -0,0 +1,257 @@
+import asyncio
+import base64
+import os
+import secrets
+import shlex
+import shutil
+import signal
+import subprocess
+import time
+
+from command_runner import OutputBuffer, READ_CHUNK, _kill_group
+
+
+def _shell_command():
+    if os.name == "nt":
+        shell = shutil.which("pwsh") or shutil.which("powershell") or "powershell"
+        return [shell, "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"]
+    return [shutil.which("bash") or "/bin/sh"]
+
+
+class ShellSession:
+    """One long-lived shell that commands are written into through stdin.
+
+    Each command is followed by a unique marker echoed to stdout (with the
+    exit code) and to stderr, so the reader knows where its output ends
+    without the shell ever exiting. Working directory, variables and
+    anything the shell sourced at startup carry over between commands.
+    """
+
+    def __init__(self, session_id, cwd=None):
+        self.session_id = session_id
+        self.cwd = cwd
+        self.proc = None
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.commands = 0
+        self._token = secrets.token_hex(8)
+
+    @property
+    def alive(self):
+        return self.proc is not None and self.proc.returncode is None
+
+    async def start(self):
+        args = _shell_command()
+        if os.name == "nt":
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}
+        self.proc = await asyncio.create_subprocess_exec(
+            *args, cwd=self.cwd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE, **group)
+
+    def _script(self, command, marker, cwd=None):
+        if os.name == "nt":
+            if cwd:
+                command = "Set-Location -LiteralPath '" + cwd.replace("'", "''") + "'\n" + command
+            # The shell runs stdin line by line, so a multi-line command travels base64 encoded on one line
+            encoded = base64.b64encode(command.encode("utf-8")).decode()
+            # Dot-sourced so variables persist
+            return (f". ([ScriptBlock]::Create([Text.Encoding]::UTF8.GetString("
+                    f"[Convert]::FromBase64String('{encoded}')))); "
+                    f"$__friday_status = if ($?) {{ 0 }} elseif ($LASTEXITCODE) {{ $LASTEXITCODE }} else {{ 1 }}; "
+                    f"[Console]::Out.Write(\"`n{marker} $__friday_status`n\"); "
+                    f"[Console]::Error.Write(\"`n{marker}`n\")\n")
+        if cwd:
+            command = f"cd {shlex.quote(cwd)} && {command}"
+        quoted = shlex.quote(command)
+        # eval keeps cd and variables in this shell; stdin is closed so the command cannot eat the next script
+        return (f"eval {quoted} </dev/null\n"
+                f"__friday_status=$?\n"
+                f"printf '\\n%s %d\\n' '{marker}' \"$__friday_status\"\n"
+                f"printf '\\n%s\\n' '{marker}' >&2\n")
+
+    @staticmethod
+    async def _read_until(stream, marker, buffer):
+        """Copy stream into buffer up to the marker line; returns the rest of that line, or None at EOF."""
+        marker = b"\n" + marker
+        pending = b""
+        while True:
+            index = pending.find(marker)
+            if index >= 0:
+                buffer.write(pending[:index])
+                rest = pending[index + len(marker):]
+                while b"\n" not in rest:
+                    data = await stream.read(64)
+                    if not data:
+                        break
+                    rest += data
+                return rest.split(b"\n", 1)[0].strip()
+            # Hold back enough bytes to find a marker split across reads
+            keep = len(marker) - 1
+            if len(pending) > keep:
+                buffer.write(pending[:-keep])
+                pending = pending[-keep:]
+            data = await stream.read(READ_CHUNK)
+            if not data:
+                buffer.write(pending)
+                return None
+            pending += data
+
+    async def run(self, command, timeout=30.0, cwd=None):
+        """Run one command, after changing to cwd (which then sticks).
+
+        Returns (exit_code, stdout, stderr, state) with state 'ok', 'timeout' or 'crashed'.
+        """
+        self.commands += 1
+        marker = f"__FRIDAY_{self._token}_{self.commands}__"
+        stdout, stderr = OutputBuffer(), OutputBuffer()
+        try:
+            self.proc.stdin.write(self._script(command, marker, cwd).encode())
+            await self.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            await self.proc.wait()
+            return self.proc.returncode, stdout, stderr, "crashed"
+        readers = asyncio.gather(self._read_until(self.proc.stdout, marker.encode(), stdout),
+                                 self._read_until(self.proc.stderr, marker.encode(), stderr))
+        try:
+            status, _ = await asyncio.wait_for(asyncio.shield(readers), timeout)
+        except asyncio.TimeoutError:
+            # The shell is stuck inside the command: drop the whole session
+            await self.close()
+            readers.cancel()
+            return None, stdout, stderr, "timeout"
+        except asyncio.CancelledError:
+            await asyncio.shield(self.close())
+            readers.cancel()
+            raise
+        finally:
+            self.last_used = time.monotonic()
+        if status is None:
+            await self.close()
+            return self.proc.returncode, stdout, stderr, "crashed"
+        return int(status or 0), stdout, stderr, "ok"
+
+    async def close(self):
+        if not self.alive:
+            return
+        _kill_group(self.proc, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(self.proc.wait(), 2.0)
+        except asyncio.TimeoutError:
+            _kill_group(self.proc, getattr(signal, "SIGKILL", signal.SIGTERM))
+            await self.proc.wait()
+
+
+class ShellPool:
+    """Warm shell sessions keyed by session id.
+
+    Sessions idle for longer than idle_timeout are closed, the least recently
+    used idle session makes room once max_sessions are open, and a session
+    whose shell died or timed out is started again on its next command.
+    """
+
+    def __init__(self, max_sessions=4, idle_timeout=600.0):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self.stats = {"started": 0, "evicted": 0, "restarted": 0}
+
+    async def _evict(self, keep, make_room):
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            if session_id != keep and not session.lock.locked() and now - session.last_used > self.idle_timeout:
+                del self._sessions[session_id]
+                await session.close()
+                self.stats["evicted"] += 1
+        while make_room and len(self._sessions) >= self.max_sessions:
+            idle = [s for s in self._sessions.values() if not s.lock.locked()]
+            if not idle:
+                break
+            oldest = min(idle, key=lambda s: s.last_used)
+            del self._sessions[oldest.session_id]
+            await oldest.close()
+            self.stats["evicted"] += 1
+
+    async def _session(self, session_id, cwd):
+        await self._evict(session_id, make_room=session_id not in self._sessions)
+        # Looked up after the await: a concurrent first call may have created the session meanwhile
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = ShellSession(session_id, cwd)
+        return session
+
+    async def run(self, session_id, command, timeout=30.0, cwd=None):
+        """Run a command in a session, starting (or restarting) its shell if needed.
+
+        Returns (exit_code, stdout, stderr, state); state is 'ok', 'timeout',
+        'crashed', or 'restarted' when an earlier shell of this session had died.
+        """
+        session = await self._session(session_id, cwd)
+        async with session.lock:
+            restarted = session.proc is not None and not session.alive
+            if not session.alive:
+                await session.start()
+                self.stats["started"] += 1
+                self.stats["restarted"] += restarted
+            result = await session.run(command, timeout, cwd)
+        if result[3] == "ok" and restarted:
+            return result[:3] + ("restarted",)
+        return result
+
+    async def close(self):
+        for session in list(self._sessions.values()):
+            await session.close()
+        self._sessions.clear()
+
+
+def _benchmark():
+    import tempfile
+
+    from command_runner import CommandRunner
+
+    rc = tempfile.NamedTemporaryFile("w", suffix=".sh", delete=False)
+    # Stands in for a heavy rc file: a short sleep plus a few hundred function definitions
+    rc.write("sleep 0.02\n" + "".join(f"f{i}() {{ echo {i}; }}\n" for i in range(500)))
+    rc.close()
+    os.environ["BASH_ENV"] = rc.name
+
+    async def main():
+        runner, pool = CommandRunner(), ShellPool()
+        count = 100
+
+        start = time.monotonic()
+        for i in range(count):
+            await runner.run(f"bash -c 'echo {i}'")
+        cold = (time.monotonic() - start) / count
+
+        await pool.run("bench", "true")   # Pay the startup once, outside the timing
+        start = time.monotonic()
+        for i in range(count):
+            code, out, _, _ = await pool.run("bench", f"echo {i}")
+            assert code == 0 and out.text().strip() == str(i)
+        warm = (time.monotonic() - start) / count
+        print(f"{count} small commands: cold spawn {cold * 1000:.1f} ms/command, "
+              f"warm session {warm * 1000:.2f} ms/command ({cold / warm:.0f}x)")
+
+        await pool.run("bench", "cd /tmp && export GREETING=hello")
+        _, out, _, _ = await pool.run("bench", "pwd; echo $GREETING; false")
+        code, _, _, _ = await pool.run("bench", "false")
+        print(f"State carries over: {out.text().split()}, exit code of 'false' is {code}")
+
+        code, out, _, state = await pool.run("bench", "exit 7")
+        code2, out2, _, state2 = await pool.run("bench", "pwd")
+        print(f"Crash recovery: 'exit 7' -> {state} ({code}), next command -> {state2}, cwd {out2.text().strip()}")
+
+        code, out, _, state = await pool.run("bench", "echo started; sleep 30", timeout=0.5)
+        print(f"Timeout: {state}, partial output {out.text().strip()!r}")
+        await pool.close()
+
+    try:
+        asyncio.run(main())
+    finally:
+        os.unlink(rc.name)
+
+
+if __name__ == "__main__":
+    _benchmark()
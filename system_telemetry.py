@@ -0,0 +1,223 @@
+import logging
+import threading
+import time
+
+import numpy as np
+import psutil
+
+# Sensors are slow to read on some platforms and change slowly, so they are read every Nth sample
+SLOW_SENSOR_EVERY = 10
+
+
+class RingBuffer:
+    """Fixed-size NumPy ring of samples; each sample may itself be a vector (e.g. per-core CPU)."""
+
+    def __init__(self, capacity, width=None, dtype=np.float32):
+        shape = (capacity,) if width is None else (capacity, width)
+        self._data = np.full(shape, np.nan, dtype=dtype)
+        self.capacity = capacity
+        self._next = 0
+        self.count = 0
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def latest(self):
+        return self._data[(self._next - 1) % self.capacity] if self.count else None
+
+    def last(self, n):
+        """The newest n samples, oldest first (a copy only when the window wraps)."""
+        n = min(n, self.count)
+        if n == 0:
+            return self._data[:0]
+        start = (self._next - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._data[start:start + n]
+        return np.concatenate((self._data[start:], self._data[:self._next]))
+
+
+class TelemetryService:
+    """Samples system counters on a background thread into ring buffers, so queries
+    are answered instantly and can describe trends over the buffered window."""
+
+    def __init__(self, interval=1.0, capacity=3600):
+        self.interval = interval
+        self.capacity = capacity
+        self.cores = psutil.cpu_count() or 1
+        self.timestamps = RingBuffer(capacity, dtype=np.float64)
+        self.cpu = RingBuffer(capacity, self.cores)       # percent per logical core
+        self.memory = RingBuffer(capacity)                # percent
+        self.disk_read = RingBuffer(capacity)             # bytes/s
+        self.disk_write = RingBuffer(capacity)
+        self.net_sent = RingBuffer(capacity)              # bytes/s
+        self.net_recv = RingBuffer(capacity)
+        self.temperature = RingBuffer(capacity)           # hottest sensor, degrees C
+        self.battery = RingBuffer(capacity)               # percent
+        self._plugged = None
+        self._battery_secs_left = None
+        self._last_counters = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._cpu_seconds = 0.0
+        self._started = None
+        self._samples = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                psutil.cpu_percent(percpu=True)   # Primes the per-core counters
+                self._started = time.monotonic()
+                self._thread = threading.Thread(target=self._run, name="friday-telemetry", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+
+    def _run(self):
+        # The first sample comes quickly so a query right after startup does not wait a full interval
+        self._stop.wait(min(self.interval, 0.25))
+        while not self._stop.is_set():
+            cpu_start = time.thread_time()
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"Error sampling system telemetry: {e}")
+            self._cpu_seconds += time.thread_time() - cpu_start
+            self._stop.wait(self.interval)
+
+    def _read_slow_sensors(self):
+        temperature = np.nan
+        sensors = getattr(psutil, "sensors_temperatures", None)
+        if sensors is not None:
+            try:
+                readings = [t.current for entries in sensors().values() for t in entries if t.current]
+                if readings:
+                    temperature = max(readings)
+            except Exception:
+                pass
+        battery = getattr(psutil, "sensors_battery", None)
+        battery = battery() if battery is not None else None
+        if battery is not None:
+            self._plugged = battery.power_plugged
+            self._battery_secs_left = battery.secsleft if battery.secsleft not in (
+                psutil.POWER_TIME_UNLIMITED, psutil.POWER_TIME_UNKNOWN) else None
+            return temperature, battery.percent
+        return temperature, np.nan
+
+    def sample(self):
+        now = time.monotonic()
+        cpu = psutil.cpu_percent(percpu=True)
+        memory = psutil.virtual_memory().percent
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        counters = (now, disk.read_bytes if disk else 0, disk.write_bytes if disk else 0,
+                    net.bytes_sent, net.bytes_recv)
+
+        rates = (np.nan,) * 4
+        if self._last_counters is not None:
+            elapsed = now - self._last_counters[0]
+            rates = tuple(max(0.0, (new - old) / elapsed)
+                          for new, old in zip(counters[1:], self._last_counters[1:]))
+        self._last_counters = counters
+
+        if self._samples % SLOW_SENSOR_EVERY == 0:
+            temperature, battery = self._read_slow_sensors()
+        else:
+            temperature, battery = self.temperature.latest(), self.battery.latest()
+
+        with self._lock:
+            self.timestamps.append(now)
+            self.cpu.append(cpu)
+            self.memory.append(memory)
+            self.disk_read.append(rates[0])
+            self.disk_write.append(rates[1])
+            self.net_sent.append(rates[2])
+            self.net_recv.append(rates[3])
+            self.temperature.append(temperature)
+            self.battery.append(battery)
+        self._samples += 1
+        self._ready.set()
+
+    def _window(self, seconds):
+        """Number of buffered samples taken in the last `seconds`."""
+        times = self.timestamps.last(self.timestamps.count)
+        if not len(times):
+            return 0
+        return len(times) - int(np.searchsorted(times, times[-1] - seconds, side="left"))
+
+    def summary(self, window=300.0, timeout=2.0):
+        """Current values plus averages and peaks over the last `window` seconds.
+
+        Starts the service if needed and waits up to `timeout` for the first sample.
+        Values that cannot be measured on this system are None.
+        """
+        if not self._ready.is_set():
+            self.start()
+            self._ready.wait(timeout)
+
+        def stat(values, reduce):
+            values = values[~np.isnan(values)]
+            return float(reduce(values)) if len(values) else None
+
+        with self._lock:
+            n = self._window(window)
+            cpu = self.cpu.last(n)
+            total_cpu = np.nanmean(cpu, axis=1) if len(cpu) else cpu
+            result = {
+                "window": float(self.timestamps.latest() - self.timestamps.last(n)[0]) if n else 0.0,
+                "samples": n,
+                "cores": self.cores,
+                "cpu": stat(total_cpu[-1:], np.mean),
+                "cpu_per_core": [round(float(v), 1) for v in cpu[-1]] if n else [],
+                "cpu_avg": stat(total_cpu, np.mean),
+                "cpu_peak": stat(total_cpu, np.max),
+                "memory": stat(self.memory.last(n)[-1:], np.mean),
+                "memory_avg": stat(self.memory.last(n), np.mean),
+                "memory_peak": stat(self.memory.last(n), np.max),
+                "temperature": stat(self.temperature.last(n)[-1:], np.mean),
+                "temperature_peak": stat(self.temperature.last(n), np.max),
+                "battery": stat(self.battery.last(n)[-1:], np.mean),
+                "battery_plugged": self._plugged,
+                "battery_secs_left": self._battery_secs_left,
+            }
+            for name in ("disk_read", "disk_write", "net_sent", "net_recv"):
+                values = getattr(self, name).last(n)
+                result[name] = stat(values[-1:], np.mean)
+                result[f"{name}_avg"] = stat(values, np.mean)
+                result[f"{name}_peak"] = stat(values, np.max)
+        return result
+
+    def overhead(self):
+        """Fraction of one core spent sampling since start()."""
+        if self._started is None:
+            return 0.0
+        return self._cpu_seconds / max(time.monotonic() - self._started, 1e-9)
+
+
+def _benchmark():
+    service = TelemetryService(interval=0.5)
+    start = time.perf_counter()
+    service.summary()
+    print(f"First query after start: {(time.perf_counter() - start) * 1000:.0f} ms")
+    time.sleep(10)
+    start = time.perf_counter()
+    for _ in range(100):
+        summary = service.summary(window=300)
+    print(f"100 queries over {summary['samples']} samples: {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    psutil.cpu_percent(interval=1)
+    print(f"The old blocking cpu_percent(interval=1): {(time.perf_counter() - start) * 1000:.0f} ms")
+    print(f"Sampler overhead at {service.interval}s interval: {service.overhead() * 100:.3f}% of one core")
+    print(f"CPU now {summary['cpu']:.1f}%, avg {summary['cpu_avg']:.1f}%, peak {summary['cpu_peak']:.1f}%")
+    service.stop()
+
+
+if __name__ == "__main__":
+    _benchmark()
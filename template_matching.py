@@ -0,0 +1,372 @@
+import collections
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from screen_capture import Frame
+
+# Coarse levels stop once the template's short side would drop below this
+MIN_COARSE_TEMPLATE_SIDE = 12
+# Coarse candidates are accepted this far below the final threshold per pyramid level,
+# then verified at full size (downsampling smears template borders into the background)
+COARSE_MARGIN_PER_LEVEL = 0.2
+MIN_COARSE_SCORE = 0.3
+MAX_COARSE_CANDIDATES = 64
+# Number of recent frames (or crops) whose grayscale pyramids are kept
+FRAME_CACHE_SIZE = 4
+
+Match = collections.namedtuple("Match", "x y width height score scale")
+
+
+def match_center(match):
+    return match.x + match.width // 2, match.y + match.height // 2
+
+
+def non_max_suppression(matches, overlap=0.3):
+    """Greedy NMS: keep the best match and drop any that overlap it by more than `overlap` IoU."""
+    kept = []
+    for m in sorted(matches, key=lambda m: m.score, reverse=True):
+        for k in kept:
+            ix = max(0, min(m.x + m.width, k.x + k.width) - max(m.x, k.x))
+            iy = max(0, min(m.y + m.height, k.y + k.height) - max(m.y, k.y))
+            inter = ix * iy
+            union = m.width * m.height + k.width * k.height - inter
+            if union and inter / union > overlap:
+                break
+        else:
+            kept.append(m)
+    return kept
+
+
+def _peaks(result, threshold, limit):
+    """Local maxima of a matchTemplate result map at or above threshold, best first."""
+    dilated = cv2.dilate(result, np.ones((3, 3), np.uint8))
+    ys, xs = np.nonzero((result >= threshold) & (result >= dilated))
+    if len(xs) > limit:
+        best = np.argpartition(-result[ys, xs], limit - 1)[:limit]
+        ys, xs = ys[best], xs[best]
+    order = np.argsort(-result[ys, xs])
+    return [(int(xs[i]), int(ys[i]), float(result[ys[i], xs[i]])) for i in order]
+
+
+class PreparedTemplate:
+    """A decoded grayscale template with its scaled variants and pyramid levels."""
+
+    def __init__(self, gray):
+        self.gray = gray
+        self._variants = {}
+
+    def variant(self, scale, level):
+        """Template resized by `scale`, then downsampled `level` times with pyrDown."""
+        key = (scale, level)
+        image = self._variants.get(key)
+        if image is None:
+            if level == 0:
+                if scale == 1.0:
+                    image = self.gray
+                else:
+                    height, width = self.gray.shape
+                    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                    image = cv2.resize(self.gray, size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+            else:
+                image = cv2.pyrDown(self.variant(scale, level - 1))
+            self._variants[key] = image
+        return image
+
+
+class TemplateMatcher:
+    """Template matching with cached templates, coarse-to-fine pyramid search,
+    region-of-interest and last-location hints, and multi-scale matching."""
+
+    def __init__(self, cache_size=64):
+        self.cache_size = cache_size
+        self._templates = collections.OrderedDict()   # (path, mtime_ns) -> PreparedTemplate
+        self._last_locations = {}                     # path -> Match
+        self._frame_pyramids = collections.OrderedDict()   # frame key -> grayscale pyramid levels
+        self._lock = threading.Lock()
+
+    def template(self, path):
+        path = os.path.abspath(path)
+        key = (path, os.stat(path).st_mtime_ns)
+        with self._lock:
+            prepared = self._templates.get(key)
+            if prepared is not None:
+                self._templates.move_to_end(key)
+                return prepared
+
+        # imdecode instead of imread so non-ASCII paths work on Windows
+        gray = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError(f"Could not decode template image: {path}")
+        prepared = PreparedTemplate(gray)
+        with self._lock:
+            for stale in [k for k in self._templates if k[0] == path]:
+                del self._templates[stale]
+            self._templates[key] = prepared
+            while len(self._templates) > self.cache_size:
+                self._templates.popitem(last=False)
+        return prepared
+
+    def frame_level(self, frame, level):
+        """Grayscale pyramid level of a frame, cached for the most recent frames and crops."""
+        key = (frame.sequence, frame.origin, frame.pixels.shape) if frame.sequence is not None else None
+        with self._lock:
+            pyramid = self._frame_pyramids.get(key) if key is not None else None
+            if pyramid is None:
+                pixels = frame.pixels
+                pyramid = [pixels if pixels.ndim == 2 else cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)]
+                # A ring slot overwritten during the conversion must not be cached under this sequence
+                if key is not None and frame.is_valid():
+                    self._frame_pyramids[key] = pyramid
+                    while len(self._frame_pyramids) > FRAME_CACHE_SIZE:
+                        self._frame_pyramids.popitem(last=False)
+            while len(pyramid) <= level:
+                pyramid.append(cv2.pyrDown(pyramid[-1]))
+            return pyramid[level]
+
+    @staticmethod
+    def _levels_for(template_shape, max_levels):
+        levels = 0
+        side = min(template_shape)
+        while levels < max_levels and side // 2 >= MIN_COARSE_TEMPLATE_SIDE:
+            side //= 2
+            levels += 1
+        return levels
+
+    def _match_scale(self, frame, prepared, scale, threshold, max_results, max_levels):
+        full = self.frame_level(frame, 0)
+        template = prepared.variant(scale, 0)
+        th, tw = template.shape
+        if th > full.shape[0] or tw > full.shape[1]:
+            return []
+
+        levels = self._levels_for(template.shape, max_levels)
+        while levels and (min(self.frame_level(frame, levels).shape) < min(prepared.variant(scale, levels).shape)):
+            levels -= 1
+        if levels == 0:
+            result = cv2.matchTemplate(full, template, cv2.TM_CCOEFF_NORMED)
+            return [Match(x, y, tw, th, score, scale)
+                    for x, y, score in _peaks(result, threshold, max(max_results * 4, MAX_COARSE_CANDIDATES))]
+
+        # Coarse pass on the downsampled frame, then verify each candidate in a small full-size window
+        coarse = cv2.matchTemplate(self.frame_level(frame, levels), prepared.variant(scale, levels),
+                                   cv2.TM_CCOEFF_NORMED)
+        factor = 2 ** levels
+        matches = []
+        coarse_threshold = max(MIN_COARSE_SCORE, threshold - COARSE_MARGIN_PER_LEVEL * levels)
+        for cx, cy, _ in _peaks(coarse, coarse_threshold, MAX_COARSE_CANDIDATES):
+            x0 = max(0, cx * factor - factor)
+            y0 = max(0, cy * factor - factor)
+            x1 = min(full.shape[1], cx * factor + factor + tw)
+            y1 = min(full.shape[0], cy * factor + factor + th)
+            window = cv2.matchTemplate(full[y0:y1, x0:x1], template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (mx, my) = cv2.minMaxLoc(window)
+            if score >= threshold:
+                matches.append(Match(x0 + mx, y0 + my, tw, th, float(score), scale))
+        return matches
+
+    def find(self, frame, template_path, threshold=0.8, region=None, scales=(1.0,), max_results=10,
+             use_last_location=True, max_levels=3):
+        """Find every occurrence of a template in a frame.
+
+        Args:
+            frame: screen_capture.Frame to search
+            template_path: Path to the template image
+            threshold: Minimum normalized correlation score (0.0 to 1.0)
+            region: Optional (x, y, width, height) to limit the search to
+            scales: Template scales to try, e.g. (0.8, 1.0, 1.25) for DPI changes
+            max_results: Maximum number of matches to return
+            use_last_location: Search around the previous match first
+            max_levels: Maximum number of pyramid levels for the coarse pass
+
+        Returns matches in screen coordinates, best first, after non-maximum suppression.
+        """
+        path = os.path.abspath(template_path)
+        prepared = self.template(path)
+
+        searches = []
+        if region is not None:
+            searches.append(region)
+        else:
+            last = self._last_locations.get(path) if use_last_location and max_results == 1 else None
+            if last is not None:
+                # Try a window around the previous match before searching the whole frame
+                searches.append((last.x - last.width - frame.origin[0], last.y - last.height - frame.origin[1],
+                                 3 * last.width, 3 * last.height))
+            searches.append(None)
+
+        for area in searches:
+            try:
+                target = frame.crop(*area) if area is not None else frame
+            except ValueError:
+                continue
+
+            matches = []
+            for scale in scales:
+                for m in self._match_scale(target, prepared, scale, threshold, max_results, max_levels):
+                    matches.append(m._replace(x=m.x + target.origin[0], y=m.y + target.origin[1]))
+            matches = non_max_suppression(matches)[:max_results]
+            if matches:
+                self._last_locations[path] = matches[0]
+                return matches
+        return []
+
+
+# Per worker process state for match_shared_frame
+_worker_matcher = None
+_worker_blocks = {}
+
+
+def _attach_shared_memory(name):
+    block = _worker_blocks.get(name)
+    if block is None:
+        try:
+            block = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 has no track flag; pool workers share the parent's resource
+            # tracker, so the block is still only unlinked by the parent
+            block = shared_memory.SharedMemory(name=name)
+        _worker_blocks[name] = block
+    return block
+
+
+def match_shared_frame(block_name, shape, sequence, template_path, threshold, region, scales, max_results):
+    """Process pool entry point: match one template against the grayscale frame in shared memory."""
+    global _worker_matcher
+    if _worker_matcher is None:
+        _worker_matcher = TemplateMatcher()
+    block = _attach_shared_memory(block_name)
+    pixels = np.ndarray(shape, dtype=np.uint8, buffer=block.buf)
+    frame = Frame(None, None, pixels, 0.0, sequence)
+    return _worker_matcher.find(frame, template_path, threshold=threshold, region=region, scales=scales,
+                                max_results=max_results, use_last_location=False)
+
+
+class SharedFrameMatcher:
+    """Matches many templates against one frame across a process pool. The frame is
+    converted to grayscale once and shared with the workers through shared memory."""
+
+    def __init__(self):
+        self._block = None
+        self._published = None   # (sequence, origin, shape) of the frame currently in the block
+        self._lock = threading.Lock()
+
+    def _publish(self, frame):
+        key = (frame.sequence, frame.origin, frame.pixels.shape)
+        gray_shape = frame.pixels.shape[:2]
+        if self._block is None or self._block.size < gray_shape[0] * gray_shape[1]:
+            self.close()
+            self._block = shared_memory.SharedMemory(create=True, size=gray_shape[0] * gray_shape[1])
+        if key != self._published or frame.sequence is None:
+            target = np.ndarray(gray_shape, dtype=np.uint8, buffer=self._block.buf)
+            cv2.cvtColor(frame.pixels, cv2.COLOR_RGB2GRAY, dst=target)
+            self._published = key
+        return self._block.name, gray_shape
+
+    def find_many(self, frame, template_paths, executor, threshold=0.8, region=None, scales=(1.0,),
+                  max_results=1):
+        """Locate several templates in one frame.
+
+        Returns a dict of template path -> list of matches (or the exception raised for it).
+        """
+        with self._lock:
+            block_name, shape = self._publish(frame)
+            sequence = frame.sequence if frame.sequence is not None else id(frame)
+            futures = {path: executor.submit(match_shared_frame, block_name, shape, sequence,
+                                             os.path.abspath(path), threshold, region, scales, max_results)
+                       for path in dict.fromkeys(template_paths)}
+            results = {}
+            for path, future in futures.items():
+                try:
+                    results[path] = [m._replace(x=m.x + frame.origin[0], y=m.y + frame.origin[1])
+                                     for m in future.result()]
+                except Exception as e:
+                    results[path] = e
+            return results
+
+    def close(self):
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+            self._published = None
+
+
+def _benchmark():
+    from screen_capture import ScreenCaptureService
+
+    rng = np.random.default_rng(5)
+    # Smooth 4K "desktop" with a few distinct widgets on it
+    background = cv2.resize(rng.integers(0, 255, (270, 480, 3), dtype=np.uint8), (3840, 2160),
+                            interpolation=cv2.INTER_CUBIC)
+    button = rng.integers(0, 255, (48, 120, 3), dtype=np.uint8)
+    button = cv2.GaussianBlur(button, (5, 5), 0)
+    for x, y in ((300, 200), (2000, 1500), (3500, 100)):
+        background[y:y + 48, x:x + 120] = button
+
+    import tempfile
+    template_path = os.path.join(tempfile.mkdtemp(), "button.png")
+    cv2.imwrite(template_path, cv2.cvtColor(button, cv2.COLOR_RGB2BGR))
+
+    class StaticGrabber:
+        def grab(self):
+            return background
+
+    service = ScreenCaptureService(grabber=StaticGrabber())
+    frame = service.get_frame()
+    matcher = TemplateMatcher()
+
+    gray = cv2.cvtColor(frame.pixels, cv2.COLOR_RGB2GRAY)
+    template_gray = cv2.cvtColor(button, cv2.COLOR_RGB2GRAY)
+    start = time.perf_counter()
+    cv2.matchTemplate(gray, template_gray, cv2.TM_CCOEFF_NORMED)
+    print(f"Full-resolution matchTemplate on 4K: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def timed(label, **kwargs):
+        start = time.perf_counter()
+        matches = matcher.find(frame, template_path, **kwargs)
+        print(f"{label}: {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"{[(m.x, m.y, round(m.score, 3)) for m in matches]}")
+
+    timed("Pyramid search, cold (decode + grayscale)")
+    timed("Pyramid search, warm")
+    timed("Region of interest", region=(1800, 1300, 600, 500))
+    timed("Last known location", max_results=1)
+    timed("Multi-scale (0.9, 1.0, 1.1)", scales=(0.9, 1.0, 1.1))
+
+    # Batch locate: ten different widgets, sequential versus the process pool
+    from concurrent.futures import ProcessPoolExecutor
+
+    paths = []
+    for i in range(10):
+        widget = cv2.GaussianBlur(rng.integers(0, 255, (40, 100, 3), dtype=np.uint8), (5, 5), 0)
+        x, y = 200 + (i % 5) * 700, 600 + (i // 5) * 800
+        background[y:y + 40, x:x + 100] = widget
+        paths.append(os.path.join(os.path.dirname(template_path), f"widget{i}.png"))
+        cv2.imwrite(paths[-1], cv2.cvtColor(widget, cv2.COLOR_RGB2BGR))
+    frame = service.get_frame(max_age=0)
+
+    start = time.perf_counter()
+    for path in paths:
+        matcher.find(frame, path, max_results=1, use_last_location=False)
+    print(f"Sequential locate of {len(paths)} templates: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    shared = SharedFrameMatcher()
+    with ProcessPoolExecutor() as executor:
+        shared.find_many(frame, paths[:1], executor)  # Start the workers
+        for _ in range(2):
+            frame = service.get_frame(max_age=0)
+            start = time.perf_counter()
+            results = shared.find_many(frame, paths, executor)
+            found = sum(1 for r in results.values() if r and not isinstance(r, Exception))
+            print(f"Process pool locate of {len(paths)} templates on {os.cpu_count()} cores: "
+                  f"{(time.perf_counter() - start) * 1000:.0f} ms, {found} found")
+    shared.close()
+
+
+if __name__ == "__main__":
+    _benchmark()
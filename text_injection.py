@@ -0,0 +1,381 @@
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+# Texts at least this long are pasted when the clipboard can be used
+PASTE_THRESHOLD = 100
+# Time the target application gets to read the clipboard before it is restored
+PASTE_SETTLE = 0.15
+# Key events sent per system call by the batched backends, and the pause between batches
+BATCH_EVENTS = 400
+BATCH_PAUSE = 0.005
+CHUNK_CHARS = 64
+
+# Applications that ignore the local clipboard (remote desktops, VM consoles)
+NO_PASTE_APPS = frozenset({
+    "mstsc", "mstsc.exe", "vmware", "vmware.exe", "vmplayer", "vmplayer.exe", "virtualbox", "virtualboxvm",
+    "virtualboxvm.exe", "vncviewer", "vncviewer.exe", "remmina", "anydesk", "anydesk.exe", "teamviewer",
+})
+# Terminals on Linux paste with ctrl+shift+v
+TERMINAL_APPS = frozenset({
+    "gnome-terminal-server", "gnome-terminal", "konsole", "xfce4-terminal", "terminator", "tilix",
+    "alacritty", "kitty", "xterm", "uxterm", "urxvt", "st", "wezterm", "foot", "lxterminal", "mate-terminal",
+})
+
+
+def foreground_app():
+    """Lowercase process or window class name of the focused window, or None."""
+    try:
+        if os.name == "nt":
+            import psutil
+            import win32gui
+            import win32process
+            _, pid = win32process.GetWindowThreadProcessId(win32gui.GetForegroundWindow())
+            return psutil.Process(pid).name().lower()
+        if sys.platform.startswith("linux") and os.environ.get("DISPLAY"):
+            from Xlib import X, display
+            d = display.Display()
+            try:
+                root = d.screen().root
+                active = root.get_full_property(d.intern_atom("_NET_ACTIVE_WINDOW"), X.AnyPropertyType)
+                if active is None or not active.value[0]:
+                    return None
+                wm_class = d.create_resource_object("window", active.value[0]).get_wm_class()
+                return wm_class[0].lower() if wm_class else None
+            finally:
+                d.close()
+    except Exception as e:
+        logging.debug(f"Could not identify the foreground application: {e}")
+    return None
+
+
+class ClipboardBackend:
+    """Pastes text through the clipboard, restoring the previous text afterwards.
+
+    Only text contents can be put back, so auto selection skips this backend
+    while the clipboard holds something else (an image, copied files).
+    """
+    name = "paste"
+
+    def __init__(self):
+        if sys.platform == "darwin":
+            self._get, self._set = ["pbpaste"], ["pbcopy"]
+        elif os.environ.get("WAYLAND_DISPLAY") and shutil.which("wl-copy"):
+            self._get, self._set = ["wl-paste", "--no-newline"], ["wl-copy"]
+        elif shutil.which("xclip"):
+            self._get, self._set = ["xclip", "-selection", "clipboard", "-o"], ["xclip", "-selection", "clipboard", "-i"]
+        elif shutil.which("xsel"):
+            self._get, self._set = ["xsel", "--clipboard", "--output"], ["xsel", "--clipboard", "--input"]
+        else:
+            self._get = self._set = None
+
+    def available(self):
+        return os.name == "nt" or self._set is not None
+
+    @staticmethod
+    def _open_windows_clipboard():
+        import pywintypes
+        import win32clipboard
+        for attempt in range(10):
+            try:
+                win32clipboard.OpenClipboard()
+                return
+            except pywintypes.error:
+                if attempt == 9:
+                    raise
+                time.sleep(0.02)   # Another application has it open for a moment
+
+    def read(self):
+        """(restorable, text): text is None for an empty clipboard."""
+        if os.name == "nt":
+            import win32clipboard
+            self._open_windows_clipboard()
+            try:
+                if win32clipboard.IsClipboardFormatAvailable(win32clipboard.CF_UNICODETEXT):
+                    return True, win32clipboard.GetClipboardData(win32clipboard.CF_UNICODETEXT)
+                return win32clipboard.CountClipboardFormats() == 0, None
+            finally:
+                win32clipboard.CloseClipboard()
+        if self._get[0] == "xclip":
+            targets = subprocess.run(self._get[:3] + ["-t", "TARGETS", "-o"], capture_output=True, timeout=2)
+            kinds = set(targets.stdout.decode(errors="replace").split())
+            if kinds and not kinds & {"UTF8_STRING", "STRING", "TEXT", "text/plain"}:
+                return False, None
+        result = subprocess.run(self._get, capture_output=True, timeout=2)
+        return True, result.stdout.decode("utf-8", errors="replace") if result.returncode == 0 else None
+
+    def write(self, text):
+        if os.name == "nt":
+            import win32clipboard
+            self._open_windows_clipboard()
+            try:
+                win32clipboard.EmptyClipboard()
+                if text is not None:
+                    win32clipboard.SetClipboardText(text, win32clipboard.CF_UNICODETEXT)
+            finally:
+                win32clipboard.CloseClipboard()
+            return
+        subprocess.run(self._set, input=(text or "").encode("utf-8"), timeout=2, check=True)
+
+    def type(self, text, app=None):
+        import pyautogui
+
+        _, previous = self.read()
+        self.write(text)
+        try:
+            if sys.platform == "darwin":
+                pyautogui.hotkey("command", "v")
+            elif os.name != "nt" and app in TERMINAL_APPS:
+                pyautogui.hotkey("ctrl", "shift", "v")
+            else:
+                pyautogui.hotkey("ctrl", "v")
+            time.sleep(PASTE_SETTLE)
+        finally:
+            self.write(previous)
+        return len(text)
+
+
+class SendInputBackend:
+    """Windows: Unicode key events (KEYEVENTF_UNICODE), BATCH_EVENTS per SendInput call."""
+    name = "keys"
+
+    def available(self):
+        return os.name == "nt"
+
+    def type(self, text, app=None):
+        import ctypes
+        from ctypes import wintypes
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                        ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                        ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+        class INPUT(ctypes.Structure):
+            class _U(ctypes.Union):
+                _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+            _anonymous_ = ("u",)
+            _fields_ = [("type", wintypes.DWORD), ("u", _U)]
+
+        keyup, unicode = 0x0002, 0x0004
+        events = []
+        for char in text:
+            if char in "\n\t":
+                vk = 0x0D if char == "\n" else 0x09   # Enter and Tab as real keys
+                events += [(vk, 0, 0), (vk, 0, keyup)]
+                continue
+            data = char.encode("utf-16-le")
+            for i in range(0, len(data), 2):   # Characters outside the BMP are two surrogate events
+                unit = int.from_bytes(data[i:i + 2], "little")
+                events += [(0, unit, unicode), (0, unit, unicode | keyup)]
+
+        send = ctypes.windll.user32.SendInput
+        for start in range(0, len(events), BATCH_EVENTS):
+            batch = events[start:start + BATCH_EVENTS]
+            inputs = (INPUT * len(batch))()
+            for slot, (vk, scan, flags) in zip(inputs, batch):
+                slot.type = 1   # INPUT_KEYBOARD
+                slot.ki = KEYBDINPUT(vk, scan, flags, 0, 0)
+            if send(len(batch), inputs, ctypes.sizeof(INPUT)) != len(batch):
+                raise OSError("SendInput was blocked (is the target running as administrator?)")
+            time.sleep(BATCH_PAUSE)
+        return len(text)
+
+
+class XTestBackend:
+    """X11: XTest key events, buffered and flushed BATCH_EVENTS at a time.
+
+    Characters missing from the keyboard map are typed by temporarily
+    binding their keysym to a spare keycode, as xdotool does.
+    """
+    name = "keys"
+
+    _SPECIAL = {"\n": "Return", "\t": "Tab"}
+
+    def available(self):
+        if not sys.platform.startswith("linux") or not os.environ.get("DISPLAY"):
+            return False
+        try:
+            import Xlib.ext.xtest  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def type(self, text, app=None):
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+
+        d = display.Display()
+        try:
+            first = d.display.info.min_keycode
+            count = d.display.info.max_keycode - first + 1
+            mapping = d.get_keyboard_mapping(first, count)
+            spare = [first + i for i, syms in enumerate(mapping) if not any(syms)]
+            shift = d.keysym_to_keycode(XK.XK_Shift_L)
+            remapped, queued = {}, 0
+
+            def keysym_for(char):
+                if char in self._SPECIAL:
+                    return XK.string_to_keysym(self._SPECIAL[char])
+                code = ord(char)
+                return code if 0x20 <= code <= 0x7E or 0xA0 <= code <= 0xFF else 0x01000000 | code
+
+            for char in text:
+                keysym = keysym_for(char)
+                keycode, index = next(((k, i) for k, i in d.keysym_to_keycodes(keysym) if i < 2), (0, 0))
+                if not keycode:
+                    if keysym not in remapped:
+                        if not spare:
+                            raise OSError("No spare keycode to type non-keyboard characters")
+                        if len(remapped) >= len(spare):
+                            # Recycling a keycode: events using its old keysym must be delivered first
+                            d.sync()
+                            time.sleep(BATCH_PAUSE)
+                            remapped.pop(next(iter(remapped)))
+                        used = set(remapped.values())
+                        code = next(k for k in spare if k not in used)
+                        d.change_keyboard_mapping(code, [(keysym, keysym)])
+                        d.sync()
+                        remapped[keysym] = code
+                    keycode, index = remapped[keysym], 0
+                if index == 1:
+                    xtest.fake_input(d, X.KeyPress, shift)
+                xtest.fake_input(d, X.KeyPress, keycode)
+                xtest.fake_input(d, X.KeyRelease, keycode)
+                if index == 1:
+                    xtest.fake_input(d, X.KeyRelease, shift)
+                queued += 2 + 2 * index
+                if queued >= BATCH_EVENTS:
+                    d.flush()   # One write for the whole batch of buffered requests
+                    queued = 0
+                    time.sleep(BATCH_PAUSE)
+            d.sync()
+            if remapped:
+                time.sleep(PASTE_SETTLE)
+                for code in remapped.values():
+                    d.change_keyboard_mapping(code, [(X.NoSymbol, X.NoSymbol)])
+                d.sync()
+        finally:
+            d.close()
+        return len(text)
+
+
+class ChunkedBackend:
+    """pyautogui key presses in chunks; characters without a key (non-ASCII) cannot be typed."""
+    name = "chunked"
+
+    def available(self):
+        return True
+
+    def type(self, text, app=None, interval=0.0):
+        import pyautogui
+
+        # Key names are lowercase; pyautogui holds shift itself for uppercase and shifted characters
+        keys = pyautogui.KEYBOARD_KEYS
+        typeable = "".join(c for c in text if c in keys or c.lower() in keys or c in "\n\t")
+        for start in range(0, len(typeable), CHUNK_CHARS):
+            pyautogui.write(typeable[start:start + CHUNK_CHARS], interval=interval)
+        return len(typeable)
+
+
+class TextInjector:
+    """Types text with the fastest backend that suits the text and the focused application.
+
+    Long text is pasted through the clipboard, unless the focused application
+    ignores the local clipboard or the clipboard holds non-text data. Short
+    text goes through batched key events (SendInput or XTest), which type any
+    Unicode character. pyautogui key presses are the last resort, and the
+    only backend that honours a per-key interval.
+    """
+
+    STRATEGIES = ("auto", "paste", "keys", "chunked")
+
+    def __init__(self, paste_threshold=PASTE_THRESHOLD):
+        self.paste_threshold = paste_threshold
+        self.clipboard = ClipboardBackend()
+        self.keys = next((b for b in (SendInputBackend(), XTestBackend()) if b.available()), None)
+        self.chunked = ChunkedBackend()
+
+    def _choose(self, text, app):
+        if self.clipboard.available() and app not in NO_PASTE_APPS:
+            long_text = len(text) >= self.paste_threshold
+            untypeable = self.keys is None and not text.isascii()
+            if (long_text or untypeable) and self.clipboard.read()[0]:
+                return self.clipboard
+        return self.keys or self.chunked
+
+    def type(self, text, strategy="auto", interval=0.0):
+        """Type text into the focused window.
+
+        Returns (backend name, characters that could not be typed, seconds).
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"strategy must be one of {', '.join(self.STRATEGIES)}")
+        start = time.perf_counter()
+        text = text.replace("\r\n", "\n")
+        app = foreground_app()
+        if interval > 0 or strategy == "chunked":
+            typed = self.chunked.type(text, app, interval=interval)
+            return self.chunked.name, len(text) - typed, time.perf_counter() - start
+        if strategy == "paste":
+            if not self.clipboard.available():
+                raise OSError("No clipboard tool available (install xclip or wl-clipboard)")
+            backend = self.clipboard
+        elif strategy == "keys":
+            if self.keys is None:
+                raise OSError("Batched key events are not available on this system")
+            backend = self.keys
+        else:
+            backend = self._choose(text, app)
+        typed = backend.type(text, app)
+        return backend.name, len(text) - typed, time.perf_counter() - start
+
+
+def _benchmark():
+    """Characters per second for each backend, typed into an xterm on a private Xvfb display."""
+    import tempfile
+
+    if not shutil.which("Xvfb") or not shutil.which("xterm"):
+        print("The benchmark needs Xvfb and xterm")
+        return
+    out = tempfile.NamedTemporaryFile(suffix=".txt", delete=False).name
+    xvfb = subprocess.Popen(["Xvfb", ":97", "-screen", "0", "1280x800x24"], stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = ":97"
+    time.sleep(1)
+    xterm = subprocess.Popen(["xterm", "-geometry", "200x50+0+0", "-e", f"stty -icanon -echo; cat > {out}"])
+    time.sleep(1.5)
+    try:
+        import pyautogui
+
+        pyautogui.click(200, 200)   # Focus the xterm
+        injector = TextInjector()
+        text = ("The quick brown fox jumps over the lazy dog. " * 45)[:2000]
+        unicode_text = "Grüße, naïve café — ünïcödé ✓ " * 10
+        runs = [("chunked", text[:200]), ("keys", text), ("keys", unicode_text)]
+        if injector.clipboard.available():
+            runs += [("paste", text), ("paste", unicode_text)]
+        for strategy, sample in runs:
+            if strategy == "keys" and injector.keys is None:
+                continue
+            open(out, "w").close()
+            name, missing, seconds = injector.type(sample, strategy=strategy)
+            time.sleep(0.5)
+            with open(out, encoding="utf-8", errors="replace") as f:
+                received = f.read()
+            print(f"{strategy:>7}: {(len(sample) - missing) / seconds:,.0f} chars/s over {len(sample)} chars, "
+                  f"{'intact' if received == sample else f'{len(received)} chars received'}")
+        print(f"pyautogui.typewrite(interval=0.05), as before: {1 / 0.05:.0f} chars/s")
+    finally:
+        xterm.terminate()
+        xvfb.terminate()
+        os.unlink(out)
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,181 @@
+import asyncio
+import collections
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from input_dispatcher import InputDispatcher
+
+# Tool categories
+ASYNC = "async"    # Already non-blocking, runs on the event loop
+IO = "io"          # Blocking I/O (network, disk, subprocess), runs on a thread pool
+INPUT = "input"    # Mouse/keyboard/screen calls, serialized on the input dispatcher thread
+CPU = "cpu"        # CPU-heavy work, runs in a process pool
+
+CPU_COUNT = os.cpu_count() or 1
+
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes up from short sleeps."""
+
+    def __init__(self, interval=0.005, warn_threshold=0.02, history=4096):
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.samples = collections.deque(maxlen=history)  # (monotonic time, lag seconds)
+        self.max_lag = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.samples.append((now, lag))
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.warn_threshold:
+                logging.warning(f"Event loop blocked for {lag * 1000:.1f} ms")
+
+    def max_lag_between(self, start, end):
+        return max((lag for t, lag in self.samples if start <= t <= end), default=0.0)
+
+    def stats(self):
+        lags = sorted(lag for _, lag in self.samples)
+        if not lags:
+            return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "samples": len(lags),
+            "p50_ms": round(lags[len(lags) // 2] * 1000, 2),
+            "p99_ms": round(lags[int(len(lags) * 0.99)] * 1000, 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+class ToolRuntime:
+    """Dispatches blocking tool work to a bounded executor per category."""
+
+    def __init__(self, io_workers=None, cpu_workers=None):
+        self.limits = {
+            IO: io_workers or min(32, CPU_COUNT + 4),
+            INPUT: 1,
+            CPU: cpu_workers or max(1, CPU_COUNT - 1),
+        }
+        self._executors = {}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+        self.lag_monitor = EventLoopLagMonitor()
+
+    def executor(self, kind):
+        executor = self._executors.get(kind)
+        if executor is None:
+            with self._lock:
+                executor = self._executors.get(kind)
+                if executor is None:
+                    if kind == CPU:
+                        executor = ProcessPoolExecutor(max_workers=self.limits[CPU])
+                    elif kind == INPUT:
+                        executor = InputDispatcher()
+                    elif kind == IO:
+                        executor = ThreadPoolExecutor(max_workers=self.limits[kind],
+                                                      thread_name_prefix=f"friday-{kind}")
+                    else:
+                        raise ValueError(f"Unknown tool category: {kind}")
+                    self._executors[kind] = executor
+        return executor
+
+    def _semaphore(self, kind):
+        # Bounds queued plus running work per category, so a burst of tool calls
+        # waits on the loop instead of piling up inside the executor
+        loop = asyncio.get_running_loop()
+        key = (kind, loop)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self.limits[kind] * 2)
+        return semaphore
+
+    async def run(self, kind, func, *args, **kwargs):
+        """Run func in the executor for `kind` and await its result."""
+        if kind == ASYNC:
+            return await func(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(kind):
+            start = time.monotonic()
+            result = await loop.run_in_executor(self.executor(kind),
+                                                functools.partial(func, *args, **kwargs))
+            end = time.monotonic()
+
+        lag = self.lag_monitor.max_lag_between(start, end)
+        logging.debug(f"{getattr(func, '__name__', func)} ran on {kind} executor in "
+                      f"{(end - start) * 1000:.1f} ms, max loop lag {lag * 1000:.1f} ms")
+        return result
+
+    def start_lag_monitor(self):
+        return self.lag_monitor.start()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=wait)
+            self._executors.clear()
+        self.lag_monitor.stop()
+
+
+# Global tool runtime
+runtime = ToolRuntime()
+
+
+def tool_executor(kind=IO):
+    """Turn a blocking tool function into a coroutine that runs on the executor for `kind`.
+
+    Process-bound work has to be a picklable module-level function, so CPU tools
+    call runtime.run(CPU, ...) on a helper instead of using this decorator.
+    """
+    if kind not in (IO, INPUT):
+        raise ValueError(f"tool_executor only supports '{IO}' and '{INPUT}' tools")
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await runtime.run(kind, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _busy_work(n):
+    return sum(i * i for i in range(n))
+
+
+async def _benchmark():
+    monitor = runtime.lag_monitor
+    runtime.start_lag_monitor()
+    await asyncio.sleep(0.2)
+
+    start = time.monotonic()
+    await asyncio.gather(
+        *[runtime.run(IO, time.sleep, 0.5) for _ in range(20)],
+        *[runtime.run(INPUT, time.sleep, 0.05) for _ in range(10)],
+        *[runtime.run(CPU, _busy_work, 2_000_000) for _ in range(CPU_COUNT)],
+    )
+    end = time.monotonic()
+    print(f"Ran 20 I/O, 10 input and {CPU_COUNT} CPU calls in {end - start:.2f}s")
+    print(f"Max event loop lag during tool calls: {monitor.max_lag_between(start, end) * 1000:.2f} ms")
+    print(f"Lag stats: {monitor.stats()}")
+    runtime.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(_benchmark())
@@ -1,55 +1,152 @@
 import logging
 from livekit.agents import function_tool, RunContext
 import requests
-from langchain_community.tools import DuckDuckGoSearchRun
 import os
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from typing import Optional
+from typing import List, Optional
 import pyautogui
 import cv2
 import numpy as np
 from PIL import Image
-import base64
-import io
 import time
 import subprocess
 import shutil
 import psutil
 from pathlib import Path
 import json
+import re
 from datetime import datetime
 import sys
+import threading
 import winreg
 
+from memory_store import SQLiteMemoryStore, ENTRY_SECTIONS
+from memory_search import MemoryIndex
+from memory_embeddings import SemanticIndex
+from tool_runtime import runtime, tool_executor, IO, INPUT, CPU
+from weather_cache import WeatherCache
+from web_search import SearchService
+from email_outbox import EmailOutbox
+from screen_capture import ScreenCaptureService
+from template_matching import TemplateMatcher, SharedFrameMatcher, match_center
+from screen_watch import ScreenWatcher
+from screen_ocr import ScreenOCR, word_center
+from process_monitor import ProcessSampler, SORT_KEYS, terminate_tree
+from system_telemetry import TelemetryService
+from file_listing import list_entries, SORT_FIELDS
+from file_reader import MappedFile
+from file_index import FileIndex, SEARCH_MODES
+from content_search import ContentSearch
+from disk_usage import DiskUsageAnalyzer
+from duplicate_finder import DuplicateFinder
+from command_runner import CommandRunner
+from shell_sessions import ShellPool
+from text_injection import TextInjector
+from macros import MacroStore, MacroRecorder, MacroPlayer, MacroError
+
 # Disable pyautogui failsafe for automation
 pyautogui.FAILSAFE = False
 
-# Memory storage file
+# Memory storage files (the JSON file is only read once, to migrate it into the database)
 MEMORY_FILE = "friday_memory.json"
+MEMORY_DB = "friday_memory.db"
 
 class MemoryManager:
-    def __init__(self):
+    def __init__(self, store=None):
         self.memory_file = MEMORY_FILE
-        self.memory = self.load_memory()
+        self._store = store
+        self._store_lock = threading.Lock()
+        self._index = None
+        self._semantic_index = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def store(self):
+        # Open the backend lazily so importing tools never touches the disk
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    store = SQLiteMemoryStore(MEMORY_DB)
+                    try:
+                        store.migrate_from_json(self.memory_file)
+                    except Exception as e:
+                        logging.error(f"Error migrating memory: {e}")
+                    self._store = store
+        return self._store
+
+    @staticmethod
+    def _entry_document(section, entry):
+        """Searchable text and timestamp of a stored entry."""
+        if section == "conversations":
+            text = f"User: {entry.get('user', '')} | Assistant: {entry.get('assistant', '')}"
+            timestamp = entry.get("timestamp")
+        elif section == "tasks":
+            text = entry.get("task", "")
+            timestamp = entry.get("timestamp")
+        else:
+            text = entry.get("reminder", "")
+            if entry.get("datetime"):
+                text += f" (at {entry['datetime']})"
+            timestamp = entry.get("created")
+        return text, timestamp
+
+    def _documents(self):
+        for key, value, updated in self.store.get_preference_records():
+            yield f"user_preferences:{key}", "user_preferences", f"{key}: {value}", updated
+        for section in ENTRY_SECTIONS:
+            for entry_id, entry in self.store.get_entries(section):
+                text, timestamp = self._entry_document(section, entry)
+                yield f"{section}:{entry_id}", section, text, timestamp
+
+    @property
+    def index(self):
+        # Built from the store on first search, then updated on every write
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    index = MemoryIndex()
+                    for doc_id, section, text, timestamp in self._documents():
+                        index.add(doc_id, section, text, timestamp)
+                    self._index = index
+        return self._index
+
+    @property
+    def semantic_index(self):
+        # Built lazily like the keyword index; embeddings are computed in one batch
+        if self._semantic_index is None:
+            with self._index_lock:
+                if self._semantic_index is None:
+                    semantic_index = SemanticIndex()
+                    semantic_index.add_many((doc_id, section, text)
+                                            for doc_id, section, text, _ in self._documents())
+                    self._semantic_index = semantic_index
+        return self._semantic_index
+
+    def _add_document(self, doc_id, section, text, timestamp, keep_last=None):
+        with self._index_lock:
+            for index in (self._index, self._semantic_index):
+                if index is None:
+                    continue
+                if index is self._index:
+                    index.add(doc_id, section, text, timestamp)
+                else:
+                    index.add(doc_id, section, text)
+                if keep_last is not None:
+                    index.trim(section, keep_last)
 
-    def load_memory(self):
-        try:
-            if os.path.exists(self.memory_file):
-                with open(self.memory_file, 'r') as f:
-                    return json.load(f)
-            return {"conversations": [], "user_preferences": {}, "tasks": [], "reminders": []}
-        except Exception as e:
-            logging.error(f"Error loading memory: {e}")
-            return {"conversations": [], "user_preferences": {}, "tasks": [], "reminders": []}
-
-    def save_memory(self):
-        try:
-            with open(self.memory_file, 'w') as f:
-                json.dump(self.memory, f, indent=2)
-        except Exception as e:
-            logging.error(f"Error saving memory: {e}")
+    def _append(self, section, entry, keep_last=None):
+        entry_id = self.store.append_entry(section, entry, keep_last=keep_last)
+        text, timestamp = self._entry_document(section, entry)
+        self._add_document(f"{section}:{entry_id}", section, text, timestamp, keep_last=keep_last)
+
+    def search(self, query, limit=5, sections=None, since=None, until=None):
+        index = self.index
+        with self._index_lock:
+            return index.search(query, limit=limit, sections=sections, since=since, until=until)
+
+    def semantic_search(self, query, limit=5, sections=None):
+        semantic_index = self.semantic_index
+        with self._index_lock:
+            return semantic_index.search(query, limit=limit, sections=sections)
 
     def add_conversation(self, user_input, assistant_response):
         conversation = {
@@ -57,40 +154,92 @@ class MemoryManager:
             "user": user_input,
             "assistant": assistant_response
         }
-        self.memory["conversations"].append(conversation)
         # Keep only last 50 conversations
-        if len(self.memory["conversations"]) > 50:
-            self.memory["conversations"] = self.memory["conversations"][-50:]
-        self.save_memory()
+        self._append("conversations", conversation, keep_last=50)
 
     def set_preference(self, key, value):
-        self.memory["user_preferences"][key] = value
-        self.save_memory()
+        self.store.set_preference(key, value)
+        self._add_document(f"user_preferences:{key}", "user_preferences", f"{key}: {value}",
+                           datetime.now().isoformat())
 
     def get_preference(self, key):
-        return self.memory["user_preferences"].get(key)
+        return self.store.get_preference(key)
 
     def add_task(self, task):
-        self.memory["tasks"].append({
+        self._append("tasks", {
             "task": task,
             "timestamp": datetime.now().isoformat(),
             "completed": False
         })
-        self.save_memory()
 
     def add_reminder(self, reminder, date_time=None):
-        self.memory["reminders"].append({
+        self._append("reminders", {
             "reminder": reminder,
             "datetime": date_time,
             "created": datetime.now().isoformat()
         })
-        self.save_memory()
 
 # Global memory manager
 memory_manager = MemoryManager()
 
+# Global weather cache
+weather_cache = WeatherCache()
+
+# Global web search service
+web_search = SearchService()
+
+# Global email outbox, its worker thread is started by the agent and delivers queued emails
+email_outbox = EmailOutbox()
+
+# Global screen frame cache shared by the vision tools
+screen_capture = ScreenCaptureService()
+
+# Global template matcher, caches decoded templates between calls
+template_matcher = TemplateMatcher()
+shared_frame_matcher = SharedFrameMatcher()
+
+# Global screen watcher, blocks a worker thread (never the event loop) while polling for changes
+screen_watcher = ScreenWatcher(screen_capture, template_matcher)
+
+# Global OCR engine, caches recognized words per screen tile
+screen_ocr = ScreenOCR()
+
+# Global process table, refreshed by a background sampler thread
+process_sampler = ProcessSampler()
+
+# Global system telemetry, sampled once a second into ring buffers (one hour of history)
+telemetry = TelemetryService()
+
+# Global file name index over the user's home folder, built in the background on first use
+file_index = FileIndex()
+
+# Global content searcher, greps folder trees on the CPU process pool
+content_search = ContentSearch()
+
+# Global disk usage analyzer and duplicate finder, cache directory sizes and file hashes between calls
+disk_usage = DiskUsageAnalyzer()
+duplicate_finder = DuplicateFinder()
+
+# Global command runner, runs up to 4 commands at once as asyncio subprocesses
+command_runner = CommandRunner()
+
+# Global warm shell sessions for run_command, closed after 10 minutes idle
+shell_pool = ShellPool()
+
+# Global text injector, pastes long text and sends batched key events for short text
+text_injector = TextInjector()
+
+# The input thread behind INPUT tools; async tools await its scroll and motion futures directly
+input_dispatcher = runtime.executor(INPUT)
+
+# Global macros: stored and compiled by name, recorded with pynput, replayed step by step with anchor checks
+macro_store = MacroStore(template_matcher)
+macro_recorder = MacroRecorder(screen_capture)
+macro_player = MacroPlayer(input_dispatcher, screen_capture, template_matcher, screen_watcher, screen_ocr, text_injector)
+
 @function_tool()
-async def remember_information(
+@tool_executor(IO)
+def remember_information(
     context: RunContext,
     key: str,
     value: str
@@ -109,7 +258,8 @@ async def remember_information(
         return f"Failed to remember information: {str(e)}"
 
 @function_tool()
-async def recall_information(
+@tool_executor(IO)
+def recall_information(
     context: RunContext,
     key: str
 ) -> str:
@@ -129,7 +279,62 @@ async def recall_information(
         return f"Failed to recall information: {str(e)}"
 
 @function_tool()
-async def add_task_to_memory(
+@tool_executor(IO)
+def search_memory(
+    context: RunContext,
+    query: str,
+    section: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 5,
+    semantic: bool = False
+) -> str:
+    """
+    Search everything in memory (preferences, past conversations, tasks and reminders).
+    Tolerates partial words and small typos, and falls back to matching by meaning
+    when no words match.
+
+    Args:
+        query: Words to search for (e.g., 'website', 'project deadline')
+        section: Optional section to search: 'user_preferences', 'conversations', 'tasks' or 'reminders'
+        start_date: Optional ISO date/time; only return memories from this time on (e.g., '2025-06-29')
+        end_date: Optional ISO date/time; only return memories up to this time
+        limit: Maximum number of results to return
+        semantic: Match by meaning instead of by words (ignores the date filters)
+    """
+    try:
+        sections = [section] if section else None
+        if end_date and "T" not in end_date:
+            # A bare date includes the whole day
+            end_date += "T23:59:59"
+        results = []
+        if not semantic:
+            results = memory_manager.search(query, limit=limit, sections=sections,
+                                            since=start_date, until=end_date)
+        if not results and (semantic or not (start_date or end_date)):
+            similar = memory_manager.semantic_search(query, limit=limit, sections=sections)
+            if similar:
+                result = f"Memories related to '{query}':\n"
+                for score, doc_id, doc_section, text in similar:
+                    result += f"- [{doc_section}] {text}\n"
+                logging.info(f"Semantic memory search for '{query}' returned {len(similar)} results")
+                return result
+        if not results:
+            return f"I couldn't find anything in memory matching '{query}'"
+
+        result = f"Memories matching '{query}':\n"
+        for score, doc_id, doc_section, text, timestamp in results:
+            when = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M") if timestamp else "unknown time"
+            result += f"- [{doc_section}, {when}] {text}\n"
+        logging.info(f"Memory search for '{query}' returned {len(results)} results")
+        return result
+    except Exception as e:
+        logging.error(f"Error searching memory: {e}")
+        return f"Failed to search memory: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def add_task_to_memory(
     context: RunContext,
     task: str
 ) -> str:
@@ -146,42 +351,88 @@ async def add_task_to_memory(
         return f"Failed to add task: {str(e)}"
 
 @function_tool()
-async def get_weather(
+@tool_executor(IO)
+def get_weather(
     context: RunContext,  # type: ignore
     city: str) -> str:
     """
     Get the current weather for a given city.
     """
     try:
-        response = requests.get(
-            f"https://wttr.in/{city}?format=3")
-        if response.status_code == 200:
-            logging.info(f"Weather for {city}: {response.text.strip()}")
-            return response.text.strip()
-        else:
-            logging.error(f"Failed to get weather for {city}: {response.status_code}")
-            return f"Could not retrieve weather for {city}."
+        report = weather_cache.get(city)
+        logging.info(f"Weather for {city}: {report}")
+        return report
+    except requests.HTTPError as e:
+        logging.error(f"Failed to get weather for {city}: {e.response.status_code}")
+        return f"Could not retrieve weather for {city}."
     except Exception as e:
         logging.error(f"Error retrieving weather for {city}: {e}")
         return f"An error occurred while retrieving weather for {city}."
 
 @function_tool()
-async def search_web(
+@tool_executor(IO)
+def get_weather_for_cities(
     context: RunContext,  # type: ignore
-    query: str) -> str:
+    cities: List[str]) -> str:
+    """
+    Get the current weather for several cities at once.
+
+    Args:
+        cities: City names (e.g., ['London', 'Paris', 'New York'])
+    """
+    try:
+        reports = weather_cache.get_many(cities)
+        lines = []
+        for city, report in reports.items():
+            if isinstance(report, Exception):
+                logging.error(f"Error retrieving weather for {city}: {report}")
+                lines.append(f"Could not retrieve weather for {city}.")
+            else:
+                lines.append(report)
+        logging.info(f"Weather for {len(reports)} cities retrieved (cache hit rate {weather_cache.hit_rate():.0%})")
+        return "\n".join(lines)
+    except Exception as e:
+        logging.error(f"Error retrieving weather for {cities}: {e}")
+        return "An error occurred while retrieving the weather."
+
+@function_tool()
+@tool_executor(IO)
+def search_web(
+    context: RunContext,  # type: ignore
+    query: str,
+    extra_queries: Optional[List[str]] = None,
+    max_results: int = 5) -> str:
     """
     Search the web using DuckDuckGo.
+
+    Args:
+        query: What to search for
+        extra_queries: Optional additional queries, searched at the same time and merged
+        max_results: Maximum number of results per query
     """
+    queries = [query] + (extra_queries or [])
     try:
-        results = DuckDuckGoSearchRun().run(tool_input=query)
-        logging.info(f"Search results for '{query}': {results}")
-        return results
+        results, errors = web_search.search_many(queries, max_results=max_results)
+        for failed_query, error in errors.items():
+            logging.error(f"Error searching the web for '{failed_query}': {error}")
+        if not results:
+            if errors:
+                return f"An error occurred while searching the web for '{query}'."
+            return f"No results found for '{query}'."
+
+        output = f"Search results for {', '.join(repr(q) for q in queries)}:\n"
+        for i, result in enumerate(results, 1):
+            output += f"{i}. {result['title']} - {result['url']}\n   {result['snippet']}\n"
+        logging.info(f"Search for {queries} returned {len(results)} results (cache hit rate {web_search.hit_rate():.0%})")
+        logging.debug(f"Search results for {queries}: {results}")
+        return output
     except Exception as e:
         logging.error(f"Error searching the web for '{query}': {e}")
         return f"An error occurred while searching the web for '{query}'."
 
 @function_tool()
-async def send_email(
+@tool_executor(IO)
+def send_email(
     context: RunContext,  # type: ignore
     to_email: str,
     subject: str,
@@ -189,7 +440,7 @@ async def send_email(
     cc_email: Optional[str] = None
 ) -> str:
     """
-    Send an email through Gmail.
+    Send an email through Gmail. The email is queued and sent in the background.
 
     Args:
         to_email: Recipient email address
@@ -198,58 +449,82 @@ async def send_email(
         cc_email: Optional CC email address
     """
     try:
-        # Gmail SMTP configuration
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-
-        # Get credentials from environment variables
-        gmail_user = os.getenv("GMAIL_USER")
-        gmail_password = os.getenv("GMAIL_APP_PASSWORD")  # Use App Password, not regular password
-
-        if not gmail_user or not gmail_password:
+        if not email_outbox.user or not email_outbox.password:
             logging.error("Gmail credentials not found in environment variables")
             return "Email sending failed: Gmail credentials not configured."
 
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = gmail_user
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        # Add CC if provided
-        recipients = [to_email]
-        if cc_email:
-            msg['Cc'] = cc_email
-            recipients.append(cc_email)
-
-        # Attach message body
-        msg.attach(MIMEText(message, 'plain'))
-
-        # Connect to Gmail SMTP server
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()  # Enable TLS encryption
-        server.login(gmail_user, gmail_password)
-
-        # Send email
-        text = msg.as_string()
-        server.sendmail(gmail_user, recipients, text)
-        server.quit()
-
-        logging.info(f"Email sent successfully to {to_email}")
-        return f"Email sent successfully to {to_email}"
-
-    except smtplib.SMTPAuthenticationError:
-        logging.error("Gmail authentication failed")
-        return "Email sending failed: Authentication error. Please check your Gmail credentials."
-    except smtplib.SMTPException as e:
-        logging.error(f"SMTP error occurred: {e}")
-        return f"Email sending failed: SMTP error - {str(e)}"
+        message_id = email_outbox.enqueue(to_email, subject, message, cc_email)
+        logging.info(f"Email {message_id} to {to_email} queued")
+        return f"Email to {to_email} queued for sending (id {message_id})"
+
     except Exception as e:
         logging.error(f"Error sending email: {e}")
         return f"An error occurred while sending email: {str(e)}"
 
 @function_tool()
-async def capture_screen(
+@tool_executor(IO)
+def send_bulk_email(
+    context: RunContext,  # type: ignore
+    to_emails: List[str],
+    subject: str,
+    message: str
+) -> str:
+    """
+    Send the same email separately to several recipients through Gmail, in the background.
+
+    Args:
+        to_emails: Recipient email addresses
+        subject: Email subject line
+        message: Email body content
+    """
+    try:
+        if not email_outbox.user or not email_outbox.password:
+            logging.error("Gmail credentials not found in environment variables")
+            return "Email sending failed: Gmail credentials not configured."
+
+        ids = email_outbox.enqueue_many([(to_email, subject, message, None) for to_email in to_emails])
+        logging.info(f"Queued {len(ids)} emails (ids {ids[0]}-{ids[-1]})")
+        return f"Queued {len(ids)} emails for sending (ids {ids[0]}-{ids[-1]})"
+
+    except Exception as e:
+        logging.error(f"Error sending emails: {e}")
+        return f"An error occurred while sending emails: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def get_email_status(
+    context: RunContext,  # type: ignore
+    email_id: Optional[int] = None
+) -> str:
+    """
+    Check whether queued emails have been sent.
+
+    Args:
+        email_id: Optional id of one email; without it the most recent emails are listed
+    """
+    try:
+        messages = [email_outbox.status(email_id)] if email_id is not None else email_outbox.recent()
+        messages = [m for m in messages if m]
+        if not messages:
+            return f"No email found with id {email_id}" if email_id is not None else "No emails have been sent yet"
+
+        result = "Email status:\n"
+        for m in messages:
+            result += f"- #{m['id']} to {m['to_email']} '{m['subject']}': {m['status']}"
+            if m['status'] == 'sent':
+                result += f" at {m['sent_at']}"
+            elif m['last_error']:
+                result += f" after {m['attempts']} attempt(s), last error: {m['last_error']}"
+            result += "\n"
+        return result
+
+    except Exception as e:
+        logging.error(f"Error getting email status: {e}")
+        return f"Failed to get email status: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def capture_screen(
     context: RunContext,  # type: ignore
     save_path: Optional[str] = None,
     region: Optional[str] = None
@@ -272,37 +547,34 @@ async def capture_screen(
                 logging.error(f"Invalid region format: {region}. Use 'x,y,width,height'")
                 return "Invalid region format. Use 'x,y,width,height' (e.g., '100,100,800,600')"
 
-        # Capture screenshot
+        # Capture screenshot (shares a recent grab with other vision tools)
+        # A copy, since encoding the image can outlast the frame's ring slot
+        frame = screen_capture.get_frame(max_age=0.1, region=bbox, copy=True)
         if bbox:
-            screenshot = pyautogui.screenshot(region=bbox)
             logging.info(f"Screenshot captured from region {region}")
         else:
-            screenshot = pyautogui.screenshot()
             logging.info("Full screen screenshot captured")
 
         # Save screenshot if path provided
         if save_path:
             try:
-                screenshot.save(save_path)
+                frame.save(save_path)
                 logging.info(f"Screenshot saved to {save_path}")
                 return f"Screenshot captured and saved to {save_path}"
             except Exception as e:
                 logging.error(f"Failed to save screenshot: {e}")
                 return f"Screenshot captured but failed to save: {str(e)}"
         else:
-            # Convert to base64 for transmission
-            buffer = io.BytesIO()
-            screenshot.save(buffer, format='PNG')
-            img_str = base64.b64encode(buffer.getvalue()).decode()
-            logging.info("Screenshot captured and converted to base64")
-            return f"Screenshot captured successfully. Image data available."
+            # Nothing consumes the image bytes here, so the frame is not encoded
+            return f"Screenshot captured successfully ({frame.width}x{frame.height}). Image data available."
 
     except Exception as e:
         logging.error(f"Error capturing screenshot: {e}")
         return f"Failed to capture screenshot: {str(e)}"
 
 @function_tool()
-async def get_screen_info(
+@tool_executor(INPUT)
+def get_screen_info(
     context: RunContext  # type: ignore
 ) -> str:
     """
@@ -317,7 +589,7 @@ async def get_screen_info(
 
         info = f"""Screen Information:
 - Resolution: {screen_size.width} x {screen_size.height}
-- Current mouse position
+- Current mouse position: ({mouse_pos.x}, {mouse_pos.y})
 - Screen area: {screen_size.width * screen_size.height} pixels"""
 
         logging.info("Screen information retrieved")
@@ -327,11 +599,24 @@ async def get_screen_info(
         logging.error(f"Error getting screen info: {e}")
         return f"Failed to get screen information: {str(e)}"
 
+def _parse_region(region):
+    x, y, width, height = map(int, region.split(','))
+    return x, y, width, height
+
+def _locate_on_screen(image_path, confidence, region=None, find_all=False, multi_scale=False):
+    frame = screen_capture.get_frame(max_age=0.1, copy=True)
+    scales = (0.75, 0.9, 1.0, 1.1, 1.25, 1.5) if multi_scale else (1.0,)
+    return template_matcher.find(frame, image_path, threshold=confidence, region=region,
+                                 scales=scales, max_results=10 if find_all else 1)
+
 @function_tool()
 async def find_on_screen(
     context: RunContext,  # type: ignore
     image_path: str,
-    confidence: float = 0.8
+    confidence: float = 0.8,
+    region: Optional[str] = None,
+    find_all: bool = False,
+    multi_scale: bool = False
 ) -> str:
     """
     Find an image on the screen using template matching.
@@ -339,30 +624,230 @@ async def find_on_screen(
     Args:
         image_path: Path to the template image to find
         confidence: Confidence threshold (0.0 to 1.0)
+        region: Optional region to search in format 'x,y,width,height' (faster than the full screen)
+        find_all: Return every occurrence instead of only the best one
+        multi_scale: Also try the template at other sizes (e.g., after a display scaling change)
     """
     try:
         # Check if file exists
         if not os.path.exists(image_path):
             return f"Template image not found: {image_path}"
 
-        # Find the image on screen
-        location = pyautogui.locateOnScreen(image_path, confidence=confidence)
+        bbox = None
+        if region:
+            try:
+                bbox = _parse_region(region)
+            except ValueError:
+                return "Invalid region format. Use 'x,y,width,height' (e.g., '100,100,800,600')"
+
+        # Matching runs on a worker thread against the shared frame cache
+        matches = await runtime.run(IO, _locate_on_screen, image_path, confidence, bbox, find_all, multi_scale)
 
-        if location:
-            center = pyautogui.center(location)
-            result = f"Image found at position: {center.x}, {center.y} (region: {location})"
-            logging.info(f"Image found: {result}")
-            return result
-        else:
+        if not matches:
             logging.info(f"Image not found on screen: {image_path}")
             return f"Image not found on screen with confidence {confidence}"
 
+        if find_all:
+            result = f"Image found {len(matches)} time(s):\n"
+            for m in matches:
+                center_x, center_y = match_center(m)
+                result += f"- position {center_x}, {center_y} (region: {m.x},{m.y},{m.width},{m.height}, score {m.score:.2f})\n"
+        else:
+            m = matches[0]
+            center_x, center_y = match_center(m)
+            result = f"Image found at position: {center_x}, {center_y} (region: {m.x},{m.y},{m.width},{m.height}, score {m.score:.2f})"
+        logging.info(f"Image found: {result}")
+        return result
+
     except Exception as e:
         logging.error(f"Error finding image on screen: {e}")
         return f"Failed to find image on screen: {str(e)}"
 
+def _locate_many_on_screen(image_paths, confidence, region=None):
+    frame = screen_capture.get_frame(max_age=0.1, copy=True)
+    return shared_frame_matcher.find_many(frame, image_paths, runtime.executor(CPU),
+                                          threshold=confidence, region=region)
+
+@function_tool()
+@tool_executor(IO)
+def find_many_on_screen(
+    context: RunContext,  # type: ignore
+    image_paths: List[str],
+    confidence: float = 0.8,
+    region: Optional[str] = None
+) -> str:
+    """
+    Find several images on the screen at once, from a single screen capture.
+    Much faster than calling find_on_screen once per image.
+
+    Args:
+        image_paths: Paths to the template images to find
+        confidence: Confidence threshold (0.0 to 1.0)
+        region: Optional region to search in format 'x,y,width,height'
+    """
+    try:
+        bbox = None
+        if region:
+            try:
+                bbox = _parse_region(region)
+            except ValueError:
+                return "Invalid region format. Use 'x,y,width,height' (e.g., '100,100,800,600')"
+
+        missing = [path for path in image_paths if not os.path.exists(path)]
+        found = _locate_many_on_screen([p for p in image_paths if p not in missing], confidence, bbox)
+
+        locations = {}
+        for path in image_paths:
+            matches = found.get(path)
+            if path in missing:
+                locations[path] = "template image not found"
+            elif isinstance(matches, Exception):
+                locations[path] = f"error: {matches}"
+            elif matches:
+                center_x, center_y = match_center(matches[0])
+                locations[path] = {"x": center_x, "y": center_y, "score": round(matches[0].score, 2)}
+            else:
+                locations[path] = None
+
+        located = sum(1 for v in locations.values() if isinstance(v, dict))
+        logging.info(f"Located {located} of {len(image_paths)} images on screen")
+        return f"Located {located} of {len(image_paths)} images (center coordinates, null if not on screen):\n" + json.dumps(locations)
+
+    except Exception as e:
+        logging.error(f"Error finding images on screen: {e}")
+        return f"Failed to find images on screen: {str(e)}"
+
 @function_tool()
-async def click_on_screen(
+@tool_executor(IO)
+def wait_for_screen_change(
+    context: RunContext,  # type: ignore
+    timeout: float = 10.0,
+    region: Optional[str] = None,
+    min_size: int = 0
+) -> str:
+    """
+    Wait until something on the screen changes, e.g. a page finished loading or a dialog appeared.
+    Use this instead of repeatedly taking screenshots.
+
+    Args:
+        timeout: Maximum seconds to wait (max 120)
+        region: Optional region to watch in format 'x,y,width,height'
+        min_size: Ignore changed areas smaller than this many pixels (e.g. a blinking cursor)
+    """
+    try:
+        bbox = None
+        if region:
+            try:
+                bbox = _parse_region(region)
+            except ValueError:
+                return "Invalid region format. Use 'x,y,width,height' (e.g., '100,100,800,600')"
+
+        result = screen_watcher.wait_for_change(timeout=min(max(timeout, 0.0), 120.0), region=bbox,
+                                                min_area=min_size)
+        regions = result["regions"]
+        if not regions:
+            return f"No screen change within {timeout:g} seconds"
+
+        changed = "; ".join(f"{x},{y},{w},{h}" for x, y, w, h in regions[:10])
+        more = f" (and {len(regions) - 10} more)" if len(regions) > 10 else ""
+        logging.info(f"Screen changed after {result['elapsed']:.1f}s in {len(regions)} regions")
+        return f"Screen changed after {result['elapsed']:.1f} seconds in {len(regions)} region(s) (x,y,width,height): {changed}{more}"
+
+    except Exception as e:
+        logging.error(f"Error waiting for screen change: {e}")
+        return f"Failed to watch the screen: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def wait_for_element(
+    context: RunContext,  # type: ignore
+    image_path: str,
+    timeout: float = 10.0,
+    confidence: float = 0.8,
+    region: Optional[str] = None
+) -> str:
+    """
+    Wait until an image or UI element appears on the screen, then return its position.
+
+    Args:
+        image_path: Path to the template image to wait for
+        timeout: Maximum seconds to wait (max 120)
+        confidence: Confidence threshold (0.0 to 1.0)
+        region: Optional region to watch in format 'x,y,width,height'
+    """
+    try:
+        if not os.path.exists(image_path):
+            return f"Template image not found: {image_path}"
+
+        bbox = None
+        if region:
+            try:
+                bbox = _parse_region(region)
+            except ValueError:
+                return "Invalid region format. Use 'x,y,width,height' (e.g., '100,100,800,600')"
+
+        result = screen_watcher.wait_for_template(image_path, timeout=min(max(timeout, 0.0), 120.0),
+                                                  threshold=confidence, region=bbox)
+        m = result["match"]
+        if m is None:
+            return f"Image did not appear on screen within {timeout:g} seconds"
+
+        center_x, center_y = match_center(m)
+        logging.info(f"Element {image_path} appeared after {result['elapsed']:.1f}s")
+        return f"Image appeared after {result['elapsed']:.1f} seconds at position: {center_x}, {center_y} (region: {m.x},{m.y},{m.width},{m.height}, score {m.score:.2f})"
+
+    except Exception as e:
+        logging.error(f"Error waiting for element: {e}")
+        return f"Failed to wait for element: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def find_text_on_screen(
+    context: RunContext,  # type: ignore
+    text: str,
+    region: Optional[str] = None,
+    find_all: bool = False
+) -> str:
+    """
+    Find text on the screen (e.g. a button labelled "Save") using OCR and return where to click it.
+    Only parts of the screen that changed since the last call are read again.
+
+    Args:
+        text: Word or phrase to look for (case-insensitive)
+        region: Optional region to search in format 'x,y,width,height' (faster than the full screen)
+        find_all: Return every occurrence instead of only the best one
+    """
+    try:
+        bbox = None
+        if region:
+            try:
+                bbox = _parse_region(region)
+            except ValueError:
+                return "Invalid region format. Use 'x,y,width,height' (e.g., '100,100,800,600')"
+
+        frame = screen_capture.get_frame(max_age=0.1, region=bbox, copy=True)
+        # Uncached tiles are recognized in parallel on the CPU process pool
+        matches = screen_ocr.find(frame, text, runtime.executor(CPU))
+        if not matches:
+            logging.info(f"Text not found on screen: {text}")
+            return f"Text '{text}' not found on screen"
+
+        if not find_all:
+            matches = matches[:1]
+        result = f"Text found {len(matches)} time(s) (click coordinates):\n"
+        for m in matches[:20]:
+            center_x, center_y = word_center(m)
+            result += f"- '{m.text}' at position {center_x}, {center_y} (region: {m.x},{m.y},{m.width},{m.height}, confidence {m.confidence:.0f})\n"
+        logging.info(f"Text '{text}' found {len(matches)} time(s)")
+        return result
+
+    except Exception as e:
+        logging.error(f"Error finding text on screen: {e}")
+        return f"Failed to find text on screen: {str(e)}"
+
+@function_tool()
+@tool_executor(INPUT)
+def click_on_screen(
     context: RunContext,  # type: ignore
     x: int,
     y: int,
@@ -396,23 +881,30 @@ async def click_on_screen(
         return f"Failed to click on screen: {str(e)}"
 
 @function_tool()
-async def type_text(
+@tool_executor(INPUT)
+def type_text(
     context: RunContext,  # type: ignore
     text: str,
-    interval: float = 0.0
+    interval: float = 0.0,
+    method: str = "auto"
 ) -> str:
     """
-    Type text at the current cursor position.
+    Type text at the current cursor position. Any language and symbols are supported, and long text is fast.
 
     Args:
         text: Text to type
-        interval: Interval between keystrokes in seconds
+        interval: Interval between keystrokes in seconds (only for apps that need slow typing; ASCII only)
+        method: 'auto', 'paste' (through the clipboard, which is restored afterwards), 'keys' or 'chunked'
     """
     try:
-        pyautogui.typewrite(text, interval=interval)
-
-        result = f"Typed text: '{text}'"
-        logging.info(result)
+        if method not in TextInjector.STRATEGIES:
+            return f"Unknown method '{method}'. Use one of: {', '.join(TextInjector.STRATEGIES)}"
+        backend, missing, seconds = text_injector.type(text, strategy=method, interval=interval)
+
+        result = f"Typed text: '{text if len(text) <= 200 else text[:200] + '...'}'"
+        if missing:
+            result += f" ({missing} characters could not be typed with method '{backend}'; try method 'paste')"
+        logging.info(f"Typed {len(text)} characters via {backend} in {seconds:.2f}s")
         return result
 
     except Exception as e:
@@ -420,7 +912,8 @@ async def type_text(
         return f"Failed to type text: {str(e)}"
 
 @function_tool()
-async def press_key_combination(
+@tool_executor(INPUT)
+def press_key_combination(
     context: RunContext,  # type: ignore
     keys: str
 ) -> str:
@@ -444,7 +937,8 @@ async def press_key_combination(
         return f"Failed to press key combination: {str(e)}"
 
 @function_tool()
-async def open_application(
+@tool_executor(IO)
+def open_application(
     context: RunContext,  # type: ignore
     app_name: str,
     app_path: Optional[str] = None
@@ -527,32 +1021,42 @@ async def open_application(
         return f"Failed to open application: {str(e)}"
 
 @function_tool()
-async def close_application(
+@tool_executor(IO)
+def close_application(
     context: RunContext,  # type: ignore
-    process_name: str
+    process_name: str,
+    force: bool = False,
+    timeout: float = 5.0
 ) -> str:
     """
-    Close an application by process name.
+    Close an application by process name, including its child processes.
 
     Args:
         process_name: Process name to close (e.g., 'notepad.exe', 'chrome.exe')
+        force: Kill immediately instead of asking the application to close first
+        timeout: Seconds to wait for a graceful exit before killing (max 30)
     """
     try:
-        closed_count = 0
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                if proc.info['name'].lower() == process_name.lower():
-                    proc.terminate()
-                    closed_count += 1
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-
-        if closed_count > 0:
-            result = f"Closed {closed_count} instance(s) of {process_name}"
-        else:
+        # Looked up in the sampler's name index instead of scanning every process
+        records = process_sampler.find_by_name(process_name)
+        if not records:
             result = f"No running instances of {process_name} found"
+            logging.info(result)
+            return result
 
-        logging.info(result)
+        outcomes = terminate_tree(records, timeout=max(0.0, min(timeout, 30.0)), force=force)
+        closed = sum(1 for _, outcome in outcomes.values() if outcome in ("terminated", "killed", "already exited"))
+        failed = {pid: item for pid, item in outcomes.items() if item[1] in ("access denied", "still running")}
+
+        result = f"Closed {closed} of {len(outcomes)} process(es) for {len(records)} instance(s) of {process_name}\n"
+        for pid, (name, outcome) in sorted(outcomes.items(), key=lambda item: item[1][1] == "terminated")[:20]:
+            result += f"- {name} (PID: {pid}): {outcome}\n"
+        if len(outcomes) > 20:
+            result += f"... and {len(outcomes) - 20} more\n"
+        if failed:
+            result += f"{len(failed)} process(es) could not be closed"
+
+        logging.info(f"Closed {closed} of {len(outcomes)} processes for {process_name}")
         return result
 
     except Exception as e:
@@ -560,33 +1064,42 @@ async def close_application(
         return f"Failed to close application: {str(e)}"
 
 @function_tool()
-async def get_running_processes(
-    context: RunContext  # type: ignore
+@tool_executor(IO)
+def get_running_processes(
+    context: RunContext,  # type: ignore
+    sort_by: str = "cpu",
+    limit: int = 10,
+    name_filter: Optional[str] = None,
+    user: Optional[str] = None
 ) -> str:
     """
     Get a list of currently running processes.
+
+    Args:
+        sort_by: Sort by 'cpu', 'memory', 'io' (disk read/write rate) or 'threads'
+        limit: Number of processes to return (max 50)
+        name_filter: Only include processes whose name contains this text
+        user: Only include processes owned by this user
     """
     try:
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                processes.append({
-                    'pid': proc.info['pid'],
-                    'name': proc.info['name'],
-                    'cpu': round(proc.info['cpu_percent'], 1),
-                    'memory': round(proc.info['memory_percent'], 1)
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-
-        # Sort by CPU usage
-        processes.sort(key=lambda x: x['cpu'], reverse=True)
-
-        # Return top 10 processes
-        top_processes = processes[:10]
-        result = "Top 10 running processes:\n"
+        sort_by = sort_by.lower()
+        if sort_by not in SORT_KEYS:
+            return f"Unknown sort order '{sort_by}'. Use one of: {', '.join(SORT_KEYS)}"
+
+        # Served from the sampler's snapshot, CPU figures are deltas between samples
+        top_processes = process_sampler.top(max(1, min(limit, 50)), sort_by, name_filter, user)
+        if not top_processes:
+            return "No matching processes found"
+
+        result = f"Top {len(top_processes)} running processes by {sort_by}:\n"
         for proc in top_processes:
-            result += f"- {proc['name']} (PID: {proc['pid']}) - CPU: {proc['cpu']}%, Memory: {proc['memory']}%\n"
+            trend = ""
+            if len(proc.cpu_history) > 1:
+                average = sum(proc.cpu_history) / len(proc.cpu_history)
+                trend = f" (avg {average:.1f}% over {len(proc.cpu_history) * process_sampler.interval:.0f}s)"
+            result += (f"- {proc.name} (PID: {proc.pid}, user: {proc.username or 'unknown'}) - "
+                       f"CPU: {proc.cpu:.1f}%{trend}, Memory: {proc.memory_rss / 1024 ** 2:.0f} MB "
+                       f"({proc.memory_percent:.1f}%), I/O: {proc.io_rate / 1024:.0f} KB/s, Threads: {proc.threads}\n")
 
         logging.info("Running processes retrieved")
         return result
@@ -596,7 +1109,8 @@ async def get_running_processes(
         return f"Failed to get running processes: {str(e)}"
 
 @function_tool()
-async def create_file(
+@tool_executor(IO)
+def create_file(
     context: RunContext,  # type: ignore
     file_path: str,
     content: str = ""
@@ -626,39 +1140,266 @@ async def create_file(
         logging.error(f"Error creating file: {e}")
         return f"Failed to create file: {str(e)}"
 
+def _clip(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + f"\n... (truncated at {max_chars} chars)"
+
 @function_tool()
-async def read_file_content(
+@tool_executor(IO)
+def read_file_content(
     context: RunContext,  # type: ignore
     file_path: str,
-    max_chars: int = 1000
+    max_chars: int = 1000,
+    start_line: Optional[int] = None,
+    line_count: int = 50,
+    tail_lines: Optional[int] = None,
+    pattern: Optional[str] = None,
+    context_lines: int = 2,
+    byte_offset: Optional[int] = None
 ) -> str:
     """
-    Read content from a file.
+    Read content from a file. Works on files of any size and encoding: read the start, a range of
+    lines, the last lines (e.g. of a log), a byte range, or only the lines matching a pattern.
 
     Args:
         file_path: Path to the file to read
-        max_chars: Maximum number of characters to read
+        max_chars: Maximum number of characters to return
+        start_line: Read line_count lines starting at this line number (1-based, negative counts from the end)
+        line_count: Number of lines to read with start_line
+        tail_lines: Read this many lines from the end of the file
+        pattern: Regular expression (case-insensitive); return only matching lines with context
+        context_lines: Lines of context shown around each pattern match
+        byte_offset: Read max_chars bytes starting at this byte offset (negative counts from the end)
     """
     try:
         if not os.path.exists(file_path):
             return f"File not found: {file_path}"
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read(max_chars)
-
-        if len(content) == max_chars:
-            content += f"\n... (truncated, file is larger than {max_chars} chars)"
-
-        result = f"Content of {file_path}:\n{content}"
+        with MappedFile(file_path) as mf:
+            if mf.is_binary and byte_offset is None:
+                return f"{file_path} is a binary file ({mf.size} bytes). Use byte_offset to see raw bytes."
+
+            if pattern:
+                blocks = mf.grep(pattern, context=max(0, min(context_lines, 10)), ignore_case=True)
+                if not blocks:
+                    return f"No lines matching '{pattern}' in {file_path}"
+                matches = sum(1 for _, block in blocks for item in block if item[2])
+                parts = ["\n".join(f"{'>' if is_match else ' '} {number}: {line}" for number, line, is_match in block)
+                         for _, block in blocks]
+                limited = " (stopped at the first 50)" if matches >= 50 else ""
+                content = f"{matches} matching line(s){limited}:\n" + "\n--\n".join(parts)
+            elif tail_lines:
+                lines = mf.tail(max(1, tail_lines))
+                content = f"Last {len(lines)} line(s):\n" + "\n".join(line for _, line in lines)
+            elif start_line is not None:
+                lines = mf.lines(start_line, max(1, line_count))
+                content = "\n".join(f"{number}: {line}" for number, line in lines) or "(no lines in that range)"
+            elif byte_offset is not None:
+                if mf.is_binary:
+                    # Hex needs about three characters per byte
+                    data = mf.read_bytes(byte_offset, max(16, max_chars // 3))
+                    content = f"Bytes at offset {byte_offset} (hex):\n" + data.hex(" ", 1)
+                else:
+                    content = mf.decode(mf.read_bytes(byte_offset, max_chars))
+            else:
+                content, more = mf.head(max_chars)
+                if more:
+                    content += f"\n... (truncated, file is larger than {max_chars} chars)"
+                result = f"Content of {file_path}:\n{content}"
+                logging.info(f"Read file: {file_path}")
+                return result
+
+        if not mf.is_binary:
+            content = _clip(content, max_chars)
+        result = f"Content of {file_path} ({mf.size} bytes, {mf.encoding or 'binary'}):\n{content}"
         logging.info(f"Read file: {file_path}")
         return result
 
+    except re.error as e:
+        return f"Invalid pattern '{pattern}': {e}"
     except Exception as e:
         logging.error(f"Error reading file: {e}")
         return f"Failed to read file: {str(e)}"
 
 @function_tool()
-async def delete_file(
+@tool_executor(IO)
+def find_files(
+    context: RunContext,  # type: ignore
+    query: str,
+    mode: str = "substring",
+    limit: int = 20,
+    folder: Optional[str] = None
+) -> str:
+    """
+    Find files by name anywhere in the user's home folder, instantly, from a file index.
+
+    Args:
+        query: Part of the file name (e.g. 'tax'), a wildcard pattern for mode 'glob' (e.g. '*tax*.pdf'),
+               or an approximate name for mode 'fuzzy'
+        mode: 'substring', 'glob' or 'fuzzy' (tolerates typos)
+        limit: Maximum number of results (max 100)
+        folder: Only return files inside this folder
+    """
+    try:
+        if mode not in SEARCH_MODES:
+            return f"Unknown search mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}"
+        if not file_index.wait_ready(timeout=5.0):
+            return f"The file index is still being built ({file_index.progress} files so far). Try again in a moment."
+
+        under = os.path.abspath(os.path.expanduser(folder)) if folder else None
+        results, total = file_index.search(query, mode=mode, limit=max(1, min(limit, 100)), under=under)
+        if not results:
+            return f"No files matching '{query}' found"
+
+        result = f"Found {total} file(s) matching '{query}'"
+        result += f", showing the best {len(results)}:\n" if total > len(results) else ":\n"
+        result += "\n".join(f"📄 {path}" for path in results)
+        logging.info(f"Found {total} files matching '{query}'")
+        return result
+
+    except Exception as e:
+        logging.error(f"Error finding files: {e}")
+        return f"Failed to find files: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def search_file_contents(
+    context: RunContext,  # type: ignore
+    text: str,
+    folder: Optional[str] = None,
+    file_pattern: Optional[str] = None,
+    regex: bool = False,
+    case_sensitive: bool = False,
+    max_results: int = 50
+) -> str:
+    """
+    Search inside files for text, across a whole folder tree (like grep). Binary files,
+    hidden folders, dependency/build folders and .gitignore'd files are skipped.
+
+    Args:
+        text: The text to look for (a regular expression if regex is true)
+        folder: Folder to search (defaults to the home folder)
+        file_pattern: Only search files whose name matches this wildcard (e.g. '*.py')
+        regex: Treat text as a regular expression
+        case_sensitive: Match upper/lower case exactly
+        max_results: Maximum number of matching lines (max 200); the search stops once found
+    """
+    try:
+        root = os.path.abspath(os.path.expanduser(folder or "~"))
+        if not os.path.isdir(root):
+            return f"Folder '{root}' does not exist"
+
+        pattern = text if regex else re.escape(text)
+        matches, stats = content_search.search(root, pattern, runtime.executor(CPU),
+                                               ignore_case=not case_sensitive,
+                                               max_results=max(1, min(max_results, 200)),
+                                               file_pattern=file_pattern)
+        if not matches:
+            return f"No matches for '{text}' in {stats['files']} files under {root}"
+
+        result = f"Found {len(matches)}{'+' if stats['truncated'] else ''} match(es) for '{text}' " \
+                 f"in {len({m[0] for m in matches})} file(s)"
+        result += f" (stopped early after {stats['files']} files):\n" if stats["truncated"] else \
+                  f" ({stats['files']} files searched):\n"
+        result += "\n".join(f"{os.path.relpath(path, root)}:{number}: {line}" for path, number, line in matches)
+        logging.info(f"Content search for '{text}' under {root}: {len(matches)} matches "
+                     f"in {stats['seconds']:.2f}s")
+        return result
+
+    except re.error as e:
+        return f"Invalid pattern '{text}': {e}"
+    except Exception as e:
+        logging.error(f"Error searching file contents: {e}")
+        return f"Failed to search file contents: {str(e)}"
+
+def _format_size(num_bytes):
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.0f} {unit}" if unit == "bytes" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+@function_tool()
+@tool_executor(IO)
+def analyze_disk_usage(
+    context: RunContext,  # type: ignore
+    folder: Optional[str] = None,
+    limit: int = 10,
+    rescan: bool = False
+) -> str:
+    """
+    Find what is taking up disk space: the total size of a folder, its largest subfolders and largest files.
+
+    Args:
+        folder: Folder to analyze (defaults to the home folder)
+        limit: How many of the largest subfolders and files to list (max 50)
+        rescan: Re-measure everything instead of reusing sizes of unchanged folders from earlier scans
+    """
+    try:
+        root = os.path.abspath(os.path.expanduser(folder or "~"))
+        if not os.path.isdir(root):
+            return f"Folder '{root}' does not exist"
+
+        usage = disk_usage.analyze(root, limit=max(1, min(limit, 50)), rescan=rescan)
+        result = f"{root}: {_format_size(usage['total_bytes'])} in {usage['file_count']} files " \
+                 f"and {usage['dir_count']} folders\n"
+        if usage["largest_dirs"]:
+            result += "\nLargest folders:\n"
+            result += "\n".join(f"📁 {os.path.basename(path)} ({_format_size(size)})"
+                                for size, path in usage["largest_dirs"])
+        if usage["largest_files"]:
+            result += "\n\nLargest files:\n"
+            result += "\n".join(f"📄 {path} ({_format_size(size)})" for size, path in usage["largest_files"])
+        logging.info(f"Analyzed disk usage of {root} in {usage['seconds']:.2f}s "
+                     f"({usage['listed']} folders read from disk)")
+        return result
+
+    except Exception as e:
+        logging.error(f"Error analyzing disk usage: {e}")
+        return f"Failed to analyze disk usage: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def find_duplicate_files(
+    context: RunContext,  # type: ignore
+    folder: Optional[str] = None,
+    min_size_kb: int = 100,
+    limit: int = 10
+) -> str:
+    """
+    Find files with identical content, largest wasted space first.
+
+    Args:
+        folder: Folder to search, including subfolders (defaults to the home folder)
+        min_size_kb: Ignore files smaller than this many KB
+        limit: Maximum number of duplicate groups to list (max 50)
+    """
+    try:
+        root = os.path.abspath(os.path.expanduser(folder or "~"))
+        if not os.path.isdir(root):
+            return f"Folder '{root}' does not exist"
+
+        limit = max(1, min(limit, 50))
+        groups, stats = duplicate_finder.find(root, min_size=max(1, min_size_kb * 1024))
+        if not groups:
+            return f"No duplicate files found among {stats.get('files', 0)} files in {root}"
+
+        result = f"Found {len(groups)} group(s) of duplicate files wasting {_format_size(stats['wasted_bytes'])}"
+        result += f", showing the largest {limit}:\n" if len(groups) > limit else ":\n"
+        for size, paths in groups[:limit]:
+            result += f"\n{len(paths)} copies of {_format_size(size)}:\n"
+            result += "\n".join(f"📄 {path}" for path in paths) + "\n"
+        logging.info(f"Found {len(groups)} duplicate groups in {root} in {stats['seconds']:.2f}s, "
+                     f"{stats.get('full_hashed', 0)} files fully hashed")
+        return result
+
+    except Exception as e:
+        logging.error(f"Error finding duplicate files: {e}")
+        return f"Failed to find duplicate files: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def delete_file(
     context: RunContext,  # type: ignore
     file_path: str
 ) -> str:
@@ -686,30 +1427,56 @@ async def delete_file(
         return f"Failed to delete file: {str(e)}"
 
 @function_tool()
-async def list_directory(
+@tool_executor(IO)
+def list_directory(
     context: RunContext,  # type: ignore
-    directory_path: str = "."
+    directory_path: str = ".",
+    sort_by: str = "name",
+    descending: bool = False,
+    pattern: Optional[str] = None,
+    extensions: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    show_hidden: bool = True
 ) -> str:
     """
-    List contents of a directory.
+    List contents of a directory, one page at a time.
 
     Args:
         directory_path: Path to the directory to list (default: current directory)
+        sort_by: Sort by 'name' (folders first), 'size' or 'mtime' (modification time)
+        descending: Reverse the order (e.g. largest or newest first)
+        pattern: Optional glob pattern for names (e.g. '*.pdf', 'report*')
+        extensions: Optional comma-separated extensions to include (e.g. 'jpg,png')
+        limit: Number of entries per page (max 500)
+        cursor: Cursor from a previous call to get the next page (it keeps that call's sort order and filters)
+        show_hidden: Include entries whose names start with a dot
     """
     try:
         if not os.path.exists(directory_path):
             return f"Directory not found: {directory_path}"
+        if sort_by not in SORT_FIELDS:
+            return f"Unknown sort order '{sort_by}'. Use one of: {', '.join(SORT_FIELDS)}"
+
+        ext_list = [e.strip() for e in extensions.split(",") if e.strip()] if extensions else None
+        page = list_entries(directory_path, sort_by=sort_by, descending=descending, pattern=pattern,
+                            extensions=ext_list, include_hidden=show_hidden,
+                            limit=max(1, min(limit, 500)), cursor=cursor)
 
         items = []
-        for item in os.listdir(directory_path):
-            item_path = os.path.join(directory_path, item)
-            if os.path.isdir(item_path):
-                items.append(f"📁 {item}/")
+        for entry in page["entries"]:
+            if entry.is_dir:
+                items.append(f"📁 {entry.name}/")
             else:
-                size = os.path.getsize(item_path)
-                items.append(f"📄 {item} ({size} bytes)")
-
-        result = f"Contents of {directory_path}:\n" + "\n".join(items)
+                modified = datetime.fromtimestamp(entry.mtime).strftime("%Y-%m-%d %H:%M")
+                items.append(f"📄 {entry.name} ({entry.size} bytes, modified {modified})")
+
+        summary = f"{page['dirs']} folder(s), {page['files']} file(s)"
+        if page["total_size"] is not None:
+            summary += f", {page['total_size'] / 1024 ** 2:.1f} MB in files"
+        result = f"Contents of {directory_path} ({summary}):\n" + "\n".join(items)
+        if page["next_cursor"]:
+            result += f"\nShowing {len(items)} entries. More available, call again with cursor='{page['next_cursor']}'"
         logging.info(f"Listed directory: {directory_path}")
         return result
 
@@ -717,21 +1484,32 @@ async def list_directory(
         logging.error(f"Error listing directory: {e}")
         return f"Failed to list directory: {str(e)}"
 
+def _format_rate(value):
+    if value is None:
+        return "n/a"
+    if value >= 1024 ** 2:
+        return f"{value / 1024 ** 2:.1f} MB/s"
+    return f"{value / 1024:.0f} KB/s"
+
 @function_tool()
-async def get_system_info(
-    context: RunContext  # type: ignore
+@tool_executor(IO)
+def get_system_info(
+    context: RunContext,  # type: ignore
+    window_minutes: int = 5
 ) -> str:
     """
-    Get system information including CPU, memory, disk usage.
+    Get system information including CPU, memory, disk usage, network, temperature and battery,
+    with averages and peaks over a recent window.
+
+    Args:
+        window_minutes: How many recent minutes the averages and peaks cover (max 60)
     """
     try:
-        # CPU info
-        cpu_percent = psutil.cpu_percent(interval=1)
-        cpu_count = psutil.cpu_count()
+        # Answered from the background telemetry buffers, no blocking measurement
+        info = telemetry.summary(window=max(1, min(window_minutes, 60)) * 60)
 
         # Memory info
         memory = psutil.virtual_memory()
-        memory_percent = memory.percent
         memory_total = round(memory.total / (1024**3), 2)  # GB
         memory_used = round(memory.used / (1024**3), 2)   # GB
 
@@ -741,12 +1519,28 @@ async def get_system_info(
         disk_total = round(disk.total / (1024**3), 2)     # GB
         disk_used = round(disk.used / (1024**3), 2)       # GB
 
+        def pct(value):
+            return "n/a" if value is None else f"{value:.1f}%"
+
+        window = f"last {info['window'] / 60:.0f} min" if info['window'] >= 60 else f"last {info['window']:.0f}s"
         result = f"""System Information:
-CPU: {cpu_percent}% usage ({cpu_count} cores)
-Memory: {memory_percent}% usage ({memory_used}GB / {memory_total}GB)
+CPU: {pct(info['cpu'])} usage ({info['cores']} cores), {window} avg {pct(info['cpu_avg'])}, peak {pct(info['cpu_peak'])}
+Per core: {', '.join(f'{v:.0f}%' for v in info['cpu_per_core'])}
+Memory: {pct(info['memory'])} usage ({memory_used}GB / {memory_total}GB), avg {pct(info['memory_avg'])}, peak {pct(info['memory_peak'])}
 Disk: {disk_percent}% usage ({disk_used}GB / {disk_total}GB)
+Disk I/O: read {_format_rate(info['disk_read'])} (peak {_format_rate(info['disk_read_peak'])}), write {_format_rate(info['disk_write'])} (peak {_format_rate(info['disk_write_peak'])})
+Network: down {_format_rate(info['net_recv'])} (peak {_format_rate(info['net_recv_peak'])}), up {_format_rate(info['net_sent'])} (peak {_format_rate(info['net_sent_peak'])})
 Platform: {os.name}"""
 
+        if info['temperature'] is not None:
+            result += f"\nTemperature: {info['temperature']:.0f}°C (peak {info['temperature_peak']:.0f}°C)"
+        if info['battery'] is not None:
+            state = "plugged in" if info['battery_plugged'] else "on battery"
+            result += f"\nBattery: {info['battery']:.0f}% ({state}"
+            if info['battery_secs_left'] and not info['battery_plugged']:
+                result += f", about {info['battery_secs_left'] // 60} min left"
+            result += ")"
+
         logging.info("System information retrieved")
         return result
 
@@ -755,7 +1549,8 @@ Platform: {os.name}"""
         return f"Failed to get system information: {str(e)}"
 
 @function_tool()
-async def control_volume(
+@tool_executor(INPUT)
+def control_volume(
     context: RunContext,  # type: ignore
     action: str,
     level: Optional[int] = None
@@ -796,7 +1591,8 @@ async def control_volume(
         return f"Failed to control volume: {str(e)}"
 
 @function_tool()
-async def window_management(
+@tool_executor(INPUT)
+def window_management(
     context: RunContext,  # type: ignore
     action: str,
     window_title: Optional[str] = None
@@ -848,18 +1644,13 @@ async def scroll_page(
         amount: Number of scroll steps
     """
     try:
-        for _ in range(amount):
-            if direction == "up":
-                pyautogui.scroll(1)
-            elif direction == "down":
-                pyautogui.scroll(-1)
-            elif direction == "left":
-                pyautogui.hscroll(-1)
-            elif direction == "right":
-                pyautogui.hscroll(1)
-            else:
-                return "Invalid direction. Use: up, down, left, right"
-            time.sleep(0.1)  # Small delay between scrolls
+        signs = {"up": (1, False), "down": (-1, False), "left": (-1, True), "right": (1, True)}
+        if direction not in signs:
+            return "Invalid direction. Use: up, down, left, right"
+
+        # One multi-notch wheel event on the input thread instead of a step per notch
+        sign, horizontal = signs[direction]
+        await input_dispatcher.run(input_dispatcher.scroll(sign * amount, horizontal=horizontal))
 
         result = f"Scrolled {direction} {amount} times"
         logging.info(result)
@@ -873,44 +1664,66 @@ async def scroll_page(
 async def run_command(
     context: RunContext,  # type: ignore
     command: str,
-    shell: bool = True
+    shell: bool = True,
+    timeout: float = 30,
+    working_directory: Optional[str] = None,
+    session: Optional[str] = None
 ) -> str:
     """
-    Run a system command and return the output.
+    Run a system command and return the output. Shell commands run in a fresh shell (cmd.exe on
+    Windows) unless a session is named: then they run in a persistent shell (bash, or PowerShell on
+    Windows), so 'cd' and environment variables carry over to the next command in the same session.
 
     Args:
         command: Command to execute
         shell: Whether to run in shell mode
+        timeout: Seconds to wait before stopping the command (max 600); output printed so far is still returned
+        working_directory: Directory to run the command in (in a session, it stays the current directory)
+        session: Optional name of a persistent shell session; commands in one session run one at a time,
+                 so use another name to run commands in parallel
     """
     try:
-        result = subprocess.run(
-            command,
-            shell=shell,
-            capture_output=True,
-            text=True,
-            timeout=30  # 30 second timeout
-        )
+        cwd = os.path.expanduser(working_directory) if working_directory else None
+        timeout = max(1, min(timeout, 600))
+        if shell and session:
+            # Written into a warm shell; a session that crashed or timed out is started again
+            start = time.monotonic()
+            returncode, stdout, stderr, state = await shell_pool.run(session, command, timeout=timeout, cwd=cwd)
+            elapsed = time.monotonic() - start
+        else:
+            # Runs on the event loop as a subprocess; long outputs keep only their start and end
+            result = await command_runner.run(command, shell=shell, timeout=timeout, cwd=cwd)
+            returncode, stdout, stderr, elapsed = result.returncode, result.stdout, result.stderr, result.elapsed
+            state = "timeout" if result.timed_out else "ok"
 
         output = f"Command: {command}\n"
-        output += f"Return code: {result.returncode}\n"
+        if state == "timeout":
+            output += f"Command timed out after {elapsed:.0f}s and was stopped; partial output below\n"
+            if shell and session:
+                output += f"The shell session '{session}' was reset (directory and variables are lost)\n"
+        else:
+            if state == "restarted":
+                output += f"Note: the shell session '{session}' had ended and was started again\n"
+            elif state == "crashed":
+                output += f"The shell session '{session}' ended; the next command starts a new one\n"
+            output += f"Return code: {returncode}\n"
 
-        if result.stdout:
-            output += f"Output:\n{result.stdout}\n"
+        if stdout.total:
+            output += f"Output:\n{stdout.text()}\n"
 
-        if result.stderr:
-            output += f"Errors:\n{result.stderr}\n"
+        if stderr.total:
+            output += f"Errors:\n{stderr.text()}\n"
 
-        logging.info(f"Executed command: {command}")
+        logging.info(f"Executed command: {command} in {elapsed:.2f}s")
         return output
 
-    except subprocess.TimeoutExpired:
-        return f"Command timed out: {command}"
     except Exception as e:
         logging.error(f"Error running command: {e}")
         return f"Failed to run command: {str(e)}"
 
 @function_tool()
-async def advanced_window_control(
+@tool_executor(IO)
+def advanced_window_control(
     context: RunContext,  # type: ignore
     action: str,
     window_title: Optional[str] = None,
@@ -1005,44 +1818,54 @@ async def mouse_automation(
     Advanced mouse automation including drag operations.
 
     Args:
-        action: 'click', 'double_click', 'right_click', 'drag', 'move', 'scroll_up', 'scroll_down'
+        action: 'click', 'double_click', 'right_click', 'drag', 'move', 'scroll_up', 'scroll_down',
+                or 'stop' to cancel a move or drag in progress
         x, y: Coordinates for mouse actions
         button: Mouse button ('left', 'right', 'middle')
-        duration: Duration for drag operations
+        duration: Duration for move and drag operations in seconds
     """
     try:
         if action in ['click', 'double_click', 'right_click', 'move', 'drag'] and (x is None or y is None):
             return "Coordinates (x, y) are required for this action"
 
+        # Everything runs on the input thread; motion is stepped there on a monotonic clock
         if action == "click":
-            pyautogui.click(x, y, button=button)
+            await input_dispatcher.run(input_dispatcher.submit(pyautogui.click, x, y, button=button))
             return f"Clicked at ({x}, {y}) with {button} button"
 
         elif action == "double_click":
-            pyautogui.doubleClick(x, y, button=button)
+            await input_dispatcher.run(input_dispatcher.submit(pyautogui.doubleClick, x, y, button=button))
             return f"Double-clicked at ({x}, {y}) with {button} button"
 
         elif action == "right_click":
-            pyautogui.rightClick(x, y)
+            await input_dispatcher.run(input_dispatcher.submit(pyautogui.rightClick, x, y))
             return f"Right-clicked at ({x}, {y})"
 
         elif action == "move":
-            pyautogui.moveTo(x, y, duration=duration)
+            result = await input_dispatcher.run(input_dispatcher.move(x, y, duration=duration))
+            if result["cancelled"]:
+                return f"Mouse move stopped at {result['position']}"
             return f"Moved mouse to ({x}, {y})"
 
         elif action == "drag":
-            current_pos = pyautogui.position()
-            pyautogui.dragTo(x, y, duration=duration, button=button)
-            return f"Dragged from ({current_pos.x}, {current_pos.y}) to ({x}, {y})"
+            current_pos = await input_dispatcher.run(input_dispatcher.submit(pyautogui.position))
+            result = await input_dispatcher.run(input_dispatcher.move(x, y, duration=duration, button=button))
+            if result["cancelled"]:
+                return f"Drag from ({current_pos[0]}, {current_pos[1]}) stopped at {result['position']}"
+            return f"Dragged from ({current_pos[0]}, {current_pos[1]}) to ({x}, {y})"
 
         elif action == "scroll_up":
-            pyautogui.scroll(3)
+            await input_dispatcher.run(input_dispatcher.scroll(3))
             return "Scrolled up"
 
         elif action == "scroll_down":
-            pyautogui.scroll(-3)
+            await input_dispatcher.run(input_dispatcher.scroll(-3))
             return "Scrolled down"
 
+        elif action == "stop":
+            input_dispatcher.cancel_motion()
+            return "Stopped mouse movement"
+
         else:
             return "Invalid action"
 
@@ -1051,7 +1874,8 @@ async def mouse_automation(
         return f"Failed mouse automation: {str(e)}"
 
 @function_tool()
-async def keyboard_automation(
+@tool_executor(INPUT)
+def keyboard_automation(
     context: RunContext,  # type: ignore
     action: str,
     text: Optional[str] = None,
@@ -1069,8 +1893,8 @@ async def keyboard_automation(
     """
     try:
         if action == "type" and text:
-            pyautogui.typewrite(text, interval=0.05)
-            return f"Typed: {text}"
+            _, missing, _ = text_injector.type(text)
+            return f"Typed: {text}" + (f" ({missing} characters could not be typed)" if missing else "")
 
         elif action == "press" and key:
             pyautogui.press(key)
@@ -1096,7 +1920,172 @@ async def keyboard_automation(
         return f"Failed keyboard automation: {str(e)}"
 
 @function_tool()
-async def manage_startup_programs(
+@tool_executor(IO)
+def record_macro(
+    context: RunContext,  # type: ignore
+    action: str,
+    name: Optional[str] = None
+) -> str:
+    """
+    Record the user's mouse clicks, drags, scrolls and typing as a named macro that can be replayed later.
+    Each click remembers what was under the pointer, so replay still works if the window moves.
+
+    Args:
+        action: 'start' to begin recording, 'stop' to finish and save it, 'cancel' to discard it
+        name: Name to save the macro under (required for 'stop')
+    """
+    try:
+        if action == "start":
+            macro_recorder.start()
+            return "Recording started. Perform the actions, then ask me to stop recording."
+
+        elif action == "stop":
+            if not name:
+                return "A name is required to save the macro"
+            steps = macro_recorder.stop(lambda number, pixels: macro_store.write_anchor(name, number, pixels))
+            if not steps:
+                return "Nothing was recorded"
+            plan = macro_store.save(name, steps)
+            logging.info(f"Recorded macro '{name}': {len(steps)} steps")
+            return f"Saved macro '{name}' with {len(steps)} steps ({len(plan)} after merging)"
+
+        elif action == "cancel":
+            macro_recorder.stop()
+            return "Recording discarded"
+
+        else:
+            return "Invalid action. Use: start, stop, cancel"
+
+    except MacroError as e:
+        return str(e)
+    except Exception as e:
+        logging.error(f"Error recording macro: {e}")
+        return f"Failed to record macro: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def define_macro(
+    context: RunContext,  # type: ignore
+    name: str,
+    steps: str
+) -> str:
+    """
+    Save a sequence of input steps as a named macro, so it can be replayed in one run_macro call.
+
+    Args:
+        name: Name of the macro
+        steps: JSON list of steps, each with an "action":
+               {"action": "click", "x": 100, "y": 200} or {"action": "click", "image": "save.png"}
+               or {"action": "click", "text": "Export"} (optional "button", "clicks"),
+               {"action": "type", "text": "hello"}, {"action": "keys", "keys": "ctrl+s"},
+               {"action": "scroll", "amount": -3}, {"action": "move"/"drag", "x": 10, "y": 20}
+               (a drag may start from "from_x"/"from_y" or an "image"/"text"),
+               {"action": "wait", "seconds": 1}, {"action": "wait_for", "image"/"text": ..., "timeout": 10}
+    """
+    try:
+        try:
+            parsed = json.loads(steps)
+        except json.JSONDecodeError as e:
+            return f"Steps are not valid JSON: {e}"
+        plan = macro_store.save(name, parsed)
+        logging.info(f"Defined macro '{name}': {len(parsed)} steps")
+        return f"Saved macro '{name}' with {len(parsed)} steps ({len(plan)} after merging)"
+
+    except MacroError as e:
+        return str(e)
+    except Exception as e:
+        logging.error(f"Error defining macro: {e}")
+        return f"Failed to define macro: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def run_macro(
+    context: RunContext,  # type: ignore
+    name: str,
+    verify: bool = True,
+    repeat: int = 1
+) -> str:
+    """
+    Replay a saved macro in one go. Before each anchored click the target is found on screen again;
+    if it is missing the macro stops at that step instead of clicking blind.
+
+    Args:
+        name: Name of the macro
+        verify: Check click targets on screen before clicking (disable only for fixed layouts)
+        repeat: How many times to run the macro
+    """
+    try:
+        try:
+            plan = macro_store.plan(name)
+        except KeyError:
+            return f"No macro named '{name}'"
+
+        repeat = max(1, min(repeat, 100))
+        elapsed = 0.0
+        for run in range(1, repeat + 1):
+            # Runs on this worker thread; input goes through the input thread, OCR through the CPU pool
+            result = macro_player.run(plan, verify=verify, ocr_executor=runtime.executor(CPU))
+            elapsed += result["elapsed"]
+            if result["error"]:
+                logging.info(f"Macro '{name}' stopped: {result['error']}")
+                return (f"Macro '{name}' stopped on run {run} after {result['steps']} of {len(plan)} operations: "
+                        f"{result['error']}")
+
+        logging.info(f"Macro '{name}' ran {repeat} time(s) in {elapsed:.2f}s")
+        return f"Ran macro '{name}' ({len(plan)} operations) {repeat} time(s) in {elapsed:.2f}s"
+
+    except Exception as e:
+        logging.error(f"Error running macro: {e}")
+        return f"Failed to run macro: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def manage_macros(
+    context: RunContext,  # type: ignore
+    action: str,
+    name: Optional[str] = None
+) -> str:
+    """
+    List, show or delete saved macros, or stop a macro that is running.
+
+    Args:
+        action: 'list', 'show', 'delete', 'stop'
+        name: Name of the macro (for 'show' and 'delete')
+    """
+    try:
+        if action == "list":
+            macros = macro_store.names()
+            if not macros:
+                return "No macros saved"
+            return "Saved macros:\n" + "\n".join(f"- {n} ({count} steps)" for n, count in macros.items())
+
+        elif action == "stop":
+            macro_player.stop()
+            input_dispatcher.cancel_motion()
+            return "Stopping the running macro"
+
+        elif action in ["show", "delete"]:
+            if not name:
+                return "A macro name is required"
+            try:
+                if action == "delete":
+                    macro_store.delete(name)
+                    return f"Deleted macro '{name}'"
+                steps = macro_store.steps(name)
+            except KeyError:
+                return f"No macro named '{name}'"
+            return f"Macro '{name}':\n" + "\n".join(f"{i}. {json.dumps(step)}" for i, step in enumerate(steps, 1))
+
+        else:
+            return "Invalid action. Use: list, show, delete, stop"
+
+    except Exception as e:
+        logging.error(f"Error managing macros: {e}")
+        return f"Failed to manage macros: {str(e)}"
+
+@function_tool()
+@tool_executor(IO)
+def manage_startup_programs(
     context: RunContext,  # type: ignore
     action: str,
     program_name: Optional[str] = None,
@@ -1159,7 +2148,8 @@ async def manage_startup_programs(
         return f"Failed to manage startup programs: {str(e)}"
 
 @function_tool()
-async def network_control(
+@tool_executor(IO)
+def network_control(
     context: RunContext,  # type: ignore
     action: str,
     interface: Optional[str] = None
@@ -1204,7 +2194,8 @@ async def network_control(
         return f"Failed network control: {str(e)}"
 
 @function_tool()
-async def power_management(
+@tool_executor(IO)
+def power_management(
     context: RunContext,  # type: ignore
     action: str,
     delay: int = 0
@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+WEATHER_URL = "https://wttr.in/{city}?format=3"
+WEATHER_CACHE_FILE = "friday_weather_cache.json"
+
+
+def normalize_city(city):
+    return " ".join(city.lower().split())
+
+
+class WeatherCache:
+    """TTL cache for weather reports with stale-while-revalidate, persisted to disk."""
+
+    def __init__(self, cache_file=WEATHER_CACHE_FILE, url=WEATHER_URL, ttl=600, stale_ttl=3 * 3600,
+                 timeout=5.0, max_connections=8):
+        self.cache_file = cache_file
+        self.url = url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._fetch_pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="friday-weather")
+        self._lock = threading.Lock()
+        self._entries = None          # normalized city -> {"report": str, "fetched": epoch seconds}
+        self._refreshing = set()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "errors": 0}
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                if os.path.exists(self.cache_file):
+                    with open(self.cache_file, 'r') as f:
+                        self._entries = json.load(f)
+                else:
+                    self._entries = {}
+            except Exception as e:
+                logging.error(f"Error loading weather cache: {e}")
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        try:
+            tmp_path = self.cache_file + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logging.error(f"Error saving weather cache: {e}")
+
+    def _fetch(self, key):
+        response = self.session.get(self.url.format(city=quote(key)), timeout=self.timeout)
+        response.raise_for_status()
+        report = response.text.strip()
+        with self._lock:
+            self._load()[key] = {"report": report, "fetched": time.time()}
+            self._save()
+        return report
+
+    def _revalidate(self, key):
+        try:
+            self._fetch(key)
+        except Exception as e:
+            logging.error(f"Background weather refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, city):
+        """Return the weather report for a city, fetching only when nothing usable is cached."""
+        key = normalize_city(city)
+        with self._lock:
+            entry = self._load().get(key)
+            age = time.time() - entry["fetched"] if entry else None
+            if entry and age < self.ttl:
+                self.stats["hits"] += 1
+                return entry["report"]
+            if entry and age < self.stale_ttl:
+                # Serve the stale report now and refresh it in the background
+                self.stats["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._fetch_pool.submit(self._revalidate, key)
+                return entry["report"]
+            self.stats["misses"] += 1
+
+        try:
+            return self._fetch(key)
+        except Exception:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+
+    def get_many(self, cities):
+        """Fetch several cities concurrently over the shared connection pool.
+
+        Returns a dict of city -> report, with an exception instance for cities that failed.
+        """
+        futures = {city: self._fetch_pool.submit(self.get, city) for city in dict.fromkeys(cities)}
+        results = {}
+        for city, future in futures.items():
+            try:
+                results[city] = future.result()
+            except Exception as e:
+                results[city] = e
+        return results
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        return (self.stats["hits"] + self.stats["stale_hits"]) / total if total else 0.0
+
+
+def _benchmark():
+    """Serve fake reports from a local HTTP server and report latency and hit rate."""
+    import random
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(0.05)  # Simulated upstream latency
+            body = f"{self.path.split('?')[0].strip('/')}: +18C".encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cache_file = os.path.join(tempfile.mkdtemp(), "weather.json")
+    cache = WeatherCache(cache_file=cache_file, url=f"http://127.0.0.1:{server.server_port}/{{city}}?format=3")
+
+    cities = [f"City {i}" for i in range(20)]
+    start = time.perf_counter()
+    cache.get_many(cities)
+    print(f"Batch of {len(cities)} cold cities: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    for _ in range(500):
+        cache.get(random.choice(cities).upper() + " ")
+    print(f"500 warm lookups: {(time.perf_counter() - start) * 1000:.1f} ms, hit rate {cache.hit_rate():.0%}")
+
+    reloaded = WeatherCache(cache_file=cache_file, url=cache.url)
+    reloaded.get(cities[0])
+    print(f"After restart: {reloaded.stats}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    _benchmark()
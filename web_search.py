@@ -0,0 +1,176 @@
+import abc
+import collections
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+MAX_SNIPPET_CHARS = 200
+MAX_TOTAL_CHARS = 2500
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+def _url_key(url):
+    parts = urlsplit(url.strip().lower())
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return host + parts.path.rstrip("/") + (f"?{parts.query}" if parts.query else "")
+
+
+class SearchBackend(abc.ABC):
+    """Interface for web search providers. Results are dicts with title, url and snippet."""
+
+    @abc.abstractmethod
+    def search(self, query, max_results):
+        """Return up to max_results result dicts for query."""
+
+
+class DuckDuckGoBackend(SearchBackend):
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from duckduckgo_search import DDGS
+                    self._client = DDGS()
+        return self._client
+
+    def search(self, query, max_results):
+        return [{"title": r.get("title", ""), "url": r.get("href", ""), "snippet": r.get("body", "")}
+                for r in self.client.text(query, max_results=max_results) or []]
+
+
+class FakeCorpusBackend(SearchBackend):
+    """Keyword search over a local list of documents, for benchmarks and offline use."""
+
+    def __init__(self, documents, latency=0.0):
+        self.documents = documents
+        self.latency = latency
+        self.calls = 0
+
+    def search(self, query, max_results):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        terms = set(re.findall(r"\w+", query.lower()))
+        scored = []
+        for doc in self.documents:
+            words = set(re.findall(r"\w+", f"{doc['title']} {doc['snippet']}".lower()))
+            overlap = len(terms & words)
+            if overlap:
+                scored.append((overlap, doc))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [doc for _, doc in scored[:max_results]]
+
+
+class SearchService:
+    """Cached, concurrent multi-query search on top of a SearchBackend."""
+
+    def __init__(self, backend=None, cache_size=256, ttl=900, max_workers=4):
+        self.backend = backend or DuckDuckGoBackend()
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._cache = collections.OrderedDict()   # normalized query -> (expires, results)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="friday-search")
+        self.stats = {"hits": 0, "misses": 0}
+
+    def search(self, query, max_results=5):
+        key = (normalize_query(query), max_results)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached[1]
+            self.stats["misses"] += 1
+
+        results = self.backend.search(key[0], max_results)
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+    def search_many(self, queries, max_results=5, max_total_chars=MAX_TOTAL_CHARS):
+        """Run queries concurrently, then merge them rank by rank into one deduplicated list.
+
+        Returns (results, errors) where errors maps a query to the exception it raised.
+        """
+        queries = list(dict.fromkeys(q for q in queries if q and q.strip()))
+        futures = [(query, self._pool.submit(self.search, query, max_results)) for query in queries]
+
+        per_query, errors = [], {}
+        for query, future in futures:
+            try:
+                per_query.append((query, future.result()))
+            except Exception as e:
+                errors[query] = e
+
+        merged, seen, total_chars = [], set(), 0
+        for rank in range(max_results):
+            for query, results in per_query:
+                if rank >= len(results):
+                    continue
+                result = results[rank]
+                key = _url_key(result["url"]) if result.get("url") else result.get("title", "").lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                snippet = " ".join(result.get("snippet", "").split())
+                if len(snippet) > MAX_SNIPPET_CHARS:
+                    snippet = snippet[:MAX_SNIPPET_CHARS - 3].rstrip() + "..."
+                entry = {"title": result.get("title", ""), "url": result.get("url", ""),
+                         "snippet": snippet, "query": query}
+                size = len(entry["title"]) + len(entry["url"]) + len(snippet)
+                if merged and total_chars + size > max_total_chars:
+                    return merged, errors
+                merged.append(entry)
+                total_chars += size
+        return merged, errors
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+
+def _benchmark():
+    import random
+
+    random.seed(11)
+    topics = ["python", "asyncio", "weather", "livekit", "numpy", "opencv", "sqlite", "gmail"]
+    corpus = [{"title": f"{random.choice(topics)} guide {i}",
+               "url": f"https://example.com/{i}",
+               "snippet": " ".join(random.choices(topics, k=20))} for i in range(5000)]
+    backend = FakeCorpusBackend(corpus, latency=0.2)
+    service = SearchService(backend)
+
+    queries = [f"{a} {b}" for a in topics[:4] for b in topics[4:]]
+    start = time.perf_counter()
+    for query in queries[:4]:
+        service.search(query + " sequential")
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results, _ = service.search_many(queries[:4])
+    print(f"4 queries: sequential {sequential:.2f}s, concurrent {time.perf_counter() - start:.2f}s, "
+          f"{len(results)} merged results")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        service.search_many(random.sample(queries[:4], 2))
+    print(f"100 cached multi-query calls: {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"hit rate {service.hit_rate():.0%}, backend calls {backend.calls}")
+
+
+if __name__ == "__main__":
+    _benchmark()